@@ -0,0 +1,254 @@
+import os
+import json
+import time
+import statistics
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from job_store import connect_sqlite
+
+class LeaseStatus:
+    QUEUED = "queued"
+    LEASED = "leased"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class SQLiteBroker:
+    """Reference job broker for running API and research workers as separate processes.
+
+    The API process enqueues jobs; `research-worker` processes (worker.py)
+    lease them. A lease is valid for `lease_seconds` and is extended by the
+    worker's heartbeats. When a worker dies its leases expire, and
+    `reap_expired` puts those jobs back in the queue until they have been
+    attempted `max_attempts` times.
+
+    Everything lives in one SQLite database, so any number of workers on the
+    same host, or on hosts sharing the file, can pull from the same queue.
+    """
+
+    def __init__(self, path: str = "broker.db", max_attempts: int = 3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.conn = connect_sqlite(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS broker_jobs (
+                job_id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker_id TEXT,
+                lease_expires REAL,
+                enqueued_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_broker_dispatch ON broker_jobs(status, priority DESC, enqueued_at);
+            CREATE INDEX IF NOT EXISTS idx_broker_lease ON broker_jobs(status, lease_expires);
+            CREATE TABLE IF NOT EXISTS broker_workers (
+                worker_id TEXT PRIMARY KEY,
+                concurrency INTEGER NOT NULL,
+                active_jobs INTEGER NOT NULL,
+                heartbeat_at REAL NOT NULL
+            );
+        """)
+
+    def _transaction(self, statements):
+        """Run `statements(conn)` inside an immediate (write-locked) transaction."""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self.conn)
+                self.conn.execute("COMMIT")
+                return result
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, job_id: str, payload: Dict[str, Any], priority: int = 0):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO broker_jobs (job_id, payload, priority, status, enqueued_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (job_id, json.dumps(payload), priority, LeaseStatus.QUEUED, time.time()),
+            )
+
+    def lease(self, worker_id: str, lease_seconds: float = 60.0) -> Optional[Tuple[str, Dict[str, Any], int]]:
+        """Take the highest-priority queued job; returns (job_id, payload, attempt) or None."""
+        def statements(conn):
+            row = conn.execute(
+                "SELECT job_id, payload, attempts FROM broker_jobs WHERE status = ? "
+                "ORDER BY priority DESC, enqueued_at LIMIT 1",
+                (LeaseStatus.QUEUED,),
+            ).fetchone()
+            if row is None:
+                return None
+            job_id, payload, attempts = row
+            now = time.time()
+            conn.execute(
+                "UPDATE broker_jobs SET status = ?, worker_id = ?, lease_expires = ?, attempts = ?, started_at = ? "
+                "WHERE job_id = ?",
+                (LeaseStatus.LEASED, worker_id, now + lease_seconds, attempts + 1, now, job_id),
+            )
+            return job_id, json.loads(payload), attempts + 1
+        return self._transaction(statements)
+
+    def release(self, job_id: str):
+        """Give a leased job back to the queue without counting the attempt."""
+        with self.lock:
+            self.conn.execute(
+                "UPDATE broker_jobs SET status = ?, worker_id = NULL, lease_expires = NULL, attempts = attempts - 1 "
+                "WHERE job_id = ? AND status = ?",
+                (LeaseStatus.QUEUED, job_id, LeaseStatus.LEASED),
+            )
+
+    def heartbeat(self, worker_id: str, job_ids: List[str], concurrency: int, lease_seconds: float = 60.0):
+        """Record that a worker is alive and extend the leases it holds."""
+        def statements(conn):
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO broker_workers (worker_id, concurrency, active_jobs, heartbeat_at) "
+                "VALUES (?, ?, ?, ?)",
+                (worker_id, concurrency, len(job_ids), now),
+            )
+            conn.executemany(
+                "UPDATE broker_jobs SET lease_expires = ? WHERE job_id = ? AND worker_id = ? AND status = ?",
+                [(now + lease_seconds, job_id, worker_id, LeaseStatus.LEASED) for job_id in job_ids],
+            )
+        self._transaction(statements)
+
+    def unregister(self, worker_id: str):
+        with self.lock:
+            self.conn.execute("DELETE FROM broker_workers WHERE worker_id = ?", (worker_id,))
+
+    def complete(self, job_id: str):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE broker_jobs SET status = ?, lease_expires = NULL, finished_at = ? WHERE job_id = ? AND status = ?",
+                (LeaseStatus.DONE, time.time(), job_id, LeaseStatus.LEASED),
+            )
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """Cancel a queued or leased job; returns the status it had, or None if it had finished.
+
+        Workers stop leased jobs once they see the status change (see `cancelled`).
+        """
+        def statements(conn):
+            row = conn.execute(
+                "SELECT status FROM broker_jobs WHERE job_id = ? AND status IN (?, ?)",
+                (job_id, LeaseStatus.QUEUED, LeaseStatus.LEASED),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE broker_jobs SET status = ?, lease_expires = NULL, finished_at = ? WHERE job_id = ?",
+                (LeaseStatus.CANCELLED, time.time(), job_id),
+            )
+            return row[0]
+        return self._transaction(statements)
+
+    def cancelled(self, job_ids: List[str]) -> List[str]:
+        """The subset of `job_ids` that have been cancelled."""
+        if not job_ids:
+            return []
+        placeholders = ",".join("?" for _ in job_ids)
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT job_id FROM broker_jobs WHERE status = ? AND job_id IN ({placeholders})",
+                (LeaseStatus.CANCELLED, *job_ids),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def reap_expired(self) -> Tuple[List[Tuple[str, int]], List[str]]:
+        """Requeue jobs whose lease expired; fail those out of attempts.
+
+        Returns ([(requeued job_id, attempts so far)], [failed job_id]).
+        """
+        def statements(conn):
+            rows = conn.execute(
+                "SELECT job_id, attempts FROM broker_jobs WHERE status = ? AND lease_expires < ?",
+                (LeaseStatus.LEASED, time.time()),
+            ).fetchall()
+            requeued = [(job_id, attempts) for job_id, attempts in rows if attempts < self.max_attempts]
+            failed = [job_id for job_id, attempts in rows if attempts >= self.max_attempts]
+            conn.executemany(
+                "UPDATE broker_jobs SET status = ?, worker_id = NULL, lease_expires = NULL WHERE job_id = ?",
+                [(LeaseStatus.QUEUED, job_id) for job_id, _ in requeued],
+            )
+            conn.executemany(
+                "UPDATE broker_jobs SET status = ?, lease_expires = NULL, finished_at = ? WHERE job_id = ?",
+                [(LeaseStatus.FAILED, time.time(), job_id) for job_id in failed],
+            )
+            return requeued, failed
+        return self._transaction(statements)
+
+    def forget(self, job_id: str):
+        with self.lock:
+            self.conn.execute("DELETE FROM broker_jobs WHERE job_id = ?", (job_id,))
+
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based dispatch position of a queued job, or None once it has been leased."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT priority, enqueued_at FROM broker_jobs WHERE job_id = ? AND status = ?",
+                (job_id, LeaseStatus.QUEUED),
+            ).fetchone()
+            if row is None:
+                return None
+            priority, enqueued_at = row
+            ahead = self.conn.execute(
+                "SELECT COUNT(*) FROM broker_jobs WHERE status = ? "
+                "AND (priority > ? OR (priority = ? AND enqueued_at < ?))",
+                (LeaseStatus.QUEUED, priority, priority, enqueued_at),
+            ).fetchone()[0]
+        return ahead + 1
+
+    def stats(self, worker_timeout: float = 120.0) -> Dict[str, Any]:
+        """Queue depth, leased jobs and the capacity of workers seen recently."""
+        with self.lock:
+            counts = dict(self.conn.execute(
+                "SELECT status, COUNT(*) FROM broker_jobs WHERE status IN (?, ?) GROUP BY status",
+                (LeaseStatus.QUEUED, LeaseStatus.LEASED),
+            ).fetchall())
+            workers = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(concurrency), 0) FROM broker_workers WHERE heartbeat_at > ?",
+                (time.time() - worker_timeout,),
+            ).fetchone()
+        return {
+            "queued": counts.get(LeaseStatus.QUEUED, 0),
+            "leased": counts.get(LeaseStatus.LEASED, 0),
+            "workers": workers[0],
+            "capacity": workers[1],
+        }
+
+    def recent_durations(self, limit: int = 50) -> List[float]:
+        """Run times of the most recently finished jobs."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT finished_at - started_at FROM broker_jobs WHERE status = ? AND started_at IS NOT NULL "
+                "ORDER BY finished_at DESC LIMIT ?",
+                (LeaseStatus.DONE, limit),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def median_duration(self, limit: int = 50) -> Optional[float]:
+        """Median run time of the most recently finished jobs."""
+        durations = self.recent_durations(limit)
+        return statistics.median(durations) if durations else None
+
+    def duration_percentile(self, p: float, limit: int = 200) -> Optional[float]:
+        """The p-th percentile (0-100) run time of the most recently finished jobs."""
+        durations = sorted(self.recent_durations(limit))
+        if not durations:
+            return None
+        return durations[min(len(durations) - 1, max(0, int(round(p / 100 * (len(durations) - 1)))))]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def create_broker() -> SQLiteBroker:
+    return SQLiteBroker(os.getenv("BROKER_PATH", "broker.db"),
+                        max_attempts=int(os.getenv("BROKER_MAX_ATTEMPTS", "3")))
@@ -0,0 +1,532 @@
+import os
+import time
+import zlib
+import random
+import sqlite3
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.encrypted import EncryptedSerializer
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from job_store import connect_sqlite
+
+# The graph module creates its checkpointer on import, before the server loads .env
+load_dotenv()
+
+class CompressionCipher:
+    """zlib "cipher" for `EncryptedSerializer`: compresses serialized values of at least `min_bytes`.
+
+    The search results and section drafts held in graph state are long
+    strings that compress several times over; small values are stored as
+    they are. The cipher name ends up in the stored type ("msgpack+zlib"),
+    so checkpoints written before compression was enabled still load.
+    """
+
+    def __init__(self, min_bytes: int = 1024, level: int = 6):
+        self.min_bytes = min_bytes
+        self.level = level
+
+    def encrypt(self, plaintext: bytes) -> Tuple[str, bytes]:
+        if len(plaintext) < self.min_bytes:
+            return "raw", plaintext
+        return "zlib", zlib.compress(plaintext, self.level)
+
+    def decrypt(self, ciphername: str, ciphertext: bytes) -> bytes:
+        if ciphername == "zlib":
+            return zlib.decompress(ciphertext)
+        if ciphername == "raw":
+            return ciphertext
+        raise ValueError(f"Unknown checkpoint compression: {ciphername}")
+
+# Types of graph state that checkpoints may deserialize; langgraph will refuse any others
+CHECKPOINT_TYPES = [("state", "Section"), ("state", "SearchQuery")]
+
+def create_serializer() -> EncryptedSerializer:
+    return EncryptedSerializer(CompressionCipher(int(os.getenv("CHECKPOINT_COMPRESS_MIN_BYTES", "1024"))),
+                               JsonPlusSerializer(allowed_msgpack_modules=CHECKPOINT_TYPES))
+
+class CheckpointRetention:
+    """Limits on how long and how much checkpoint data a saver keeps.
+
+    Checkpoints only matter while a job can still resume. Once it finishes
+    only its latest checkpoint is kept (`finish_thread`); threads nobody
+    wrote to for `ttl_seconds` are dropped like expired job records, and
+    finished threads are dropped oldest first while the stored size is
+    above `max_bytes`. Threads of running jobs are never dropped for size.
+    """
+
+    ttl_seconds: float
+    max_bytes: int
+
+    def finish_thread(self, thread_id: str):
+        """Keep only the latest checkpoint of a finished job, then apply the limits."""
+        self.prune([thread_id], strategy="keep_latest")
+        self._mark_finished(thread_id)
+        self.evict()
+
+    def evict(self) -> int:
+        """Drop expired threads and finished threads over the size limit; returns how many were dropped."""
+        dropped = 0
+        for thread_id in self._threads_idle_since(time.time() - self.ttl_seconds):
+            self.delete_thread(thread_id)
+            dropped += 1
+        if self.max_bytes:
+            for thread_id in self._finished_threads():
+                if self.size_bytes() <= self.max_bytes:
+                    break
+                self.delete_thread(thread_id)
+                dropped += 1
+        return dropped
+
+    async def afinish_thread(self, thread_id: str):
+        self.finish_thread(thread_id)
+
+    async def aevict(self) -> int:
+        return self.evict()
+
+    def _mark_finished(self, thread_id: str):
+        raise NotImplementedError
+
+    def _threads_idle_since(self, cutoff: float) -> List[str]:
+        raise NotImplementedError
+
+    def _finished_threads(self) -> List[str]:
+        """Finished threads, longest finished first."""
+        raise NotImplementedError
+
+    def size_bytes(self) -> int:
+        raise NotImplementedError
+
+class SQLiteCheckpointSaver(CheckpointRetention, BaseCheckpointSaver[str]):
+    """Graph checkpoints stored in SQLite, so a job can resume after a restart.
+
+    Checkpoints, channel values and pending task writes are kept per
+    (thread, namespace) like `MemorySaver` does, including those of the
+    section subgraphs. The writes of tasks that finished in an interrupted
+    step are stored too, so resuming only re-runs the tasks that did not.
+
+    Every process opens its own connection: process-pool workers are forked
+    from the server after the graph module has been imported.
+    """
+
+    def __init__(self, path: str = "checkpoints.db", ttl_seconds: float = 3600, max_bytes: int = 0,
+                 serde: Optional[EncryptedSerializer] = None):
+        super().__init__(serde=serde)
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn: Optional[sqlite3.Connection] = None
+        self.pid: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self.conn is None or self.pid != os.getpid():
+            self.conn = connect_sqlite(self.path)
+            self.pid = os.getpid()
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    thread_id TEXT NOT NULL,
+                    checkpoint_ns TEXT NOT NULL,
+                    checkpoint_id TEXT NOT NULL,
+                    parent_checkpoint_id TEXT,
+                    checkpoint_type TEXT NOT NULL,
+                    checkpoint BLOB NOT NULL,
+                    metadata_type TEXT NOT NULL,
+                    metadata BLOB NOT NULL,
+                    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+                );
+                CREATE TABLE IF NOT EXISTS checkpoint_blobs (
+                    thread_id TEXT NOT NULL,
+                    checkpoint_ns TEXT NOT NULL,
+                    channel TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    value_type TEXT NOT NULL,
+                    value BLOB,
+                    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+                );
+                CREATE TABLE IF NOT EXISTS checkpoint_writes (
+                    thread_id TEXT NOT NULL,
+                    checkpoint_ns TEXT NOT NULL,
+                    checkpoint_id TEXT NOT NULL,
+                    task_id TEXT NOT NULL,
+                    idx INTEGER NOT NULL,
+                    channel TEXT NOT NULL,
+                    value_type TEXT NOT NULL,
+                    value BLOB,
+                    task_path TEXT NOT NULL,
+                    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+                );
+                CREATE TABLE IF NOT EXISTS checkpoint_threads (
+                    thread_id TEXT PRIMARY KEY,
+                    updated_at REAL NOT NULL,
+                    finished_at REAL
+                );
+            """)
+        return self.conn
+
+    def _load_blobs(self, conn: sqlite3.Connection, thread_id: str, checkpoint_ns: str,
+                    versions: ChannelVersions) -> Dict[str, Any]:
+        values = {}
+        for channel, version in versions.items():
+            row = conn.execute(
+                "SELECT value_type, value FROM checkpoint_blobs "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if row is not None and row[0] != "empty":
+                values[channel] = self.serde.loads_typed((row[0], row[1]))
+        return values
+
+    def _load_writes(self, conn: sqlite3.Connection, thread_id: str, checkpoint_ns: str,
+                     checkpoint_id: str) -> List[Tuple[str, str, Any]]:
+        rows = conn.execute(
+            "SELECT task_id, idx, channel, value_type, value, task_path FROM checkpoint_writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        rows.sort(key=lambda row: writes_sort_key(row[5], row[0], row[1]))
+        return [(task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, _, channel, value_type, value, _ in rows]
+
+    def _tuple(self, conn: sqlite3.Connection, thread_id: str, checkpoint_ns: str, row) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, checkpoint_type, checkpoint, metadata_type, metadata = row
+        checkpoint_: Checkpoint = self.serde.loads_typed((checkpoint_type, checkpoint))
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                     "checkpoint_id": checkpoint_id}},
+            checkpoint={**checkpoint_,
+                        "channel_values": self._load_blobs(conn, thread_id, checkpoint_ns,
+                                                           checkpoint_["channel_versions"])},
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=({"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                             "checkpoint_id": parent_checkpoint_id}}
+                           if parent_checkpoint_id else None),
+            pending_writes=self._load_writes(conn, thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, checkpoint_type, checkpoint, metadata_type, metadata"
+        with self.lock:
+            conn = self._connection()
+            if checkpoint_id := get_checkpoint_id(config):
+                row = conn.execute(
+                    f"SELECT {columns} FROM checkpoints "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            return self._tuple(conn, thread_id, checkpoint_ns, row) if row else None
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        query = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, checkpoint_type, "
+                 "checkpoint, metadata_type, metadata FROM checkpoints")
+        conditions, params = [], []
+        if config:
+            conditions.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                conditions.append("checkpoint_ns = ?")
+                params.append(config["configurable"]["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                conditions.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            conditions.append("checkpoint_id < ?")
+            params.append(before_id)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self.lock:
+            conn = self._connection()
+            rows = conn.execute(query, params).fetchall()
+            results = []
+            for thread_id, checkpoint_ns, *row in rows:
+                if limit is not None and len(results) >= limit:
+                    break
+                if filter:
+                    metadata = self.serde.loads_typed((row[4], row[5]))
+                    if not all(metadata.get(key) == value for key, value in filter.items()):
+                        continue
+                results.append(self._tuple(conn, thread_id, checkpoint_ns, row))
+        yield from results
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        checkpoint_ = checkpoint.copy()
+        values: Dict[str, Any] = checkpoint_.pop("channel_values")
+        blobs = []
+        for channel, version in new_versions.items():
+            value_type, value = self.serde.dumps_typed(values[channel]) if channel in values else ("empty", None)
+            blobs.append((thread_id, checkpoint_ns, channel, str(version), value_type, value))
+        checkpoint_type, checkpoint_data = self.serde.dumps_typed(checkpoint_)
+        metadata_type, metadata_data = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        with self.lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("INSERT OR REPLACE INTO checkpoint_blobs VALUES (?, ?, ?, ?, ?, ?)", blobs)
+                conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                     checkpoint_type, checkpoint_data, metadata_type, metadata_data),
+                )
+                self._touch(conn, thread_id)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                 "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows, special = [], []
+        for idx, (channel, value) in enumerate(writes):
+            value_type, data = self.serde.dumps_typed(value)
+            row = (thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx),
+                   channel, value_type, data, task_path)
+            # Special channels (errors, interrupts) are written once; regular writes replace
+            (special if row[4] < 0 else rows).append(row)
+        with self.lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("INSERT OR REPLACE INTO checkpoint_writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                conn.executemany("INSERT OR IGNORE INTO checkpoint_writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", special)
+                self._touch(conn, thread_id)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _touch(conn: sqlite3.Connection, thread_id: str):
+        conn.execute("INSERT INTO checkpoint_threads VALUES (?, ?, NULL) "
+                     "ON CONFLICT(thread_id) DO UPDATE SET updated_at = excluded.updated_at",
+                     (thread_id, time.time()))
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self.lock:
+            conn = self._connection()
+            for table in ("checkpoints", "checkpoint_blobs", "checkpoint_writes", "checkpoint_threads"):
+                conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    def prune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        if strategy == "delete":
+            for thread_id in thread_ids:
+                self.delete_thread(thread_id)
+            return
+        if strategy != "keep_latest":
+            raise ValueError(f"Unknown prune strategy: {strategy}")
+        with self.lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for thread_id in thread_ids:
+                    latest = conn.execute(
+                        "SELECT checkpoint_ns, MAX(checkpoint_id) FROM checkpoints WHERE thread_id = ? "
+                        "GROUP BY checkpoint_ns", (thread_id,)).fetchall()
+                    for checkpoint_ns, checkpoint_id in latest:
+                        key = (thread_id, checkpoint_ns, checkpoint_id)
+                        row = conn.execute(
+                            "SELECT checkpoint_type, checkpoint FROM checkpoints "
+                            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", key).fetchone()
+                        versions = self.serde.loads_typed(row)["channel_versions"]
+                        for table in ("checkpoints", "checkpoint_writes"):
+                            conn.execute(f"DELETE FROM {table} "
+                                         "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id != ?", key)
+                        # Blobs of channel versions the latest checkpoint no longer points at
+                        stale = [(thread_id, checkpoint_ns, channel, version) for channel, version in conn.execute(
+                            "SELECT channel, version FROM checkpoint_blobs WHERE thread_id = ? AND checkpoint_ns = ?",
+                            (thread_id, checkpoint_ns)).fetchall()
+                                 if str(versions.get(channel)) != version]
+                        conn.executemany("DELETE FROM checkpoint_blobs WHERE thread_id = ? AND checkpoint_ns = ? "
+                                         "AND channel = ? AND version = ?", stale)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _mark_finished(self, thread_id: str):
+        with self.lock:
+            self._connection().execute("UPDATE checkpoint_threads SET finished_at = ? WHERE thread_id = ?",
+                                       (time.time(), thread_id))
+
+    def _threads_idle_since(self, cutoff: float) -> List[str]:
+        with self.lock:
+            rows = self._connection().execute(
+                "SELECT thread_id FROM checkpoint_threads WHERE updated_at < ?", (cutoff,)).fetchall()
+        return [row[0] for row in rows]
+
+    def _finished_threads(self) -> List[str]:
+        with self.lock:
+            rows = self._connection().execute(
+                "SELECT thread_id FROM checkpoint_threads WHERE finished_at IS NOT NULL "
+                "ORDER BY finished_at").fetchall()
+        return [row[0] for row in rows]
+
+    def size_bytes(self) -> int:
+        with self.lock:
+            conn = self._connection()
+            return sum(conn.execute(query).fetchone()[0] or 0 for query in (
+                "SELECT SUM(LENGTH(checkpoint) + LENGTH(metadata)) FROM checkpoints",
+                "SELECT SUM(LENGTH(value)) FROM checkpoint_blobs",
+                "SELECT SUM(LENGTH(value)) FROM checkpoint_writes",
+            ))
+
+    # The async methods run the SQLite work on a thread, so a job waiting for the write lock
+    # held by another process does not stall the event loop the other jobs run on
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+    async def afinish_thread(self, thread_id: str):
+        await asyncio.to_thread(self.finish_thread, thread_id)
+
+    async def aevict(self) -> int:
+        return await asyncio.to_thread(self.evict)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        # Same zero-padded, sortable versions as MemorySaver
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None and self.pid == os.getpid():
+                self.conn.close()
+            self.conn = None
+
+class BoundedMemorySaver(CheckpointRetention, MemorySaver):
+    """`MemorySaver` that forgets finished and idle threads.
+
+    Each process-pool worker has its own instance, so the limits are
+    applied by whichever process ran the job, when it finishes.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, max_bytes: int = 0,
+                 serde: Optional[EncryptedSerializer] = None):
+        super().__init__(serde=serde)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.updated_at: Dict[str, float] = {}
+        self.finished: "OrderedDict[str, float]" = OrderedDict()
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        self.updated_at[config["configurable"]["thread_id"]] = time.time()
+        return super().put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        self.updated_at[config["configurable"]["thread_id"]] = time.time()
+        return super().put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        self.updated_at.pop(thread_id, None)
+        self.finished.pop(thread_id, None)
+
+    def prune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        if strategy == "delete":
+            for thread_id in thread_ids:
+                self.delete_thread(thread_id)
+            return
+        if strategy != "keep_latest":
+            raise ValueError(f"Unknown prune strategy: {strategy}")
+        for thread_id in thread_ids:
+            for checkpoint_ns, checkpoints in self.storage.get(thread_id, {}).items():
+                if not checkpoints:
+                    continue
+                latest = max(checkpoints)
+                for checkpoint_id in [c for c in checkpoints if c != latest]:
+                    del checkpoints[checkpoint_id]
+                    self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+                versions = self.serde.loads_typed(checkpoints[latest][0])["channel_versions"]
+                for key in [key for key in self.blobs
+                            if key[:2] == (thread_id, checkpoint_ns) and versions.get(key[2]) != key[3]]:
+                    del self.blobs[key]
+
+    def _mark_finished(self, thread_id: str):
+        self.finished.pop(thread_id, None)
+        self.finished[thread_id] = time.time()
+
+    def _threads_idle_since(self, cutoff: float) -> List[str]:
+        return [thread_id for thread_id, updated_at in self.updated_at.items() if updated_at < cutoff]
+
+    def _finished_threads(self) -> List[str]:
+        return list(self.finished)
+
+    def size_bytes(self) -> int:
+        size = sum(len(checkpoint[1]) + len(metadata[1])
+                   for namespaces in self.storage.values()
+                   for checkpoints in namespaces.values()
+                   for checkpoint, metadata, _ in checkpoints.values())
+        size += sum(len(value[1] or b"") for value in self.blobs.values())
+        size += sum(len(write[2][1] or b"") for writes in self.writes.values() for write in writes.values())
+        return size
+
+def create_checkpointer() -> BaseCheckpointSaver:
+    """Keep checkpoints on disk whenever job records are, so jobs can resume after a restart."""
+    limits = {
+        "ttl_seconds": float(os.getenv("CHECKPOINT_TTL_SECONDS", "3600")),
+        "max_bytes": int(os.getenv("CHECKPOINT_MAX_BYTES", str(256 * 1024 * 1024))),
+        "serde": create_serializer(),
+    }
+    if os.getenv("JOB_STORE", "memory") == "sqlite":
+        return SQLiteCheckpointSaver(os.getenv("CHECKPOINT_PATH", "checkpoints.db"), **limits)
+    return BoundedMemorySaver(**limits)
@@ -35,12 +35,15 @@ class Configuration:
     report_structure: str = DEFAULT_REPORT_STRUCTURE # Defaults to the default report structure
     number_of_queries: int = 2 # Number of search queries to generate per iteration
     max_search_depth: int = 2 # Maximum number of reflection + search iterations
+    batch_section_queries: bool = False # Generate the first queries of every researched section in one call
+    early_section_research: bool = False # Start researching sections while a groq planner is still writing the plan
     planner_provider: str = "groq"  # Defaults to groq as provider
     planner_model: str = "llama3-70b-8192" # Defaults to claude-3-7-sonnet-latest
     writer_provider: str = "groq" # Defaults to groq as provider
     writer_model: str = "llama3-8b-8192" # Defaults to claude-3-5-sonnet-latest
     search_api: SearchAPI = SearchAPI.DUCKDUCKGO # Default to TAVILY
     search_api_config: Optional[Dict[str, Any]] = None 
+    grading_config: Optional[Dict[str, Any]] = None # Overrides of GradingPolicy thresholds for grading sections without the model
 
     @classmethod
     def from_runnable_config(
@@ -55,4 +58,5 @@ class Configuration:
             for f in fields(cls)
             if f.init
         }
-        return cls(**{k: v for k, v in values.items() if v})
+        # Unset values take the defaults; an explicit False still turns a flag off
+        return cls(**{k: v for k, v in values.items() if v or v is False})
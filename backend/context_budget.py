@@ -0,0 +1,112 @@
+import os
+import re
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence
+
+# Context windows of models this service is commonly configured with
+CONTEXT_WINDOWS = {
+    "llama3-8b-8192": 8192,
+    "llama3-70b-8192": 8192,
+    "llama-3.1-8b-instant": 131072,
+    "llama-3.3-70b-versatile": 131072,
+    "gemma2-9b-it": 8192,
+    "claude-3-5-sonnet-latest": 200000,
+    "claude-3-7-sonnet-latest": 200000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+}
+DEFAULT_CONTEXT_WINDOW = int(os.getenv("DEFAULT_CONTEXT_WINDOW", "8192"))
+# Room left for the model's answer
+OUTPUT_TOKENS = int(os.getenv("CONTEXT_OUTPUT_TOKENS", "2048"))
+# Upper bound on search context per prompt, even for models with large windows
+MAX_SOURCE_TOKENS = int(os.getenv("MAX_SOURCE_CONTEXT_TOKENS", "12000"))
+# Used when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+def context_window(model: str) -> int:
+    """Context window of `model` in tokens."""
+    if model in CONTEXT_WINDOWS:
+        return CONTEXT_WINDOWS[model]
+    # Groq model ids like "mixtral-8x7b-32768" end in their window size
+    match = re.search(r"-(\d{4,6})$", model or "")
+    return int(match.group(1)) if match else DEFAULT_CONTEXT_WINDOW
+
+@lru_cache(maxsize=None)
+def tokenizer(model: str):
+    """tiktoken encoding for `model`, or None when tiktoken or its encoding files are unavailable.
+
+    Models without an encoding of their own are counted with cl100k_base,
+    which is within a few percent of the Llama 3 and Claude tokenizers on
+    English text. Loading may download the encoding once, so warm-up calls
+    this before the first job does.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"No tokenizer for {model}, estimating tokens from length: {e}")
+        return None
+
+def count_tokens(text: str, model: str) -> int:
+    encoding = tokenizer(model)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_tokens(text: str, max_tokens: int, model: str) -> str:
+    """The first `max_tokens` tokens of `text`."""
+    encoding = tokenizer(model)
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+def source_budget(model: str, prompt: str) -> int:
+    """Tokens left for search results in a prompt to `model` whose other parts add up to `prompt`.
+
+    Keeps 5% of the window spare for message framing and tokenizer error.
+    """
+    window = context_window(model)
+    available = int(window * 0.95) - count_tokens(prompt, model) - OUTPUT_TOKENS
+    return max(0, min(MAX_SOURCE_TOKENS, available))
+
+def allocate(demands: Sequence[int], weights: Sequence[float], budget: int) -> List[int]:
+    """Split `budget` over sources in proportion to `weights`, giving none more than it demands.
+
+    Whatever a short source does not need is shared out again among the
+    others, so the budget is used up before any source is cut.
+    """
+    allocation = [0] * len(demands)
+    active = [i for i, demand in enumerate(demands) if demand > 0]
+    remaining = budget
+    while active and remaining > 0:
+        total_weight = sum(weights[i] for i in active)
+        shares = {i: remaining * weights[i] / total_weight for i in active}
+        satisfied = [i for i in active if demands[i] - allocation[i] <= shares[i]]
+        if not satisfied:
+            for i in active:
+                allocation[i] += int(shares[i])
+            break
+        for i in satisfied:
+            remaining -= demands[i] - allocation[i]
+            allocation[i] = demands[i]
+        active = [i for i in active if i not in satisfied]
+    return allocation
+
+def relevance(source: dict[str, Any], default: float = 0.5) -> float:
+    """Weight of a source from its search score; unscored sources count as average."""
+    score = source.get("score")
+    if not isinstance(score, (int, float)) or score <= 0:
+        return default
+    return float(score)
+
+def warm_tokenizers(models: Sequence[Optional[str]]):
+    for model in models:
+        if model:
+            tokenizer(model)
@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import bisect
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from job_store import connect_sqlite, in_store_thread
+
+# Events after which a job's stream is closed
+TERMINAL_EVENTS = ("completed", "failed", "cancelled")
+
+def superseded_tokens(event_type: str, data: Dict[str, Any]) -> Optional[str]:
+    """Which token events an event makes redundant: "*" for all, a section name, or None."""
+    if event_type in TERMINAL_EVENTS:
+        return "*"
+    if event_type == "section":
+        return data.get("name")
+    return None
+
+class JobEventLog:
+    """Per-job log of events that subscribers can follow.
+
+    Every event gets an id that increases within its job, so a client that
+    reconnects with the last id it saw (SSE `Last-Event-ID`) resumes right
+    after it and never receives an event, including the final report, twice.
+    Token events are only kept until their section, or the job, finishes:
+    the section event carries the full text, so a client resuming after a
+    dropped token simply continues with the events that remain.
+    """
+
+    def __init__(self):
+        self.events: Dict[str, List[Dict[str, Any]]] = {}
+        self.last_ids: Dict[str, int] = {}
+        self.updated: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = {}
+
+    def publish(self, job_id: str, event_type: str, data: Dict[str, Any]) -> int:
+        """Append an event to a job's log and wake its subscribers."""
+        log = self.events.setdefault(job_id, [])
+        event = {"id": self.last_ids.get(job_id, 0) + 1, "type": event_type, "data": data}
+        self.last_ids[job_id] = event["id"]
+        section = superseded_tokens(event_type, data)
+        if section is not None:
+            log[:] = [e for e in log if not (e["type"] == "token" and section in ("*", e["data"].get("name")))]
+        log.append(event)
+        self._wake(job_id)
+        return event["id"]
+
+    def drop(self, job_id: str):
+        """Forget a job's events once the job itself is evicted."""
+        self.events.pop(job_id, None)
+        self.last_ids.pop(job_id, None)
+        self._wake(job_id)
+
+    def events_after(self, job_id: str, last_event_id: int) -> Optional[List[Dict[str, Any]]]:
+        """Events newer than `last_event_id`, or None if the job has no log."""
+        log = self.events.get(job_id)
+        if log is None:
+            return None
+        return log[bisect.bisect_right(log, last_event_id, key=lambda event: event["id"]):]
+
+    async def aevents_after(self, job_id: str, last_event_id: int) -> Optional[List[Dict[str, Any]]]:
+        return self.events_after(job_id, last_event_id)
+
+    def _wake(self, job_id: str):
+        # Swap in a fresh Event so waiters woken now do not spin on a stale one. Publishers
+        # may run on the job store thread, so the Event is set on its subscribers' loop.
+        waiting = self.updated.pop(job_id, None)
+        if waiting:
+            loop, updated = waiting
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(updated.set)
+
+    async def wait_for_update(self, job_id: str, timeout: Optional[float]):
+        """Wait until the job's log changes or `timeout` passes."""
+        if job_id not in self.updated:
+            self.updated[job_id] = (asyncio.get_running_loop(), asyncio.Event())
+        try:
+            await asyncio.wait_for(self.updated[job_id][1].wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def subscribe(self, job_id: str, last_event_id: int = 0,
+                        heartbeat: Optional[float] = 15.0) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Yield the job's events after `last_event_id` until a terminal event.
+
+        Yields None every `heartbeat` seconds without events so transports can
+        keep idle connections open.
+        """
+        position = last_event_id
+        last_sent = time.monotonic()
+        while True:
+            events = await self.aevents_after(job_id, position)
+            if events is None:
+                return
+            for event in events:
+                position = event["id"]
+                last_sent = time.monotonic()
+                yield event
+                if event["type"] in TERMINAL_EVENTS:
+                    return
+
+            if heartbeat is not None and time.monotonic() - last_sent >= heartbeat:
+                last_sent = time.monotonic()
+                yield None
+            await self.wait_for_update(job_id, self._wait_timeout(heartbeat))
+
+    def _wait_timeout(self, heartbeat: Optional[float]) -> Optional[float]:
+        return heartbeat
+
+    def close(self):
+        pass
+
+class SQLiteJobEventLog(JobEventLog):
+    """Job event log in a SQLite database shared with research workers.
+
+    Workers in other processes publish into the same table, so subscribers
+    poll it every `poll_interval` seconds in addition to being woken by
+    events published from their own process. A job has a log for as long
+    as its record is in `jobs_table`, in the same database.
+    """
+
+    def __init__(self, path: str = "jobs.db", poll_interval: float = 0.25, jobs_table: str = "jobs"):
+        super().__init__()
+        self.poll_interval = poll_interval
+        self.jobs_table = jobs_table
+        self.lock = threading.Lock()
+        self.conn = connect_sqlite(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_events (
+                job_id TEXT NOT NULL,
+                event_id INTEGER NOT NULL,
+                type TEXT NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (job_id, event_id)
+            ) WITHOUT ROWID
+        """)
+
+    def publish(self, job_id: str, event_type: str, data: Dict[str, Any]) -> int:
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                event_id = self.conn.execute(
+                    "SELECT COALESCE(MAX(event_id), 0) + 1 FROM job_events WHERE job_id = ?", (job_id,)
+                ).fetchone()[0]
+                self.conn.execute(
+                    "INSERT INTO job_events (job_id, event_id, type, data) VALUES (?, ?, ?, ?)",
+                    (job_id, event_id, event_type, json.dumps(data)),
+                )
+                section = superseded_tokens(event_type, data)
+                if section == "*":
+                    self.conn.execute("DELETE FROM job_events WHERE job_id = ? AND type = 'token'", (job_id,))
+                elif section is not None:
+                    self.conn.execute(
+                        "DELETE FROM job_events WHERE job_id = ? AND type = 'token' AND json_extract(data, '$.name') = ?",
+                        (job_id, section),
+                    )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        self._wake(job_id)
+        return event_id
+
+    def drop(self, job_id: str):
+        with self.lock:
+            self.conn.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+        self._wake(job_id)
+
+    def events_after(self, job_id: str, last_event_id: int) -> Optional[List[Dict[str, Any]]]:
+        # A job's first event may still be on its way from a worker, so an empty log is not a missing one
+        with self.lock:
+            if self.conn.execute(f"SELECT 1 FROM {self.jobs_table} WHERE job_id = ?", (job_id,)).fetchone() is None:
+                # Evicted: nothing more will be published, so subscribers stop polling
+                return None
+            rows = self.conn.execute(
+                "SELECT event_id, type, data FROM job_events WHERE job_id = ? AND event_id > ? ORDER BY event_id",
+                (job_id, last_event_id),
+            ).fetchall()
+        return [{"id": event_id, "type": event_type, "data": json.loads(data)}
+                for event_id, event_type, data in rows]
+
+    async def aevents_after(self, job_id: str, last_event_id: int) -> Optional[List[Dict[str, Any]]]:
+        return await in_store_thread(self.events_after, job_id, last_event_id)
+
+    def _wait_timeout(self, heartbeat: Optional[float]) -> Optional[float]:
+        return self.poll_interval if heartbeat is None else min(heartbeat, self.poll_interval)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def create_event_log() -> JobEventLog:
+    """Keep job events next to the job records when they are shared through SQLite."""
+    if os.getenv("JOB_STORE", "memory") == "sqlite":
+        return SQLiteJobEventLog(os.getenv("JOB_STORE_PATH", "jobs.db"))
+    return JobEventLog()
+
+def format_sse(event: Optional[Dict[str, Any]]) -> str:
+    """Format an event (or a heartbeat when None) as a Server-Sent Events frame."""
+    if event is None:
+        return ": keep-alive\n\n"
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
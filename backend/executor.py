@@ -0,0 +1,304 @@
+import os
+import queue
+import asyncio
+import multiprocessing
+import concurrent.futures
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from graph import graph
+from state import ReportStateInput
+from configuration import Configuration
+from models import MODELS
+from context_budget import warm_tokenizers
+from rate_limits import RateLimitCallback
+from search_providers import SEARCH_HTTP
+from progress import ReportProgress, TokenBuffer
+from metrics import METRICS, LLMMetricsCallback, NodeTimer
+from tracing import trace_job
+from health import PROVIDER_CIRCUITS, ProviderOutcomeCallback
+from scheduler import JobScheduler
+
+EventCallback = Callable[[Dict[str, Any]], None]
+
+class ExecutorMode:
+    ASYNC = "async"
+    PROCESS = "process"
+
+async def stream_report_graph(topic: str, config: Dict[str, Any], on_event: EventCallback,
+                              stream_tokens: bool = False) -> Dict[str, Any]:
+    """Run the report graph, reporting progress from its task stream as it goes.
+
+    With `stream_tokens`, writer model output is also forwarded as token
+    events tagged with the section being written. The config's thread id
+    is the job id; a thread that was interrupted part-way is resumed from
+    its last checkpoint instead of starting over.
+
+    Returns the final state's report plus the number of planned sections.
+    """
+    tracker = ReportProgress()
+    tokens = TokenBuffer(on_event)
+    timer = NodeTimer()
+    stream_mode = ["tasks", "messages"] if stream_tokens else ["tasks"]
+    callbacks = [LLMMetricsCallback(), ProviderOutcomeCallback(), RateLimitCallback()]
+
+    # Pending nodes mean the run was interrupted by a restart or a lost worker
+    snapshot = await graph.aget_state(config)
+    resuming = bool(snapshot.next)
+    if resuming:
+        for event in tracker.resume(snapshot.values):
+            on_event(event)
+    elif "final_report" in snapshot.values:
+        # Finished before the interruption; only the job record was not updated
+        await graph.checkpointer.afinish_thread(config["configurable"]["thread_id"])
+        return report_result(snapshot)
+
+    # One trace per job, identified by the graph's thread id
+    with trace_job(config["configurable"]["thread_id"], topic=topic, resumed=resuming) as tracing:
+        if tracing is not None:
+            callbacks.append(tracing)
+        run_config = {**config, "callbacks": callbacks}
+        graph_input = None if resuming else ReportStateInput(topic=topic)
+        async for namespace, mode, data in graph.astream(graph_input, config=run_config,
+                                                         stream_mode=stream_mode, subgraphs=True):
+            if mode == "messages":
+                token = tracker.handle_message(*data)
+                if token:
+                    tokens.add(token)
+                continue
+
+            # Keep pending text ahead of the task event that may complete its section
+            tokens.flush()
+            timer.handle(data)
+            for event in tracker.handle(namespace, data):
+                on_event(event)
+        tokens.flush()
+
+    result = report_result(await graph.aget_state(config))
+    if "final_report" in result:
+        # Nothing resumes a finished thread; drop everything but its last checkpoint
+        await graph.checkpointer.afinish_thread(config["configurable"]["thread_id"])
+    return result
+
+def report_result(snapshot) -> Dict[str, Any]:
+    """The final report of a graph state snapshot plus its number of planned sections."""
+    result = {"num_sections": len(snapshot.values.get("sections", []))}
+    if "final_report" in snapshot.values:
+        result["final_report"] = snapshot.values["final_report"]
+    return result
+
+async def stream_until_cancelled(topic: str, config: Dict[str, Any], events: "queue.Queue",
+                                 stream_tokens: bool, cancelled) -> Dict[str, Any]:
+    """Run the graph in a worker process, stopping when the parent sets `cancelled`."""
+    run = asyncio.create_task(stream_report_graph(topic, config, events.put, stream_tokens))
+    while not run.done():
+        await asyncio.wait({run}, timeout=0.25)
+        if cancelled.is_set():
+            run.cancel()
+    try:
+        return await run
+    except asyncio.CancelledError:
+        # Nobody waits for a cancelled run's result
+        return {}
+
+async def closing_search_pools(run: Awaitable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Await a run, then close the search connections and drop the model clients it opened on its event loop."""
+    try:
+        return await run
+    finally:
+        MODELS.release_loop()
+        await SEARCH_HTTP.close()
+
+def run_graph_in_process(topic: str, config: Dict[str, Any], events: "queue.Queue",
+                         stream_tokens: bool = False, cancelled=None) -> Dict[str, Any]:
+    """Run the report graph to completion inside a worker process.
+
+    Each worker process drives the graph on its own event loop, so only the
+    topic, the config, progress events, the final report and the run's
+    metrics cross the process boundary. Setting the `cancelled` event
+    cancels the run.
+    """
+    if cancelled is None:
+        result = asyncio.run(closing_search_pools(stream_report_graph(topic, config, events.put, stream_tokens)))
+    else:
+        result = asyncio.run(closing_search_pools(stream_until_cancelled(topic, config, events, stream_tokens, cancelled)))
+    # Hand this run's metrics and provider outcomes to the parent, which serves /metrics and /health
+    return {**result, "metrics": METRICS.drain(), "circuits": PROVIDER_CIRCUITS.drain()}
+
+def warm_model_clients():
+    """Build the configured planner and writer models once.
+
+    This imports the provider integrations and validates their settings,
+    which is most of a cold start, before the first job needs them.
+    """
+    configurable = Configuration.from_runnable_config()
+    MODELS.warm({(configurable.planner_model, configurable.planner_provider),
+                 (configurable.writer_model, configurable.writer_provider)})
+    # Token counting for the search context budget may need to load encodings
+    warm_tokenizers([configurable.planner_model, configurable.writer_model])
+
+class JobExecutor:
+    """Runs report jobs on a fixed pool of async workers.
+
+    In the default "async" mode every worker is a task on the server's own
+    event loop, so concurrent reports share one loop and one set of clients.
+    In "process" mode the workers hand each graph run to a pool of worker
+    processes instead. Waiting jobs are dispatched by a `JobScheduler`, and
+    `on_queue_change` is called whenever queue positions may have moved.
+    Each job runs in its own task so `cancel` can stop it without losing
+    the worker.
+    """
+
+    def __init__(self,
+                 handler: Callable[[str, Any, "JobExecutor"], Awaitable[None]],
+                 num_workers: int = 10,
+                 mode: str = ExecutorMode.ASYNC,
+                 on_queue_change: Optional[Callable[[], None]] = None):
+        if mode not in (ExecutorMode.ASYNC, ExecutorMode.PROCESS):
+            raise ValueError(f"Unsupported executor mode: {mode}")
+        self.handler = handler
+        self.num_workers = num_workers
+        self.mode = mode
+        self.on_queue_change = on_queue_change
+        self.scheduler = JobScheduler(num_workers)
+        self.workers: list[asyncio.Task] = []
+        self.active_jobs: set[str] = set()
+        self.job_tasks: Dict[str, asyncio.Task] = {}
+        self.process_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self.manager = None
+
+    @classmethod
+    def from_env(cls,
+                 handler: Callable[[str, Any, "JobExecutor"], Awaitable[None]],
+                 on_queue_change: Optional[Callable[[], None]] = None) -> "JobExecutor":
+        """Create an executor configured from JOB_WORKERS and JOB_EXECUTOR."""
+        return cls(
+            handler,
+            num_workers=int(os.getenv("JOB_WORKERS", "10")),
+            mode=os.getenv("JOB_EXECUTOR", ExecutorMode.ASYNC),
+            on_queue_change=on_queue_change,
+        )
+
+    @property
+    def capacity(self) -> int:
+        return self.num_workers
+
+    @property
+    def free_slots(self) -> int:
+        """Workers that are neither running nor about to pick up a job."""
+        return max(0, self.num_workers - len(self.active_jobs) - self.pending)
+
+    @property
+    def pending(self) -> int:
+        """Number of submitted jobs still waiting for a worker."""
+        return len(self.scheduler)
+
+    async def start(self):
+        """Start the worker tasks (and the process pool in process mode)."""
+        if self.mode == ExecutorMode.PROCESS:
+            self.process_pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.num_workers)
+            self.manager = multiprocessing.Manager()
+        self.workers = [
+            asyncio.create_task(self._worker(), name=f"report-worker-{i}")
+            for i in range(self.num_workers)
+        ]
+
+    async def warm_up(self):
+        """Build model clients in this process, or in every worker process of the pool."""
+        loop = asyncio.get_running_loop()
+        if self.mode == ExecutorMode.PROCESS:
+            await asyncio.gather(*[loop.run_in_executor(self.process_pool, warm_model_clients)
+                                   for _ in range(self.num_workers)])
+        else:
+            await loop.run_in_executor(None, warm_model_clients)
+
+    @property
+    def utilization(self) -> float:
+        """Share of workers running a job."""
+        return round(len(self.active_jobs) / self.num_workers, 3)
+
+    async def shutdown(self):
+        """Stop the workers, and the jobs they run, and release the process pool."""
+        jobs = list(self.job_tasks.values())
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        # Let cancelled jobs finish their bookkeeping before the stores are closed
+        await asyncio.gather(*jobs, return_exceptions=True)
+        self.workers = []
+        if self.process_pool:
+            self.process_pool.shutdown(wait=False, cancel_futures=True)
+            self.process_pool = None
+        if self.manager:
+            self.manager.shutdown()
+            self.manager = None
+
+    async def submit(self, job_id: str, request: Any, priority: int = 0, search_depth: int = 2):
+        """Queue a job; it starts as soon as a worker is free."""
+        await self.scheduler.put(job_id, request, priority=priority, search_depth=search_depth)
+        self._queue_changed()
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a waiting or running job; returns False if this executor does not have it."""
+        if self.scheduler.remove(job_id):
+            self._queue_changed()
+            return True
+        task = self.job_tasks.get(job_id)
+        if task is None:
+            return False
+        task.cancel()
+        return True
+
+    async def run_graph(self, topic: str, config: Dict[str, Any], on_event: EventCallback,
+                        stream_tokens: bool = False) -> Dict[str, Any]:
+        """Run one graph invocation on this loop or in the process pool."""
+        if self.mode != ExecutorMode.PROCESS:
+            return await stream_report_graph(topic, config, on_event, stream_tokens)
+
+        # Relay progress events from the worker process while it runs
+        events = self.manager.Queue()
+        cancelled = self.manager.Event()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.process_pool, run_graph_in_process,
+                                      topic, config, events, stream_tokens, cancelled)
+        try:
+            while True:
+                done, _ = await asyncio.wait({future}, timeout=0.25)
+                while True:
+                    try:
+                        on_event(events.get_nowait())
+                    except queue.Empty:
+                        break
+                if done:
+                    result = future.result()
+                    METRICS.merge(result.pop("metrics", {}))
+                    PROVIDER_CIRCUITS.merge(result.pop("circuits", []))
+                    return result
+        except asyncio.CancelledError:
+            # The worker process stops the run at its next check of the event
+            cancelled.set()
+            raise
+
+    def _queue_changed(self):
+        if self.on_queue_change:
+            self.on_queue_change()
+
+    async def _worker(self):
+        while True:
+            job = await self.scheduler.get()
+            self.active_jobs.add(job.job_id)
+            self._queue_changed()
+            task = asyncio.create_task(self.handler(job.job_id, job.request, self), name=f"report-job-{job.job_id}")
+            self.job_tasks[job.job_id] = task
+            try:
+                await asyncio.wait({task})
+                if not task.cancelled() and task.exception():
+                    print(f"Unhandled error in job {job.job_id}: {str(task.exception())}")
+            except asyncio.CancelledError:
+                # The worker itself is shutting down
+                task.cancel()
+                raise
+            finally:
+                self.job_tasks.pop(job.job_id, None)
+                self.active_jobs.discard(job.job_id)
+                self.scheduler.finished(job.job_id)
+                self._queue_changed()
@@ -0,0 +1,79 @@
+import re
+from dataclasses import dataclass, fields
+from typing import Any, Dict, List, Optional
+
+URL = re.compile(r"https?://[^\s)\]>\"']+")
+WORD = re.compile(r"[a-z0-9][a-z0-9'-]*")
+# Words that say nothing about what a section has to cover
+STOPWORDS = {
+    "about", "above", "across", "after", "all", "also", "among", "and", "any", "are", "aspects", "based",
+    "been", "before", "being", "between", "both", "brief", "but", "can", "concepts", "cover", "covered",
+    "covers", "current", "describe", "details", "different", "discuss", "does", "each", "explain",
+    "explore", "focus", "for", "from", "has", "have", "how", "including", "into", "its", "key", "main",
+    "may", "more", "most", "new", "not", "other", "our", "over", "overview", "provide", "section", "should",
+    "some", "such", "than", "that", "the", "their", "them", "then", "there", "these", "this", "those",
+    "through", "topic", "topics", "under", "use", "used", "using", "various", "was", "well", "what", "when",
+    "where", "which", "while", "who", "why", "will", "with", "within", "would", "you",
+}
+
+@dataclass(kw_only=True)
+class GradingPolicy:
+    """Thresholds for grading a written section without the grader model.
+
+    A section passes locally when it meets every `pass_*` threshold, and
+    fails locally only when it is too short to judge. Everything else goes
+    to the grader model, which writes follow-up queries for what is
+    missing. Overrides come from the `grading_config` configuration dict.
+    """
+    local_checks: bool = True  # False sends every section within the search depth to the grader model
+    pass_min_words: int = 120
+    pass_min_sources: int = 2
+    pass_min_coverage: float = 0.6  # Share of the section description's keywords found in the text
+    fail_below_words: int = 60
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "GradingPolicy":
+        known = {f.name for f in fields(cls)}
+        values = {k: v for k, v in (config or {}).items() if k in known}
+        if isinstance(values.get("local_checks"), str):
+            values["local_checks"] = values["local_checks"].strip().lower() in ("true", "1", "yes", "on")
+        return cls(**values)
+
+@dataclass
+class SectionChecks:
+    words: int
+    sources: int
+    coverage: float
+    missing_keywords: List[str]
+
+def keywords(text: str) -> List[str]:
+    """Distinct content words of `text`, in order of appearance."""
+    seen = []
+    for word in WORD.findall(text.lower()):
+        word = word.strip("'-")
+        if len(word) >= 3 and word not in STOPWORDS and word not in seen:
+            seen.append(word)
+    return seen
+
+def check_section(content: str, description: str) -> SectionChecks:
+    """Length, distinct cited URLs and description keyword coverage of a written section."""
+    words = len(URL.sub(" ", content).split())
+    sources = len({url.rstrip(".,;:").lower() for url in URL.findall(content)})
+    wanted = keywords(description)
+    # Match on word stems, so "pricing" covers "price" and "models" covers "model"
+    text = " ".join(keywords(content))
+    missing = [keyword for keyword in wanted if keyword[:max(4, len(keyword) - 3)] not in text]
+    coverage = 1.0 if not wanted else 1 - len(missing) / len(wanted)
+    return SectionChecks(words=words, sources=sources, coverage=round(coverage, 3), missing_keywords=missing)
+
+def grade_locally(policy: GradingPolicy, checks: SectionChecks) -> Optional[str]:
+    """"pass" or "fail" when the checks settle the grade, None when the grader model should decide."""
+    if not policy.local_checks:
+        return None
+    if checks.words < policy.fail_below_words:
+        return "fail"
+    if (checks.words >= policy.pass_min_words
+            and checks.sources >= policy.pass_min_sources
+            and checks.coverage >= policy.pass_min_coverage):
+        return "pass"
+    return None
@@ -1,13 +1,18 @@
-from typing import Literal
+import asyncio
+from typing import Literal, Optional
 
-from langchain.chat_models import init_chat_model
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.constants import Send
 from langgraph.graph import START, END, StateGraph
 from langgraph.types import interrupt, Command
 
+from checkpoints import create_checkpointer
+from models import MODELS
+from context_budget import source_budget
+from plan_parser import SectionStreamParser
+from grading import GradingPolicy, check_section, grade_locally
+from metrics import SECTION_GRADES
 from state import (
     ReportStateInput,
     ReportStateOutput,
@@ -15,7 +20,10 @@ from state import (
     ReportState,
     SectionState,
     SectionOutputState,
+    Section,
     Queries,
+    BatchQueries,
+    SearchQuery,
     Feedback
 )
 
@@ -23,6 +31,7 @@ from prompts import (
     report_planner_query_writer_instructions,
     report_planner_instructions,
     query_writer_instructions, 
+    batch_query_writer_instructions,
     section_writer_instructions,
     final_section_writer_instructions,
     section_grader_instructions,
@@ -31,7 +40,7 @@ from prompts import (
 
 from configuration import Configuration
 from utils import (
-    init_model_with_provider,
+    config_flag,
     format_sections, 
     get_config_value, 
     get_search_params, 
@@ -76,25 +85,18 @@ async def generate_report_plan(state: ReportState, config: RunnableConfig):
     # Set writer model (model used for query writing)
     writer_provider = get_config_value(configurable.writer_provider)
     writer_model_name = get_config_value(configurable.writer_model)
-    writer_model = init_model_with_provider(writer_model_name, writer_provider) 
-    structured_llm = writer_model.with_structured_output(Queries)
+    structured_llm = MODELS.get_structured(writer_model_name, writer_provider, Queries)
 
     # Format system instructions
     system_instructions_query = report_planner_query_writer_instructions.format(topic=topic, report_organization=report_structure, number_of_queries=number_of_queries)
 
     # Generate queries  
-    results = structured_llm.invoke([SystemMessage(content=system_instructions_query),
-                                     HumanMessage(content="Generate search queries that will help with planning the sections of the report.")])
+    results = await structured_llm.ainvoke([SystemMessage(content=system_instructions_query),
+                                           HumanMessage(content="Generate search queries that will help with planning the sections of the report.")])
 
     # Web search
     query_list = [query.search_query for query in results.queries]
 
-    # Search the web with parameters
-    source_str = await select_and_execute_search(search_api, query_list, params_to_pass)
-
-    # Format system instructions
-    system_instructions_sections = report_planner_instructions.format(topic=topic, report_organization=report_structure, context=source_str, feedback=feedback)
-
     # Get the planner
     planner_provider = get_config_value(configurable.planner_provider)
     planner_model = get_config_value(configurable.planner_model)
@@ -102,67 +104,201 @@ async def generate_report_plan(state: ReportState, config: RunnableConfig):
     # Report planner instructions
     planner_message = """Generate the sections of the report. Each section must have: name, description, research (boolean indicating if research is needed), and content fields.
                       Format your response as a valid JSON object containing a 'sections' array."""
+
+    # Fit the search results into what the rest of the planner prompt leaves of its context window
+    context_tokens = source_budget(planner_model,
+                                   report_planner_instructions.format(topic=topic, report_organization=report_structure, context="", feedback=feedback)
+                                   + planner_message)
+
+    # Search the web with parameters
+    source_str = await select_and_execute_search(search_api, query_list, params_to_pass,
+                                                 max_tokens=context_tokens, model=planner_model)
+
+    # Format system instructions
+    system_instructions_sections = report_planner_instructions.format(topic=topic, report_organization=report_structure, context=source_str, feedback=feedback)
     
-    # Run the planner with provider-specific handling
-    if planner_provider == "groq":
-        # For Groq, avoid using structured output directly
-        planner_llm = init_chat_model(model=planner_model, 
-                                      model_provider=planner_provider)
+    # Research started while the plan streams in, by section name
+    research_tasks = {}
+    try:
+        # Run the planner with provider-specific handling
+        if planner_provider == "groq":
+            # For Groq, avoid using structured output directly
+            planner_llm = MODELS.get(planner_model, planner_provider)
         
-        # Get raw response and parse manually
-        response = planner_llm.invoke([SystemMessage(content=system_instructions_sections),
-                                      HumanMessage(content=planner_message)])
+            planner_messages = [SystemMessage(content=system_instructions_sections),
+                                HumanMessage(content=planner_message)]
+
+            if config_flag(configurable.early_section_research):
+                # Stream the plan and research each section as soon as it is written
+                content, research_tasks = await stream_report_plan(planner_llm, planner_messages, topic, configurable)
+            else:
+                # Get raw response and parse manually
+                response = await planner_llm.ainvoke(planner_messages)
+                content = response.content
         
-        # Extract JSON from the response
-        import json
-        import re
+            # Extract JSON from the response
+            import json
+            import re
         
-        # Try to extract JSON using regex for flexibility
-        content = response.content
-        json_match = re.search(r'```json\s*([\s\S]*?)\s*```', content)
-        if json_match:
-            json_str = json_match.group(1)
-        else:
-            # If no code block, try to find JSON directly
-            json_str = re.search(r'(\{[\s\S]*\})', content).group(1)
+            # Try to extract JSON using regex for flexibility
+            json_match = re.search(r'```json\s*([\s\S]*?)\s*```', content)
+            if json_match:
+                json_str = json_match.group(1)
+            else:
+                # If no code block, try to find JSON directly
+                json_str = re.search(r'(\{[\s\S]*\})', content).group(1)
         
-        try:
-            # Parse the JSON
-            sections_data = json.loads(json_str)
-            # Convert to Section objects
-            from state import Section
-            sections = [Section(**section_data) for section_data in sections_data.get('sections', [])]
-        except Exception as e:
-            print(f"Error parsing sections JSON: {e}")
-            # Fallback to a basic structure
-            from state import Section
-            sections = [
-                Section(name="Introduction", description="Introduction to the topic", research=False, content=""),
-                Section(name="Main Content", description=f"Primary information about {topic}", research=True, content=""),
-                Section(name="Conclusion", description="Summary of findings", research=False, content="")
-            ]
-    else:
-        # For other providers like OpenAI, use structured output
-        if planner_model == "claude-3-7-sonnet-latest":
-            planner_llm = init_chat_model(model=planner_model, 
-                                        model_provider=planner_provider, 
-                                        max_tokens=20_000, 
-                                        thinking={"type": "enabled", "budget_tokens": 16_000})
+            try:
+                # Parse the JSON
+                sections_data = json.loads(json_str)
+                # Convert to Section objects
+                sections = [Section(**section_data) for section_data in sections_data.get('sections', [])]
+            except Exception as e:
+                print(f"Error parsing sections JSON: {e}")
+                # Fallback to a basic structure
+                sections = [
+                    Section(name="Introduction", description="Introduction to the topic", research=False, content=""),
+                    Section(name="Main Content", description=f"Primary information about {topic}", research=True, content=""),
+                    Section(name="Conclusion", description="Summary of findings", research=False, content="")
+                ]
         else:
-            planner_llm = init_chat_model(model=planner_model, 
-                                        model_provider=planner_provider)
+            # For other providers like OpenAI, use structured output
+            if planner_model == "claude-3-7-sonnet-latest":
+                structured_llm = MODELS.get_structured(planner_model, planner_provider, Sections,
+                                                       max_tokens=20_000,
+                                                       thinking={"type": "enabled", "budget_tokens": 16_000})
+            else:
+                structured_llm = MODELS.get_structured(planner_model, planner_provider, Sections)
         
-        # Generate the report sections with structured output
-        structured_llm = planner_llm.with_structured_output(Sections)
-        report_sections = structured_llm.invoke([SystemMessage(content=system_instructions_sections),
-                                                HumanMessage(content=planner_message)])
+            # Generate the report sections with structured output
+            report_sections = await structured_llm.ainvoke([SystemMessage(content=system_instructions_sections),
+                                                          HumanMessage(content=planner_message)])
         
-        # Get sections
-        sections = report_sections.sections
+            # Get sections
+            sections = report_sections.sections
+
+        section_research = await collect_section_research(research_tasks, sections)
+    except BaseException:
+        # Research still running is not wanted once planning fails or is cancelled
+        for task in research_tasks.values():
+            task.cancel()
+        raise
+
+    return {"sections": sections, "section_research": section_research}
+
+async def stream_report_plan(planner_llm, messages: list, topic: str, configurable: Configuration) -> tuple[str, dict[str, asyncio.Task]]:
+    """Stream the planner's response, starting research on each section as soon as it is complete.
+
+    Query writing and web search of the first sections overlap with the
+    planner writing the rest of the plan.
+
+    Args:
+        planner_llm: Planner model returning the plan as JSON text
+        messages: Planner prompt
+        topic: The report topic
+        configurable: Configuration for the writer model and search API
+
+    Returns:
+        The full response text, and the research task of each section by name
+    """
+
+    parser = SectionStreamParser()
+    chunks = []
+    research_tasks = {}
+    try:
+        async for chunk in planner_llm.astream(messages):
+            text = chunk.content if isinstance(chunk.content, str) else ""
+            chunks.append(text)
+            for section_data in parser.feed(text):
+                try:
+                    section = Section(**section_data)
+                except Exception:
+                    # The full response is parsed again once it is complete
+                    continue
+                if section.research and section.name not in research_tasks:
+                    research_tasks[section.name] = asyncio.create_task(research_section(topic, section, configurable))
+    except BaseException:
+        for task in research_tasks.values():
+            task.cancel()
+        raise
+    return "".join(chunks), research_tasks
+
+async def research_section(topic: str, section: Section, configurable: Configuration) -> dict:
+    """Write search queries for a section and run its first web search."""
+    search_queries = await write_section_queries(topic, section, configurable)
+    source_str = await search_section_sources(topic, section, search_queries, configurable)
+    return {"section": section, "search_queries": search_queries, "source_str": source_str}
+
+async def collect_section_research(research_tasks: dict[str, asyncio.Task], sections: list[Section]) -> dict[str, dict]:
+    """Wait for the research started while planning, keeping what belongs to a planned section.
+
+    Research is dropped, to be redone by the section's subgraph, if it
+    failed or if the final plan changed the section from the one it started for.
+    """
+
+    planned = {section.name: section for section in sections if section.research}
+    section_research = {}
+    for name, task in research_tasks.items():
+        early_section = None
+        if name in planned:
+            try:
+                research = await task
+                early_section = research.pop("section")
+            except Exception as e:
+                print(f"Error researching section '{name}' while planning: {e}")
+        else:
+            task.cancel()
+        if early_section is not None and early_section.description == planned[name].description:
+            section_research[name] = research
+    return section_research
+
+async def generate_section_queries(topic: str, sections: list, configurable: Configuration) -> dict[str, list[SearchQuery]]:
+    """Generate the first search queries of every researched section in one call.
 
-    return {"sections": sections}
+    Used with `batch_section_queries`, in place of one `generate_queries`
+    call per section. Sections the model leaves out, or every section if
+    the call fails, are returned without queries and generate their own.
+
+    Args:
+        topic: The report topic
+        sections: Planned sections that need research
+        configurable: Configuration with the writer model and number of queries
+
+    Returns:
+        Dict of search queries by section name
+    """
+
+    number_of_queries = configurable.number_of_queries
+    writer_provider = get_config_value(configurable.writer_provider)
+    writer_model_name = get_config_value(configurable.writer_model)
+    structured_llm = MODELS.get_structured(writer_model_name, writer_provider, BatchQueries)
 
-def human_feedback(state: ReportState, config: RunnableConfig) -> Command[Literal["generate_report_plan","build_section_with_web_research"]]:
+    sections_str = "\n\n".join(
+        f"Section: {section.name}\n"
+        f"Description: {section.description}"
+        for section in sections
+    )
+    system_instructions = batch_query_writer_instructions.format(topic=topic,
+                                                                 sections=sections_str,
+                                                                 number_of_queries=number_of_queries)
+
+    # Match entries to sections by name, forgiving case and surrounding whitespace
+    names = {section.name.strip().lower(): section.name for section in sections}
+    queries = {}
+    try:
+        results = await structured_llm.ainvoke([SystemMessage(content=system_instructions),
+                                               HumanMessage(content="Generate search queries for each of the provided sections.")])
+        for entry in results.sections:
+            name = names.get(entry.section_name.strip().lower())
+            found = [query for query in entry.queries if query.search_query]
+            if name is not None and found:
+                queries[name] = found[:int(number_of_queries)]
+    except Exception as e:
+        print(f"Error generating batched section queries, falling back to per-section queries: {e}")
+        return {}
+    return queries
+
+async def human_feedback(state: ReportState, config: RunnableConfig) -> Command[Literal["generate_report_plan","build_section_with_web_research"]]:
     """Get human feedback on the report plan and route to next steps.
     
     This node:
@@ -202,11 +338,29 @@ def human_feedback(state: ReportState, config: RunnableConfig) -> Command[Litera
         # Treat this as approve and kick off section writing
         # return Command(goto=[
     # print("Feedback",interrupt_message)
+    # Sections researched while planning go straight to writing; with batched
+    # queries, the rest start from their search instead of writing their own queries
+    configurable = Configuration.from_runnable_config(config)
+    section_research = state.get("section_research") or {}
+    research_sections = [s for s in sections if s.research]
+    unresearched = [s for s in research_sections if s.name not in section_research]
+    section_queries = {}
+    if config_flag(configurable.batch_section_queries) and unresearched:
+        section_queries = await generate_section_queries(topic, unresearched, configurable)
+
+    def section_input(section):
+        payload = {"topic": topic, "section": section, "search_iterations": 0}
+        if section.name in section_research:
+            payload.update(section_research[section.name], search_iterations=1)
+        elif section.name in section_queries:
+            payload["search_queries"] = section_queries[section.name]
+        return payload
+
+    # The Sends carry each section's research; clear it so later checkpoints do not keep a copy
     return Command(goto=[
-            Send("build_section_with_web_research", {"topic": topic, "section": s, "search_iterations": 0}) 
-            for s in sections 
-            if s.research
-        ])
+            Send("build_section_with_web_research", section_input(s))
+            for s in research_sections
+        ], update={"section_research": {}})
     
     # If the user provides feedback, regenerate the report plan 
     # elif isinstance(feedback, str):
@@ -216,7 +370,7 @@ def human_feedback(state: ReportState, config: RunnableConfig) -> Command[Litera
     # else:
         # raise TypeError(f"Interrupt value of type {type(feedback)} is not supported.")
     
-def generate_queries(state: SectionState, config: RunnableConfig):
+async def generate_queries(state: SectionState, config: RunnableConfig):
     """Generate search queries for researching a specific section.
     
     This node uses an LLM to generate targeted search queries based on the 
@@ -236,24 +390,37 @@ def generate_queries(state: SectionState, config: RunnableConfig):
 
     # Get configuration
     configurable = Configuration.from_runnable_config(config)
+
+    # Generate queries, different from the ones already searched when the first search fell short
+    queries = await write_section_queries(topic, section, configurable, state.get("search_queries"))
+    # print("\n-------Queries:----------",queries)
+    return {"search_queries": queries}
+
+async def write_section_queries(topic: str, section: Section, configurable: Configuration,
+                                searched: Optional[list[SearchQuery]] = None) -> list[SearchQuery]:
+    """Generate the search queries of one section with the writer model, avoiding those `searched` already."""
+
     number_of_queries = configurable.number_of_queries
 
     # Generate queries 
     writer_provider = get_config_value(configurable.writer_provider)
     writer_model_name = get_config_value(configurable.writer_model)
-    writer_model = init_chat_model(model=writer_model_name, model_provider=writer_provider) 
-    structured_llm = writer_model.with_structured_output(Queries)
+    structured_llm = MODELS.get_structured(writer_model_name, writer_provider, Queries)
 
     # Format system instructions
     system_instructions = query_writer_instructions.format(topic=topic, 
                                                            section_topic=section.description, 
                                                            number_of_queries=number_of_queries)
 
+    request = "Generate search queries on the provided topic."
+    if searched:
+        request += (" These queries were already searched and found too little to write the section; "
+                    "write different ones:\n" + "\n".join(f"- {query.search_query}" for query in searched))
+
     # Generate queries  
-    queries = structured_llm.invoke([SystemMessage(content=system_instructions),
-                                     HumanMessage(content="Generate search queries on the provided topic.")])
-    # print("\n-------Queries:----------",queries)
-    return {"search_queries": queries.queries}
+    queries = await structured_llm.ainvoke([SystemMessage(content=system_instructions),
+                                           HumanMessage(content=request)])
+    return queries.queries
 
 async def search_web(state: SectionState, config: RunnableConfig):
     """Execute web searches for the section queries.
@@ -272,23 +439,43 @@ async def search_web(state: SectionState, config: RunnableConfig):
     """
 
     # Get state
+    topic = state["topic"]
+    section = state["section"]
     search_queries = state["search_queries"]
 
     # Get configuration
     configurable = Configuration.from_runnable_config(config)
+
+    # Search the web with parameters
+    source_str = await search_section_sources(topic, section, search_queries, configurable)
+
+    return {"source_str": source_str, "search_iterations": state["search_iterations"] + 1}
+
+async def search_section_sources(topic: str, section: Section, search_queries: list[SearchQuery], configurable: Configuration) -> str:
+    """Run a section's search queries and format the results for its writer prompt."""
+
     search_api = get_config_value(configurable.search_api)
     search_api_config = configurable.search_api_config or {}  # Get the config dict, default to empty
     params_to_pass = get_search_params(search_api, search_api_config)  # Filter parameters
 
+    # The results go into the writer's prompt; fit them into what the rest of it leaves of the window
+    writer_model_name = get_config_value(configurable.writer_model)
+    context_tokens = source_budget(writer_model_name,
+                                   section_writer_instructions
+                                   + section_writer_inputs.format(topic=topic,
+                                                                  section_name=section.name,
+                                                                  section_topic=section.description,
+                                                                  context="",
+                                                                  section_content=section.content))
+
     # Web search
     query_list = [query.search_query for query in search_queries]
     # print("\n-------Query List:----------",query_list)
     # Search the web with parameters
-    source_str = await select_and_execute_search(search_api, query_list, params_to_pass)
-
-    return {"source_str": source_str, "search_iterations": state["search_iterations"] + 1}
+    return await select_and_execute_search(search_api, query_list, params_to_pass,
+                                           max_tokens=context_tokens, model=writer_model_name)
 
-def write_section(state: SectionState, config: RunnableConfig) -> Command[Literal[END, "search_web"]]:
+async def write_section(state: SectionState, config: RunnableConfig) -> Command[Literal[END, "search_web", "generate_queries"]]:
     """Write a section of the report and evaluate if more research is needed.
     
     This node:
@@ -324,14 +511,39 @@ def write_section(state: SectionState, config: RunnableConfig) -> Command[Litera
     # Generate section  
     writer_provider = get_config_value(configurable.writer_provider)
     writer_model_name = get_config_value(configurable.writer_model)
-    writer_model = init_chat_model(model=writer_model_name, model_provider=writer_provider) 
+    writer_model = MODELS.get(writer_model_name, writer_provider)
 
-    section_content = writer_model.invoke([SystemMessage(content=section_writer_instructions),
-                                           HumanMessage(content=section_writer_inputs_formatted)])
+    section_content = await writer_model.ainvoke([SystemMessage(content=section_writer_instructions),
+                                                 HumanMessage(content=section_writer_inputs_formatted)])
     
     # Write content to the section object  
     section.content = section_content.content
 
+    # At the depth limit the section is published whatever its grade, so skip grading it
+    if state["search_iterations"] >= configurable.max_search_depth:
+        SECTION_GRADES.inc(decided_by="depth_limit", grade="none")
+        return  Command(
+        update={"completed_sections": [section]},
+        goto=END
+    )
+
+    # Settle clear passes and failures with local checks, leaving the rest to the grader model
+    checks = check_section(section.content, section.description)
+    grade = grade_locally(GradingPolicy.from_config(configurable.grading_config), checks)
+    if grade == "pass":
+        SECTION_GRADES.inc(decided_by="local", grade="pass")
+        return  Command(
+        update={"completed_sections": [section]},
+        goto=END
+    )
+    if grade == "fail":
+        # Too short to grade: the sources were thin, so write new queries and search again
+        SECTION_GRADES.inc(decided_by="local", grade="fail")
+        return  Command(
+        update={"section": section},
+        goto="generate_queries"
+        )
+
     # Grade prompt 
     section_grader_message = ("Grade the report and consider follow-up questions for missing information. "
                               "If the grade is 'pass', return empty strings for all follow-up queries. "
@@ -348,19 +560,18 @@ def write_section(state: SectionState, config: RunnableConfig) -> Command[Litera
 
     if planner_model == "claude-3-7-sonnet-latest":
         # Allocate a thinking budget for claude-3-7-sonnet-latest as the planner model
-        reflection_model = init_chat_model(model=planner_model, 
-                                           model_provider=planner_provider, 
-                                           max_tokens=20_000, 
-                                           thinking={"type": "enabled", "budget_tokens": 16_000}).with_structured_output(Feedback)
+        reflection_model = MODELS.get_structured(planner_model, planner_provider, Feedback, cache=False,
+                                                 max_tokens=20_000,
+                                                 thinking={"type": "enabled", "budget_tokens": 16_000})
     else:
-        reflection_model = init_chat_model(model=planner_model, 
-                                           model_provider=planner_provider).with_structured_output(Feedback)
+        reflection_model = MODELS.get_structured(planner_model, planner_provider, Feedback, cache=False)
     # Generate feedback
-    feedback = reflection_model.invoke([SystemMessage(content=section_grader_instructions_formatted),
-                                        HumanMessage(content=section_grader_message)])
+    feedback = await reflection_model.ainvoke([SystemMessage(content=section_grader_instructions_formatted),
+                                              HumanMessage(content=section_grader_message)])
+    SECTION_GRADES.inc(decided_by="model", grade=feedback.grade)
 
-    # If the section is passing or the max search depth is reached, publish the section to completed sections 
-    if feedback.grade == "pass" or state["search_iterations"] >= configurable.max_search_depth:
+    # If the section is passing, publish the section to completed sections 
+    if feedback.grade == "pass":
         # Publish the section to completed sections 
         return  Command(
         update={"completed_sections": [section]},
@@ -374,7 +585,7 @@ def write_section(state: SectionState, config: RunnableConfig) -> Command[Litera
         goto="search_web"
         )
     
-def write_final_sections(state: SectionState, config: RunnableConfig):
+async def write_final_sections(state: SectionState, config: RunnableConfig):
     """Write sections that don't require research using completed sections as context.
     
     This node handles sections like conclusions or summaries that build on
@@ -402,10 +613,10 @@ def write_final_sections(state: SectionState, config: RunnableConfig):
     # Generate section  
     writer_provider = get_config_value(configurable.writer_provider)
     writer_model_name = get_config_value(configurable.writer_model)
-    writer_model = init_chat_model(model=writer_model_name, model_provider=writer_provider) 
+    writer_model = MODELS.get(writer_model_name, writer_provider)
     
-    section_content = writer_model.invoke([SystemMessage(content=system_instructions),
-                                           HumanMessage(content="Generate a report section based on the provided sources.")])
+    section_content = await writer_model.ainvoke([SystemMessage(content=system_instructions),
+                                                 HumanMessage(content="Generate a report section based on the provided sources.")])
     
     # Write content to section 
     section.content = section_content.content
@@ -471,6 +682,12 @@ def initiate_final_section_writing(state: ReportState):
         if not s.research
     ]
 
+def route_section_start(state: SectionState) -> Literal["generate_queries", "search_web", "write_section"]:
+    """Skip the research steps a section already had done while it was being planned."""
+    if state.get("source_str"):
+        return "write_section"
+    return "search_web" if state.get("search_queries") else "generate_queries"
+
 # Add this fallback node at the end of the file, before compiling the graph
 def fallback_handler(state: ReportState) -> ReportStateOutput:
     """Handle errors and provide a fallback response."""
@@ -502,7 +719,7 @@ section_builder.add_node("search_web", search_web)
 section_builder.add_node("write_section", write_section)
 
 # Add edges
-section_builder.add_edge(START, "generate_queries")
+section_builder.add_conditional_edges(START, route_section_start, ["generate_queries", "search_web", "write_section"])
 section_builder.add_edge("generate_queries", "search_web")
 section_builder.add_edge("search_web", "write_section")
 
@@ -526,5 +743,6 @@ builder.add_conditional_edges("gather_completed_sections", initiate_final_sectio
 builder.add_edge("write_final_sections", "compile_final_report")
 builder.add_edge("compile_final_report", END)
 
-memory = MemorySaver()
+# Checkpoints on disk with JOB_STORE=sqlite, so interrupted jobs resume where they stopped
+memory = create_checkpointer()
 graph = builder.compile(checkpointer=memory)
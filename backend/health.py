@@ -0,0 +1,241 @@
+import os
+import time
+import asyncio
+import threading
+import concurrent.futures
+from collections import deque
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+class EventLoopMonitor:
+    """Measures how late the event loop resumes a task that sleeps for `interval`.
+
+    Lag is the time the loop spent running other callbacks past the wakeup
+    deadline: blocking calls on the loop and CPU-bound graph work show up
+    here long before requests start timing out.
+    """
+
+    def __init__(self, interval: float = 0.25, window: int = 240):
+        self.interval = interval
+        self.samples: deque = deque(maxlen=window)
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.task = asyncio.create_task(self._run(), name="event-loop-monitor")
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    async def _run(self):
+        while True:
+            started_at = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.monotonic() - started_at - self.interval))
+
+    def snapshot(self) -> Dict[str, float]:
+        """Latest and worst lag in milliseconds over the last `window` samples."""
+        if not self.samples:
+            return {"lag_ms": 0.0, "max_lag_ms": 0.0}
+        return {"lag_ms": round(self.samples[-1] * 1000, 1),
+                "max_lag_ms": round(max(self.samples) * 1000, 1)}
+
+class InstrumentedThreadPoolExecutor(concurrent.futures.ThreadPoolExecutor):
+    """Thread pool that counts running and waiting calls.
+
+    Installed as the loop's default executor, so it sees the blocking
+    search clients and sync model calls that LangChain offloads with
+    `run_in_executor(None, ...)`.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, thread_name_prefix: str = ""):
+        super().__init__(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self.counts_lock = threading.Lock()
+        self.submitted = 0
+        self.running = 0
+
+    def submit(self, fn, /, *args, **kwargs):
+        def run():
+            with self.counts_lock:
+                self.running += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self.counts_lock:
+                    self.running -= 1
+                    self.submitted -= 1
+
+        with self.counts_lock:
+            self.submitted += 1
+        try:
+            return super().submit(run)
+        except BaseException:
+            with self.counts_lock:
+                self.submitted -= 1
+            raise
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.counts_lock:
+            running, waiting = self.running, self.submitted - self.running
+        return {"threads": self._max_workers, "running": running, "waiting": waiting,
+                "utilization": round(running / self._max_workers, 3)}
+
+class CircuitState:
+    CLOSED = "closed"  # Calls go through
+    OPEN = "open"  # Calls fail fast until the reset timeout has passed
+    HALF_OPEN = "half_open"  # The next call decides whether to close or reopen
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one provider."""
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return CircuitState.CLOSED
+        if time.time() - self.opened_at >= self.reset_seconds:
+            return CircuitState.HALF_OPEN
+        return CircuitState.OPEN
+
+    def allow(self) -> bool:
+        return self.state != CircuitState.OPEN
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self, error: Optional[str] = None):
+        self.failures += 1
+        self.last_error = error
+        if self.state == CircuitState.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = self.state
+        result = {"state": state, "consecutive_failures": self.failures, "last_error": self.last_error}
+        if state == CircuitState.OPEN:
+            result["retry_in_seconds"] = round(self.opened_at + self.reset_seconds - time.time(), 1)
+        return result
+
+class ProviderCircuits:
+    """Circuit breakers of every search API and model provider, keyed "<kind>:<provider>".
+
+    Like the metrics registry, process-pool workers `drain` the outcomes
+    they saw during a run and the parent `merge`s them, so /health shows
+    provider state for every report the server ran.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.lock = threading.Lock()
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.outcomes: List[Tuple[str, bool, Optional[str]]] = []
+
+    def _breaker(self, name: str) -> CircuitBreaker:
+        if name not in self.breakers:
+            self.breakers[name] = CircuitBreaker(self.failure_threshold, self.reset_seconds)
+        return self.breakers[name]
+
+    def allow(self, kind: str, provider: str) -> bool:
+        with self.lock:
+            return self._breaker(f"{kind}:{provider}").allow()
+
+    def record(self, kind: str, provider: str, ok: bool, error: Optional[str] = None):
+        self._apply(f"{kind}:{provider}", ok, error)
+        with self.lock:
+            self.outcomes.append((f"{kind}:{provider}", ok, error))
+
+    def _apply(self, name: str, ok: bool, error: Optional[str]):
+        with self.lock:
+            breaker = self._breaker(name)
+            if ok:
+                breaker.record_success()
+            else:
+                breaker.record_failure(error)
+
+    def drain(self) -> List[Tuple[str, bool, Optional[str]]]:
+        """Take the outcomes recorded since the last drain."""
+        with self.lock:
+            outcomes, self.outcomes = self.outcomes, []
+        return outcomes
+
+    def merge(self, outcomes: List[Tuple[str, bool, Optional[str]]]):
+        """Replay outcomes drained from another process."""
+        for name, ok, error in outcomes:
+            self._apply(name, ok, error)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            return {name: breaker.snapshot() for name, breaker in sorted(self.breakers.items())}
+
+PROVIDER_CIRCUITS = ProviderCircuits(
+    failure_threshold=int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5")),
+    reset_seconds=float(os.getenv("CIRCUIT_RESET_SECONDS", "30")),
+)
+
+class ProviderOutcomeCallback(BaseCallbackHandler):
+    """Feeds the result of every model call into the provider's circuit breaker."""
+
+    def __init__(self):
+        self.providers: Dict[Any, str] = {}
+
+    def _start(self, run_id, metadata, serialized):
+        self.providers[run_id] = (metadata or {}).get("ls_provider") or (serialized or {}).get("id", ["unknown"])[-1]
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, metadata, serialized)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, metadata, serialized)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        provider = self.providers.pop(run_id, None)
+        if provider is not None:
+            PROVIDER_CIRCUITS.record("llm", provider, True)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        provider = self.providers.pop(run_id, None)
+        if provider is not None:
+            PROVIDER_CIRCUITS.record("llm", provider, False, f"{type(error).__name__}: {error}")
+
+class Readiness:
+    """Warm-up state of the components a server or worker needs before taking jobs."""
+
+    PENDING = "pending"
+    READY = "ready"
+
+    def __init__(self):
+        self.components: Dict[str, str] = {}
+
+    def pending(self, name: str):
+        self.components[name] = self.PENDING
+
+    def ready(self, name: str):
+        self.components[name] = self.READY
+
+    def failed(self, name: str, error: str):
+        self.components[name] = f"failed: {error}"
+
+    @property
+    def is_ready(self) -> bool:
+        return bool(self.components) and all(state == self.READY for state in self.components.values())
+
+    async def track(self, name: str, warm_up: Awaitable[Any]):
+        """Mark `name` ready once `warm_up` finishes, or failed if it raises."""
+        self.pending(name)
+        try:
+            await warm_up
+        except Exception as e:
+            print(f"Warm-up of {name} failed: {str(e)}")
+            self.failed(name, str(e))
+        else:
+            self.ready(name)
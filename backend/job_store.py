@@ -0,0 +1,281 @@
+import os
+import json
+import zlib
+import sqlite3
+import asyncio
+import threading
+import concurrent.futures
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+def connect_sqlite(path: str) -> sqlite3.Connection:
+    """Open a WAL-mode connection that any thread may use under its owner's lock.
+
+    A call that finds another process holding the write lock retries for
+    SQLITE_BUSY_TIMEOUT_SECONDS before failing with "database is locked".
+    """
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None,
+                           timeout=float(os.getenv("SQLITE_BUSY_TIMEOUT_SECONDS", "5")))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+def stores_block() -> bool:
+    """Whether the job stores wait on disk and on other processes, i.e. live in SQLite."""
+    return os.getenv("JOB_STORE", "memory") == "sqlite"
+
+_store_thread: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_store_thread_pid: Optional[int] = None
+
+def store_thread() -> concurrent.futures.ThreadPoolExecutor:
+    """The thread that runs this process's job store calls, one at a time and in order."""
+    global _store_thread, _store_thread_pid
+    if _store_thread is None or _store_thread_pid != os.getpid():
+        _store_thread = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-store")
+        _store_thread_pid = os.getpid()
+    return _store_thread
+
+def _report_store_error(future: concurrent.futures.Future):
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Error in job store call: {future.exception()}")
+
+async def in_store_thread(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run job store work without blocking the event loop.
+
+    SQLite-backed stores run `fn` on the store thread, after every call
+    made before it; in-memory stores never block and run it right here.
+    """
+    if not stores_block():
+        return fn(*args, **kwargs)
+    return await asyncio.wrap_future(store_thread().submit(fn, *args, **kwargs))
+
+async def drain_store_thread():
+    """Wait for every job store call made so far, e.g. before closing the stores."""
+    await in_store_thread(lambda: None)
+
+def defer_to_store_thread(fn: Callable[..., Any], *args: Any, **kwargs: Any):
+    """Like `in_store_thread` for callers that cannot wait, such as graph event callbacks.
+
+    The call still runs before any store call made after it.
+    """
+    if not stores_block():
+        fn(*args, **kwargs)
+        return
+    store_thread().submit(fn, *args, **kwargs).add_done_callback(_report_store_error)
+
+class JobStore:
+    """Storage for job records, keyed by job id.
+
+    A record is a plain dict with at least "status" and "created_at"; the
+    optional "report" holds the finished report. `update` sets fields and
+    removes any field given as None.
+    """
+
+    def create(self, job_id: str, record: Dict[str, Any]):
+        raise NotImplementedError
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def update(self, job_id: str, **fields: Any):
+        raise NotImplementedError
+
+    def increment(self, job_id: str, field: str, amount: int = 1, default: int = 0) -> Optional[int]:
+        """Atomically add `amount` to a numeric field, counting from `default` when it is unset.
+
+        Returns the new value, or None if the job does not exist.
+        """
+        raise NotImplementedError
+
+    def delete(self, job_id: str):
+        raise NotImplementedError
+
+    def evict_older_than(self, cutoff: float) -> List[str]:
+        """Delete every job created before `cutoff` and return their ids."""
+        raise NotImplementedError
+
+    def ids_with_status(self, *statuses: str) -> List[str]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __contains__(self, job_id: str) -> bool:
+        return self.get(job_id) is not None
+
+class MemoryJobStore(JobStore):
+    """Process-local job store; records are lost on restart."""
+
+    def __init__(self):
+        # Insertion order is creation order, so eviction stops at the first live job
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+
+    def create(self, job_id: str, record: Dict[str, Any]):
+        self.jobs[job_id] = dict(record)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        record = self.jobs.get(job_id)
+        return dict(record) if record is not None else None
+
+    def update(self, job_id: str, **fields: Any):
+        record = self.jobs.get(job_id)
+        if record is None:
+            return
+        for key, value in fields.items():
+            if value is None:
+                record.pop(key, None)
+            else:
+                record[key] = value
+
+    def increment(self, job_id: str, field: str, amount: int = 1, default: int = 0) -> Optional[int]:
+        record = self.jobs.get(job_id)
+        if record is None:
+            return None
+        record[field] = record.get(field, default) + amount
+        return record[field]
+
+    def delete(self, job_id: str):
+        self.jobs.pop(job_id, None)
+
+    def evict_older_than(self, cutoff: float) -> List[str]:
+        expired = []
+        for job_id, record in self.jobs.items():
+            if record["created_at"] >= cutoff:
+                break
+            expired.append(job_id)
+        for job_id in expired:
+            del self.jobs[job_id]
+        return expired
+
+    def ids_with_status(self, *statuses: str) -> List[str]:
+        return [job_id for job_id, record in self.jobs.items() if record["status"] in statuses]
+
+class SQLiteJobStore(JobStore):
+    """Job store in a SQLite database shared by every server process on a host.
+
+    The database runs in WAL mode so readers never block the writer. Status
+    and creation time are indexed columns, which turns TTL eviction into an
+    indexed range delete; the report body is stored zlib-compressed and the
+    remaining fields as JSON.
+    """
+
+    def __init__(self, path: str = "jobs.db", table: str = "jobs"):
+        self.path = path
+        self.table = table
+        self.lock = threading.Lock()
+        self.conn = connect_sqlite(path)
+        self.conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                data TEXT NOT NULL,
+                report BLOB
+            );
+            CREATE INDEX IF NOT EXISTS idx_{table}_status ON {table}(status);
+            CREATE INDEX IF NOT EXISTS idx_{table}_created_at ON {table}(created_at);
+        """)
+
+    @staticmethod
+    def _split(record: Dict[str, Any]):
+        data = {k: v for k, v in record.items() if k not in ("status", "created_at", "report")}
+        report = record.get("report")
+        report_blob = zlib.compress(json.dumps(report).encode("utf-8")) if report else None
+        return record["status"], record["created_at"], json.dumps(data), report_blob
+
+    @staticmethod
+    def _join(row) -> Dict[str, Any]:
+        status, created_at, data, report_blob = row
+        record = json.loads(data)
+        record["status"] = status
+        record["created_at"] = created_at
+        if report_blob is not None:
+            record["report"] = json.loads(zlib.decompress(report_blob))
+        return record
+
+    def create(self, job_id: str, record: Dict[str, Any]):
+        with self.lock:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (job_id, status, created_at, data, report) VALUES (?, ?, ?, ?, ?)",
+                (job_id, *self._split(record)),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self.conn.execute(
+                f"SELECT status, created_at, data, report FROM {self.table} WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return self._join(row) if row else None
+
+    def update(self, job_id: str, **fields: Any):
+        with self.lock:
+            # Read-modify-write under an immediate transaction so other processes cannot interleave
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    f"SELECT status, created_at, data, report FROM {self.table} WHERE job_id = ?", (job_id,)
+                ).fetchone()
+                if row is None:
+                    self.conn.execute("COMMIT")
+                    return
+                record = self._join(row)
+                for key, value in fields.items():
+                    if value is None:
+                        record.pop(key, None)
+                    else:
+                        record[key] = value
+                self.conn.execute(
+                    f"UPDATE {self.table} SET status = ?, created_at = ?, data = ?, report = ? WHERE job_id = ?",
+                    (*self._split(record), job_id),
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def increment(self, job_id: str, field: str, amount: int = 1, default: int = 0) -> Optional[int]:
+        path = f"$.{field}"
+        with self.lock:
+            # One statement, so concurrent increments from other processes cannot be lost
+            row = self.conn.execute(
+                f"UPDATE {self.table} SET data = json_set(data, ?, COALESCE(json_extract(data, ?), ?) + ?) "
+                "WHERE job_id = ? RETURNING json_extract(data, ?)",
+                (path, path, default, amount, job_id, path),
+            ).fetchone()
+        return row[0] if row else None
+
+    def delete(self, job_id: str):
+        with self.lock:
+            self.conn.execute(f"DELETE FROM {self.table} WHERE job_id = ?", (job_id,))
+
+    def evict_older_than(self, cutoff: float) -> List[str]:
+        with self.lock:
+            rows = self.conn.execute(
+                f"DELETE FROM {self.table} WHERE created_at < ? RETURNING job_id", (cutoff,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def ids_with_status(self, *statuses: str) -> List[str]:
+        placeholders = ",".join("?" for _ in statuses)
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT job_id FROM {self.table} WHERE status IN ({placeholders}) ORDER BY created_at", statuses
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def create_job_store(table: str = "jobs") -> JobStore:
+    """Create the job store selected by JOB_STORE ("memory" or "sqlite").
+
+    `table` separates kinds of records (jobs, batches) sharing one database.
+    """
+    backend = os.getenv("JOB_STORE", "memory")
+    if backend == "sqlite":
+        return SQLiteJobStore(os.getenv("JOB_STORE_PATH", "jobs.db"), table)
+    if backend == "memory":
+        return MemoryJobStore()
+    raise ValueError(f"Unsupported job store: {backend}")
@@ -0,0 +1,316 @@
+import os
+import time
+from typing import Dict, List, Optional, Any
+
+from pydantic import BaseModel, Field
+from dotenv import load_dotenv
+
+from events import create_event_log
+from job_store import create_job_store, defer_to_store_thread, in_store_thread
+from report_cache import create_report_cache
+from metrics import JOB_DURATION
+
+# Load environment variables before the stores read their settings
+load_dotenv()
+
+# Models for API requests and responses
+class ReportRequest(BaseModel):
+    topic: str = Field(..., description="The topic for the report")
+    config_overrides: Optional[Dict[str, Any]] = Field(None, description="Optional configuration overrides")
+    priority: int = Field(0, description="Scheduling priority; higher priority jobs are started first")
+    stream_tokens: bool = Field(False, description="Stream section text to /jobs/{job_id}/events as it is written")
+    use_cache: bool = Field(True, description="Reuse a cached or in-progress report for an identical request")
+
+class BatchReportRequest(BaseModel):
+    topics: Optional[List[str]] = Field(None, description="Topics to generate one report each for")
+    topic: Optional[str] = Field(None, description="Topic to generate one report for per entry of report_structures")
+    report_structures: Optional[List[str]] = Field(None, description="Report structure variants for `topic`")
+    config_overrides: Optional[Dict[str, Any]] = Field(None, description="Configuration overrides applied to every report")
+    priority: int = Field(0, description="Scheduling priority of every report in the batch")
+    stream_tokens: bool = Field(False, description="Stream section text of every report as it is written")
+    use_cache: bool = Field(True, description="Reuse cached or in-progress reports for identical requests")
+
+    def expand(self) -> List[ReportRequest]:
+        """One report request per topic, or per report structure of the single topic."""
+        by_topics = bool(self.topics) and self.topic is None and self.report_structures is None
+        by_structures = not self.topics and bool(self.topic) and bool(self.report_structures)
+        if not (by_topics or by_structures):
+            raise ValueError("Provide either `topics`, or `topic` with `report_structures`")
+        shared = {"priority": self.priority, "stream_tokens": self.stream_tokens, "use_cache": self.use_cache}
+        if self.topics:
+            return [ReportRequest(topic=topic, config_overrides=self.config_overrides, **shared)
+                    for topic in self.topics]
+        return [ReportRequest(topic=self.topic,
+                              config_overrides={**(self.config_overrides or {}), "report_structure": structure},
+                              **shared)
+                for structure in self.report_structures]
+
+class ReportResponse(BaseModel):
+    topic: str = Field(..., description="The topic of the report")
+    content: str = Field(..., description="The generated report content")
+
+# Job store selected by JOB_STORE: in-memory, or SQLite shared by every server and worker process
+JOBS = create_job_store()
+JOB_EVENTS = create_event_log()  # Per-job event log behind /jobs/{job_id}/events
+BATCHES = create_job_store("batches")  # Groups of jobs submitted through /generate-reports
+REPORT_CACHE = create_report_cache()  # Finished reports and in-flight jobs by topic + configuration
+MAX_JOB_AGE_SECONDS = 3600  # 1 hour
+
+class JobStatus:
+    QUEUED = "queued"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class JobResult(BaseModel):
+    job_id: str
+    status: str
+    progress: float = 0.0
+    message: str = ""
+    report: Optional[ReportResponse] = None
+    position_in_queue: Optional[int] = None
+    estimated_time: Optional[int] = None
+    error: Optional[str] = None
+    partial_report: Optional[str] = None
+
+class BatchResult(BaseModel):
+    batch_id: str
+    status: str
+    progress: float = 0.0
+    total: int = 0
+    completed: int = 0
+    failed: int = 0
+    cancelled: int = 0
+    jobs: List[JobResult] = []
+
+def build_report_config(request: ReportRequest, thread_id: str) -> Dict[str, Any]:
+    """Build the graph config for a report request, applying its overrides."""
+    config_base = {
+        "configurable": {
+            "search_api": os.getenv("SEARCH_API"),
+            "planner_provider": os.getenv("PLANNER_PROVIDER"),
+            "planner_model": os.getenv("PLANNER_MODEL"),
+            "writer_provider": os.getenv("WRITER_PROVIDER"),
+            "writer_model": os.getenv("WRITER_MODEL"),
+            "thread_id": thread_id,
+        }
+    }
+
+    # Apply overrides
+    if request.config_overrides:
+        for key, value in request.config_overrides.items():
+            config_base["configurable"][key] = value
+
+    return config_base
+
+def publish_status(job_id: str):
+    """Publish the job's current status, progress and queue position as an event."""
+    job_data = JOBS.get(job_id)
+    JOB_EVENTS.publish(job_id, "status", {
+        "status": job_data["status"],
+        "progress": job_data["progress"],
+        "message": job_data["message"],
+        "position_in_queue": job_data.get("position_in_queue"),
+        "estimated_time": job_data.get("estimated_time"),
+    })
+
+def job_is_active(job_id: str) -> bool:
+    """Whether a job is still queued or running."""
+    job_data = JOBS.get(job_id)
+    return job_data is not None and job_data["status"] in (JobStatus.QUEUED, JobStatus.PROCESSING)
+
+def release_cache_key(job_id: str):
+    """Let identical requests start a new job instead of attaching to this one."""
+    job_data = JOBS.get(job_id)
+    if job_data and "cache_key" in job_data:
+        REPORT_CACHE.release(job_data["cache_key"], job_id)
+
+def fail_job(job_id: str, message: str, error: str):
+    """Mark a job as failed and publish the terminal event."""
+    job_data = JOBS.get(job_id)
+    if job_data is not None and job_data["status"] == JobStatus.CANCELLED:
+        return
+    release_cache_key(job_id)
+    JOBS.update(job_id,
+                status=JobStatus.FAILED,
+                message=message,
+                error=error)
+    JOB_EVENTS.publish(job_id, "failed", {"error": error})
+
+def cancel_job(job_id: str):
+    """Mark a job as cancelled and publish the terminal event."""
+    release_cache_key(job_id)
+    JOBS.update(job_id,
+                status=JobStatus.CANCELLED,
+                message="Job cancelled",
+                position_in_queue=None,
+                estimated_time=None)
+    JOB_EVENTS.publish(job_id, "cancelled", {})
+
+def apply_job_event(job_id: str, event: Dict[str, Any]):
+    """Apply a progress event from the running graph to the job record."""
+    job_data = JOBS.get(job_id)
+    if job_data is None or job_data["status"] == JobStatus.CANCELLED:
+        # A worker in another process may not have seen the cancellation yet
+        return
+    if event["type"] == "progress":
+        if (job_data["progress"], job_data["message"]) == (event["progress"], event["message"]):
+            return
+        JOBS.update(job_id, progress=event["progress"], message=event["message"])
+        JOB_EVENTS.publish(job_id, "progress", {"progress": event["progress"], "message": event["message"]})
+    else:
+        if event["type"] == "plan":
+            JOBS.update(job_id, plan=event["sections"])
+        elif event["type"] == "section":
+            completed = job_data.get("completed_sections", {})
+            completed[event["name"]] = event["content"]
+            JOBS.update(job_id, completed_sections=completed)
+        JOB_EVENTS.publish(job_id, event["type"], {k: v for k, v in event.items() if k != "type"})
+
+def assemble_partial_report(job_data: Dict[str, Any]) -> Optional[str]:
+    """Join the sections finished so far, in planned order."""
+    completed = job_data.get("completed_sections")
+    if not completed:
+        return None
+    return "\n\n".join(completed[name] for name in job_data.get("plan", []) if name in completed)
+
+def job_result(job_id: str, job_data: Optional[Dict[str, Any]] = None) -> JobResult:
+    """Build the API view of a stored job."""
+    job_data = job_data or JOBS.get(job_id)
+    result = JobResult(
+        job_id=job_id,
+        status=job_data["status"],
+        progress=job_data["progress"],
+        message=job_data["message"]
+    )
+
+    # Add optional fields if they exist
+    if "position_in_queue" in job_data:
+        result.position_in_queue = job_data["position_in_queue"]
+
+    if "estimated_time" in job_data:
+        result.estimated_time = job_data["estimated_time"]
+
+    if "error" in job_data:
+        result.error = job_data["error"]
+
+    if "report" in job_data and job_data["report"]:
+        result.report = ReportResponse(**job_data["report"])
+    elif job_data["status"] == JobStatus.PROCESSING:
+        result.partial_report = assemble_partial_report(job_data)
+
+    return result
+
+def batch_result(batch_id: str, batch_data: Dict[str, Any]) -> BatchResult:
+    """Build the API view of a batch from the jobs it is made of.
+
+    Identical requests in a batch share one job, so progress and counts are
+    taken over distinct jobs while `jobs` follows the submitted order.
+    """
+    jobs = {job_id: JOBS.get(job_id) for job_id in batch_data["job_ids"]}
+    live = {job_id: job_data for job_id, job_data in jobs.items() if job_data is not None}
+    statuses = [job_data["status"] for job_data in live.values()]
+    result = BatchResult(
+        batch_id=batch_id,
+        status=JobStatus.PROCESSING,
+        progress=round(sum(job_data["progress"] for job_data in live.values()) / max(1, len(live)), 3),
+        total=len(jobs),
+        completed=statuses.count(JobStatus.COMPLETED),
+        failed=statuses.count(JobStatus.FAILED) + len(jobs) - len(live),
+        cancelled=statuses.count(JobStatus.CANCELLED),
+        jobs=[job_result(job_id, live[job_id]) for job_id in batch_data["job_ids"] if job_id in live]
+    )
+    if result.completed + result.failed + result.cancelled == result.total:
+        if result.completed:
+            result.status = JobStatus.COMPLETED
+        else:
+            result.status = JobStatus.FAILED if result.failed else JobStatus.CANCELLED
+    return result
+
+def start_job(job_id: str):
+    """Mark a job as running once a worker has picked it up."""
+    JOBS.update(job_id,
+                status=JobStatus.PROCESSING,
+                position_in_queue=None,
+                estimated_time=None,
+                progress=0.0,
+                message="Starting research...")
+    publish_status(job_id)
+
+def complete_job(job_id: str, report: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Store a finished report and publish it; returns the job record, or None if the job was cancelled."""
+    job_data = JOBS.get(job_id)
+    if job_data is None or job_data["status"] == JobStatus.CANCELLED:
+        return None
+    if "cache_key" in job_data:
+        REPORT_CACHE.put(job_data["cache_key"], report)
+        REPORT_CACHE.release(job_data["cache_key"], job_id)
+    JOBS.update(job_id,
+                status=JobStatus.COMPLETED,
+                progress=1.0,
+                message="Report completed",
+                report=report,
+                completed_sections=None)
+    JOB_EVENTS.publish(job_id, "completed", {"report": report})
+    return job_data
+
+def job_status(job_id: str) -> str:
+    job_data = JOBS.get(job_id)
+    return job_data["status"] if job_data else JobStatus.CANCELLED
+
+async def process_report_job(job_id: str, request: ReportRequest, executor):
+    """Process report generation on one of the executor's workers
+
+    Job store calls go through the store thread: the graph's events are
+    handed to it without waiting, in order, ahead of the final update.
+    """
+    started_at = time.time()
+    try:
+        # Update job status
+        await in_store_thread(start_job, job_id)
+
+        # The job id is the graph thread, so a retried job resumes from its checkpoints
+        config_base = build_report_config(request, job_id)
+
+        def on_event(event: Dict[str, Any]):
+            if event["type"] == "plan":
+                # From here on the job's ETA is based on jobs with as many sections
+                executor.scheduler.planned(job_id, len(event["sections"]))
+            defer_to_store_thread(apply_job_event, job_id, event)
+
+        # Run the graph, either on this loop or in the process pool;
+        # progress and messages come from the graph's own task events
+        result = await executor.run_graph(request.topic, config_base, on_event=on_event,
+                                          stream_tokens=request.stream_tokens)
+
+        # Check for the final report in the result
+        if isinstance(result, dict) and "final_report" in result:
+            # Store the completed report
+            report = {
+                "topic": request.topic,
+                "content": result["final_report"]
+            }
+            job_data = await in_store_thread(complete_job, job_id, report)
+            if job_data is None:
+                return
+
+            # Feed the measured duration back into the scheduler's ETAs
+            executor.scheduler.record_duration(result["num_sections"],
+                                               job_data["search_depth"],
+                                               time.time() - started_at)
+        else:
+            # If no final report was returned
+            await in_store_thread(fail_job, job_id, "Failed to generate report",
+                                  "Graph finished but did not return a final report")
+
+    except Exception as e:
+        # Handle exceptions
+        print(f"Error generating report: {str(e)}")
+        await in_store_thread(fail_job, job_id, "Error occurred during report generation", str(e))
+
+    finally:
+        # Every path but cancellation leaves the job in a terminal state
+        status = await in_store_thread(job_status, job_id)
+        JOB_DURATION.observe(time.time() - started_at,
+                             status=JobStatus.CANCELLED if status == JobStatus.PROCESSING else status)
@@ -0,0 +1,131 @@
+import os
+import json
+import zlib
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, List, Optional, Sequence
+
+from dotenv import load_dotenv
+from langchain_core.caches import BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+from metrics import LLM_CACHE_LOOKUPS
+from job_store import connect_sqlite
+
+# Model clients are built, and given this cache, when the graph module is imported
+load_dotenv()
+
+class SQLiteLLMCache(BaseCache):
+    """Model responses on disk, keyed by model settings and a hash of the prompt.
+
+    LangChain hands every cache lookup the serialized messages and a string
+    of the model's provider, name and parameters (temperature, max tokens,
+    structured output tools), so a hit means the exact same request was
+    answered before. Entries expire `ttl_seconds` after they were stored,
+    and the least recently used go first once responses take up more than
+    `max_bytes`. Every process opens its own connection to the shared file.
+    """
+
+    def __init__(self, path: str = "llm_cache.db", max_bytes: int = 256 * 1024 * 1024,
+                 ttl_seconds: float = 7 * 86400.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self.conn: Optional[sqlite3.Connection] = None
+        self.pid: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self.conn is None or self.pid != os.getpid():
+            self.conn = connect_sqlite(self.path)
+            self.pid = os.getpid()
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    response BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    stored_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed_at ON llm_cache(accessed_at);
+            """)
+        return self.conn
+
+    @staticmethod
+    def key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[List[Generation]]:
+        key = self.key(prompt, llm_string)
+        now = time.time()
+        with self.lock:
+            conn = self._connection()
+            row = conn.execute("SELECT response FROM llm_cache WHERE cache_key = ? AND stored_at >= ?",
+                               (key, now - self.ttl_seconds)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE cache_key = ?", (now, key))
+        LLM_CACHE_LOOKUPS.inc(result="miss" if row is None else "hit")
+        if row is None:
+            return None
+        generations = []
+        for entry in json.loads(zlib.decompress(row[0])):
+            # Marked so token metrics only count what the provider actually billed
+            info = {**(entry["generation_info"] or {}), "cached": True}
+            if entry["message"] is None:
+                generations.append(Generation(text=entry["text"], generation_info=info))
+            else:
+                message = messages_from_dict([entry["message"]])[0]
+                generations.append(ChatGeneration(message=message, generation_info=info))
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        entries = [{"text": generation.text,
+                    "message": message_to_dict(generation.message) if isinstance(generation, ChatGeneration) else None,
+                    "generation_info": {k: v for k, v in (generation.generation_info or {}).items() if k != "cached"}}
+                   for generation in return_val]
+        response = zlib.compress(json.dumps(entries, default=str).encode("utf-8"))
+        now = time.time()
+        with self.lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?)",
+                             (self.key(prompt, llm_string), response, len(response), now, now))
+                conn.execute("DELETE FROM llm_cache WHERE stored_at < ?", (now - self.ttl_seconds,))
+                # Least recently used responses beyond the size budget
+                conn.execute(
+                    "DELETE FROM llm_cache WHERE cache_key IN (SELECT cache_key FROM ("
+                    "SELECT cache_key, SUM(size) OVER (ORDER BY accessed_at DESC, cache_key) AS total "
+                    "FROM llm_cache) WHERE total > ?)",
+                    (self.max_bytes,),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def clear(self, **kwargs: Any) -> None:
+        with self.lock:
+            self._connection().execute("DELETE FROM llm_cache")
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None and self.pid == os.getpid():
+                self.conn.close()
+            self.conn = None
+
+def create_llm_cache() -> Optional[SQLiteLLMCache]:
+    """Cache model responses only when LLM_CACHE_PATH is set."""
+    path = os.getenv("LLM_CACHE_PATH")
+    if not path:
+        return None
+    return SQLiteLLMCache(
+        path,
+        max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+        ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 86400))),
+    )
+
+LLM_CACHE = create_llm_cache()
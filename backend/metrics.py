@@ -0,0 +1,251 @@
+import time
+import bisect
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+# Latency buckets in seconds, from cached lookups up to long model calls
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+LabelValues = Tuple[str, ...]
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Metric:
+    """A named family of series, one per combination of label values."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.lock = threading.Lock()
+        self.series: Dict[LabelValues, Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            for key, value in sorted(self.series.items()):
+                lines += self._render_series(key, value)
+        return lines
+
+    def _render_series(self, key: LabelValues, value: Any) -> List[str]:
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"]
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any):
+        key = self._key(labels)
+        with self.lock:
+            self.series[key] = self.series.get(key, 0.0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any):
+        with self.lock:
+            self.series[self._key(labels)] = value
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels: Any):
+        key = self._key(labels)
+        with self.lock:
+            counts, total, count = self.series.get(key, ([0] * len(self.buckets), 0.0, 0))
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(counts):
+                counts[index] += 1
+            self.series[key] = (counts, total + value, count + 1)
+
+    def _render_series(self, key: LabelValues, value: Any) -> List[str]:
+        counts, total, count = value
+        lines, cumulative = [], 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.label_names, key, 'le="+Inf"')
+        lines.append(f"{self.name}_bucket{labels} {count}")
+        lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """Metrics of one process, rendered in the Prometheus text exposition format.
+
+    Worker processes of the process-pool executor keep their own registry;
+    they `drain` the counters and histograms they collected during a graph
+    run and the parent `merge`s them, so one scrape sees every run.
+    """
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+    def drain(self) -> Dict[str, Dict[LabelValues, Any]]:
+        """Take and reset the counter and histogram series collected so far."""
+        snapshot = {}
+        for name, metric in self.metrics.items():
+            if isinstance(metric, (Counter, Histogram)):
+                with metric.lock:
+                    snapshot[name], metric.series = metric.series, {}
+        return snapshot
+
+    def merge(self, snapshot: Dict[str, Dict[LabelValues, Any]]):
+        """Add series drained from another process's registry."""
+        for name, series in snapshot.items():
+            metric = self.metrics.get(name)
+            if metric is None:
+                continue
+            with metric.lock:
+                for key, value in series.items():
+                    if isinstance(metric, Histogram):
+                        counts, total, count = metric.series.get(key, ([0] * len(metric.buckets), 0.0, 0))
+                        metric.series[key] = ([a + b for a, b in zip(counts, value[0])],
+                                              total + value[1], count + value[2])
+                    else:
+                        metric.series[key] = metric.series.get(key, 0.0) + value
+
+METRICS = MetricsRegistry()
+
+NODE_DURATION = METRICS.histogram(
+    "report_node_duration_seconds", "Time spent in each graph node", ["node"])
+NODE_ERRORS = METRICS.counter(
+    "report_node_errors_total", "Graph node runs that raised", ["node"])
+SEARCH_DURATION = METRICS.histogram(
+    "search_request_duration_seconds", "Latency of search provider calls", ["provider"])
+SEARCH_QUERIES = METRICS.counter(
+    "search_queries_total", "Search queries by provider and whether the cache answered them", ["provider", "source"])
+SEARCH_ERRORS = METRICS.counter(
+    "search_errors_total", "Failed search provider calls and failed queries", ["provider"])
+LLM_DURATION = METRICS.histogram(
+    "llm_request_duration_seconds", "Latency of model calls", ["provider", "model"])
+LLM_TOKENS = METRICS.counter(
+    "llm_tokens_total", "Tokens used by model calls", ["provider", "model", "type"])
+LLM_ERRORS = METRICS.counter(
+    "llm_errors_total", "Model calls that raised", ["provider", "model"])
+LLM_CACHE_LOOKUPS = METRICS.counter(
+    "llm_cache_lookups_total", "Model response cache lookups by whether they hit", ["result"])
+SECTION_GRADES = METRICS.counter(
+    "section_grades_total", "Section grades by whether the depth limit, local checks or the grader model decided", ["decided_by", "grade"])
+JOB_DURATION = METRICS.histogram(
+    "report_job_duration_seconds", "Time from a job starting to finishing", ["status"])
+QUEUE_DEPTH = METRICS.gauge(
+    "report_queue_depth", "Jobs waiting for a worker")
+ACTIVE_JOBS = METRICS.gauge(
+    "report_active_jobs", "Jobs being researched")
+WORKER_CAPACITY = METRICS.gauge(
+    "report_worker_capacity", "Jobs that can be researched at the same time")
+
+class NodeTimer:
+    """Measures node latency from the start and finish events of the graph's task stream."""
+
+    def __init__(self):
+        self.started: Dict[str, Tuple[str, float]] = {}
+
+    def handle(self, task: Dict[str, Any]):
+        if "input" in task:
+            self.started[task.get("id")] = (task.get("name"), time.monotonic())
+            return
+        name, started_at = self.started.pop(task.get("id"), (task.get("name"), None))
+        if started_at is None:
+            return
+        NODE_DURATION.observe(time.monotonic() - started_at, node=name)
+        if task.get("error"):
+            NODE_ERRORS.inc(node=name)
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """Records latency, token usage and errors of every model call in a graph run."""
+
+    def __init__(self):
+        self.started: Dict[UUID, Tuple[str, str, float]] = {}
+
+    def _start(self, run_id: UUID, metadata: Optional[Dict[str, Any]], serialized: Optional[Dict[str, Any]]):
+        metadata = metadata or {}
+        provider = metadata.get("ls_provider") or (serialized or {}).get("id", ["unknown"])[-1]
+        model = metadata.get("ls_model_name") or "unknown"
+        self.started[run_id] = (provider, model, time.monotonic())
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, metadata, serialized)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, metadata, serialized)
+
+    def on_llm_end(self, response: LLMResult, *, run_id, **kwargs):
+        started = self.started.pop(run_id, None)
+        if started is None:
+            return
+        provider, model, started_at = started
+        LLM_DURATION.observe(time.monotonic() - started_at, provider=provider, model=model)
+        input_tokens, output_tokens = self._usage(response)
+        if input_tokens:
+            LLM_TOKENS.inc(input_tokens, provider=provider, model=model, type="input")
+        if output_tokens:
+            LLM_TOKENS.inc(output_tokens, provider=provider, model=model, type="output")
+
+    def on_llm_error(self, error: BaseException, *, run_id, **kwargs):
+        started = self.started.pop(run_id, None)
+        if started is not None:
+            LLM_ERRORS.inc(provider=started[0], model=started[1])
+
+    @staticmethod
+    def _usage(response: LLMResult) -> Tuple[int, int]:
+        # Chat models report usage on the message; older integrations in llm_output
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                if (generation.generation_info or {}).get("cached"):
+                    continue
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    input_tokens += usage.get("input_tokens", 0)
+                    output_tokens += usage.get("output_tokens", 0)
+        if not (input_tokens or output_tokens):
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            input_tokens = usage.get("prompt_tokens", 0)
+            output_tokens = usage.get("completion_tokens", 0)
+        return input_tokens, output_tokens
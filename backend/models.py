@@ -0,0 +1,131 @@
+import os
+import json
+import asyncio
+import weakref
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import Runnable
+
+from utils import init_model_with_provider
+from llm_cache import LLM_CACHE
+
+ModelKey = Tuple[str, str, str]
+
+def _build_model(provider: str, model: str, **kwargs: Any) -> BaseChatModel:
+    return init_model_with_provider(model, provider, **kwargs)
+
+class ModelRegistry:
+    """Process-wide cache of chat model clients, keyed by (provider, model, settings).
+
+    Graph nodes run once per section and search iteration; building a new
+    client each time also builds a new HTTP connection pool, so every call
+    paid for a fresh TLS handshake. Clients and their `with_structured_output`
+    wrappers are built once per event loop and shared by every job on it.
+    Their HTTP pools are bound to the loop that first used them, and a
+    process-pool job runs on a loop of its own, so each loop gets its own
+    clients, like the search pools in `search_providers`. Clients built with
+    no loop running (warm-up) go to the first loop that asks for them.
+    Process-pool workers are forked from the server, so a registry that
+    finds itself in a new process starts empty instead of sharing the
+    parent's connections.
+
+    With LLM_CACHE_PATH set, clients answer repeated requests from the
+    response cache; nodes pass `cache=False` for calls that must not be
+    replayed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Dict]]" = weakref.WeakKeyDictionary()
+        self.unbound = self._new_pool()
+
+    @staticmethod
+    def key(provider: str, model: str, **kwargs: Any) -> ModelKey:
+        return provider, model, json.dumps(kwargs, sort_keys=True, default=str)
+
+    @staticmethod
+    def _new_pool() -> Dict[str, Dict]:
+        return {"clients": {}, "structured": {}}
+
+    def _pool(self) -> Dict[str, Dict]:
+        """The running loop's clients; called with the lock held."""
+        if self.pid != os.getpid():
+            self.pools = weakref.WeakKeyDictionary()
+            self.unbound = self._new_pool()
+            self.pid = os.getpid()
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return self.unbound
+        if loop not in self.pools:
+            self.pools[loop], self.unbound = self.unbound, self._new_pool()
+        return self.pools[loop]
+
+    def _all_pools(self) -> List[Dict[str, Dict]]:
+        return [self.unbound, *self.pools.values()]
+
+    def get(self, model: str, provider: str, cache: bool = True, **kwargs: Any) -> BaseChatModel:
+        """The shared client of a model, built on first use."""
+        cache = cache and LLM_CACHE is not None
+        key = self.key(provider, model, cache=cache, **kwargs)
+        with self.lock:
+            clients = self._pool()["clients"]
+            if key not in clients:
+                client = _build_model(provider, model, **kwargs)
+                client.cache = LLM_CACHE if cache else False
+                clients[key] = client
+            return clients[key]
+
+    def get_structured(self, model: str, provider: str, schema: Any, cache: bool = True,
+                       **kwargs: Any) -> Runnable:
+        """The shared client of a model wrapped to return `schema`."""
+        client = self.get(model, provider, cache, **kwargs)
+        key = (self.key(provider, model, cache=cache and LLM_CACHE is not None, **kwargs), schema)
+        with self.lock:
+            structured = self._pool()["structured"]
+            if key not in structured:
+                structured[key] = client.with_structured_output(schema)
+            return structured[key]
+
+    def warm(self, models: Iterable[Tuple[str, str]]):
+        """Build the clients of (model, provider) pairs ahead of the first job."""
+        for model, provider in models:
+            self.get(model, provider)
+
+    def reload(self, provider: Optional[str] = None) -> int:
+        """Drop cached clients, of one provider or all, so the next call rebuilds them
+        with the current environment (rotated API keys, changed endpoints).
+        Returns how many clients were dropped."""
+        dropped = 0
+        with self.lock:
+            for pool in self._all_pools():
+                stale = [key for key in pool["clients"] if provider is None or key[0] == provider]
+                for key in stale:
+                    del pool["clients"][key]
+                pool["structured"] = {key: wrapper for key, wrapper in pool["structured"].items()
+                                      if key[0] not in stale}
+                dropped += len(stale)
+        return dropped
+
+    def release_loop(self):
+        """Forget the running loop's clients; called when a process-pool job's loop is about to close."""
+        with self.lock:
+            self.pools.pop(asyncio.get_running_loop(), None)
+
+    def close(self):
+        """Release every client and the response cache; called when the server or worker shuts down."""
+        self.reload()
+        if LLM_CACHE is not None:
+            LLM_CACHE.close()
+
+    def snapshot(self) -> Dict[str, int]:
+        with self.lock:
+            pools = self._all_pools()
+            return {"loops": len(pools) - 1,
+                    "clients": sum(len(pool["clients"]) for pool in pools),
+                    "structured": sum(len(pool["structured"]) for pool in pools)}
+
+MODELS = ModelRegistry()
@@ -0,0 +1,67 @@
+import re
+import json
+from typing import Any, Dict, List
+
+# Opening of the planner's section list: `"sections": [`
+SECTIONS_KEY = re.compile(r'"sections"\s*:\s*\[')
+
+class SectionStreamParser:
+    """Picks the complete objects of a JSON "sections" array out of streamed text.
+
+    The planner writes its plan as JSON, possibly inside a ```json fence or
+    after some prose. `feed` takes each streamed chunk and returns the
+    section dicts completed by it, so callers can act on early sections
+    while later ones are still being generated. Objects that are not valid
+    JSON are skipped; the full response stays the authority on the plan.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = -1  # Scan position inside the array; -1 until it opens
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.start = 0
+        self.done = False
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        self.buffer += text
+        if self.done:
+            return []
+        if self.pos < 0:
+            match = SECTIONS_KEY.search(self.buffer)
+            if match is None:
+                return []
+            self.pos = match.end()
+
+        sections = []
+        while self.pos < len(self.buffer):
+            char = self.buffer[self.pos]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                if self.depth == 0:
+                    self.start = self.pos
+                self.depth += 1
+            elif char in "}]":
+                if self.depth == 0:
+                    # End of the sections array
+                    self.done = True
+                    break
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        section = json.loads(self.buffer[self.start:self.pos + 1])
+                    except ValueError:
+                        section = None
+                    if isinstance(section, dict):
+                        sections.append(section)
+            self.pos += 1
+        return sections
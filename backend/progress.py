@@ -0,0 +1,197 @@
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.messages import BaseMessage
+
+from state import Section
+
+# Nodes whose model output is section text worth streaming to clients
+WRITER_NODES = ("write_section", "write_final_sections")
+
+class ReportProgress:
+    """Turns the graph's task stream into job progress events.
+
+    Consumes `graph.astream(..., stream_mode="tasks", subgraphs=True)` and
+    emits plain dict events so they can cross process boundaries:
+
+        {"type": "progress", "progress": float, "message": str}
+        {"type": "plan", "sections": [str, ...]}
+        {"type": "writing", "name": str, "index": int}
+        {"type": "section", "name": str, "index": int, "content": str}
+
+    With `stream_mode="messages"` also enabled, `handle_message` turns writer
+    model chunks into `{"type": "token", "name", "index", "text"}` events.
+    A "writing" event marks the start of a (re)write of a section, so
+    clients should clear any text streamed for it before.
+
+    Progress is split into phases: planning (up to PLAN_DONE), section
+    research (up to RESEARCH_DONE, weighted by how many researched sections
+    are done), final sections (up to FINAL_DONE) and compilation.
+    """
+
+    PLAN_DONE = 0.15
+    RESEARCH_DONE = 0.85
+    FINAL_DONE = 0.95
+
+    def __init__(self):
+        self.progress = 0.0
+        self.sections: List[Section] = []
+        self.researched_done: set[str] = set()
+        self.final_done: set[str] = set()
+        self.task_sections: Dict[str, Section] = {}
+
+    @property
+    def research_total(self) -> int:
+        return sum(1 for s in self.sections if s.research)
+
+    @property
+    def final_total(self) -> int:
+        return sum(1 for s in self.sections if not s.research)
+
+    def handle(self, namespace: Tuple[str, ...], task: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Translate one task start/finish event into zero or more job events."""
+        name = task.get("name")
+        started = "input" in task
+        in_subgraph = bool(namespace)
+
+        if task.get("error"):
+            return []
+
+        if started:
+            payload = task.get("input") if isinstance(task.get("input"), dict) else {}
+            section = payload.get("section")
+            if section is not None and not in_subgraph:
+                # Remember which section each top-level task works on, to tag its tokens
+                self.task_sections[task.get("id")] = section
+            return self._on_start(name, section, payload, in_subgraph)
+
+        result = self._result_dict(task.get("result"))
+        return self._on_finish(name, result, in_subgraph)
+
+    def resume(self, values: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Pick up progress from the state of a run restored from a checkpoint."""
+        self.sections = values.get("sections", [])
+        if not self.sections:
+            return self._progress(0.0, "Resuming research...")
+        for section in values.get("completed_sections", []):
+            (self.researched_done if section.research else self.final_done).add(section.name)
+        done, total = len(self.researched_done), max(1, self.research_total)
+        progress = self.PLAN_DONE + (self.RESEARCH_DONE - self.PLAN_DONE) * done / total
+        plan_event = {"type": "plan", "sections": [s.name for s in self.sections]}
+        return [plan_event] + self._progress(progress, f"Resuming research: {done}/{total} sections completed")
+
+    def _on_start(self, name: str, section: Optional[Section], payload: Dict[str, Any], in_subgraph: bool) -> List[Dict[str, Any]]:
+        if name == "generate_report_plan":
+            return self._progress(0.05, "Planning report structure...")
+        if name == "build_section_with_web_research" and not in_subgraph:
+            return self._progress(self.progress, f"Researching section: {section.name}")
+        if name == "search_web" and in_subgraph:
+            iteration = payload.get("search_iterations", 0) + 1
+            return self._progress(self.progress, f"Searching the web for '{section.name}' (iteration {iteration})")
+        if name == "write_section" and in_subgraph:
+            return [self._writing_event(section)] + self._progress(self.progress, f"Writing section: {section.name}")
+        if name == "write_final_sections":
+            return [self._writing_event(section)] + self._progress(max(self.progress, self.RESEARCH_DONE),
+                                                                   f"Writing final section: {section.name}")
+        if name == "compile_final_report":
+            return self._progress(self.FINAL_DONE, "Compiling final report...")
+        return []
+
+    def _on_finish(self, name: str, result: Dict[str, Any], in_subgraph: bool) -> List[Dict[str, Any]]:
+        if name == "generate_report_plan":
+            self.sections = result.get("sections", [])
+            plan_event = {"type": "plan", "sections": [s.name for s in self.sections]}
+            return [plan_event] + self._progress(self.PLAN_DONE,
+                                                 f"Report plan generated: {len(self.sections)} sections, "
+                                                 f"{self.research_total} need research")
+        if name == "build_section_with_web_research" and not in_subgraph:
+            events = []
+            for section in result.get("completed_sections", []):
+                self.researched_done.add(section.name)
+                done, total = len(self.researched_done), max(1, self.research_total)
+                progress = self.PLAN_DONE + (self.RESEARCH_DONE - self.PLAN_DONE) * done / total
+                events.append(self._section_event(section))
+                events += self._progress(progress, f"Completed section: {section.name} ({done}/{total})")
+            return events
+        if name == "write_final_sections":
+            events = []
+            for section in result.get("completed_sections", []):
+                self.final_done.add(section.name)
+                done, total = len(self.final_done), max(1, self.final_total)
+                progress = self.RESEARCH_DONE + (self.FINAL_DONE - self.RESEARCH_DONE) * done / total
+                events.append(self._section_event(section))
+                events += self._progress(progress, f"Completed section: {section.name}")
+            return events
+        return []
+
+    def handle_message(self, message: BaseMessage, metadata: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Translate a streamed model chunk from a section writer into a token event."""
+        if metadata.get("langgraph_node") not in WRITER_NODES:
+            return None
+        text = message.content if isinstance(message.content, str) else ""
+        if not text:
+            # Structured grader output and tool calls carry no section text
+            return None
+
+        # The first namespace segment is "<node>:<task id>" of the section's task
+        task_id = metadata.get("langgraph_checkpoint_ns", "").split("|")[0].partition(":")[2]
+        section = self.task_sections.get(task_id)
+        if section is None:
+            return None
+        return {"type": "token", "name": section.name, "index": self.section_index(section.name), "text": text}
+
+    def section_index(self, name: str) -> int:
+        """Position of a section in the planned report order."""
+        for index, section in enumerate(self.sections):
+            if section.name == name:
+                return index
+        return -1
+
+    def _progress(self, progress: float, message: str) -> List[Dict[str, Any]]:
+        # Never move backwards; parallel sections finish in any order
+        self.progress = max(self.progress, progress)
+        return [{"type": "progress", "progress": round(self.progress, 3), "message": message}]
+
+    def _section_event(self, section: Section) -> Dict[str, Any]:
+        return {"type": "section", "name": section.name, "index": self.section_index(section.name),
+                "content": section.content}
+
+    def _writing_event(self, section: Section) -> Dict[str, Any]:
+        return {"type": "writing", "name": section.name, "index": self.section_index(section.name)}
+
+    @staticmethod
+    def _result_dict(result: Any) -> Dict[str, Any]:
+        # Task results are a list of (channel, value) writes or a dict of them
+        if isinstance(result, dict):
+            return result
+        if isinstance(result, list):
+            return {channel: value for channel, value in result if isinstance(channel, str)}
+        return {}
+
+class TokenBuffer:
+    """Coalesces token events per section so subscribers get a few updates a second.
+
+    Forwarding every model chunk would mean thousands of events per report;
+    instead text is concatenated per section and flushed at most every
+    `interval` seconds, and whenever `flush` is called explicitly.
+    """
+
+    def __init__(self, on_event: Callable[[Dict[str, Any]], None], interval: float = 0.1):
+        self.on_event = on_event
+        self.interval = interval
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.last_flush = time.monotonic()
+
+    def add(self, event: Dict[str, Any]):
+        if event["name"] in self.pending:
+            self.pending[event["name"]]["text"] += event["text"]
+        else:
+            self.pending[event["name"]] = dict(event)
+        if time.monotonic() - self.last_flush >= self.interval:
+            self.flush()
+
+    def flush(self):
+        for event in self.pending.values():
+            self.on_event(event)
+        self.pending = {}
+        self.last_flush = time.monotonic()
@@ -102,6 +102,33 @@ Call the Queries tool
 </Format>
 """
 
+batch_query_writer_instructions="""You are an expert technical writer crafting targeted web search queries that will gather comprehensive information for writing the sections of a technical report.
+
+<Report topic>
+{topic}
+</Report topic>
+
+<Report sections>
+{sections}
+</Report sections>
+
+<Task>
+Your goal is to generate {number_of_queries} search queries for each of the report sections above that will help gather comprehensive information about that section's topic.
+
+The queries for each section should:
+
+1. Be related to the section topic, in the context of the report topic
+2. Examine different aspects of the section topic
+3. Not repeat queries of the other sections
+
+Make the queries specific enough to find high-quality, relevant sources.
+</Task>
+
+<Format>
+Call the BatchQueries tool with one entry per section, using each section's name exactly as given
+</Format>
+"""
+
 section_writer_instructions = """Write one section of a research report.
 
 <Task>
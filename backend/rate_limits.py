@@ -0,0 +1,322 @@
+import os
+import re
+import math
+import time
+import asyncio
+import threading
+from typing import Any, Dict, Mapping, Optional, Set, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+from context_budget import count_tokens
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds in a rate limit reset header: "7.66s", "2m59.56s", "1h0m0s", "300ms" or plain seconds."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    if not parts:
+        return None
+    scale = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    return sum(float(amount) * scale[unit] for amount, unit in parts)
+
+class TokenBucket:
+    """`per_minute` units per minute, with bursts of up to one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.level = per_minute
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.per_minute, self.level + (now - self.updated_at) * self.per_minute / 60)
+        self.updated_at = now
+
+    def delay(self, cost: float) -> float:
+        """Seconds until `cost` units are available."""
+        self._refill()
+        # A single call larger than the whole bucket goes through once the bucket is full
+        cost = min(cost, self.per_minute)
+        return 0.0 if self.level >= cost else (cost - self.level) * 60 / self.per_minute
+
+    def take(self, cost: float):
+        self._refill()
+        self.level -= cost
+
+    def give_back(self, amount: float):
+        self._refill()
+        self.level = min(self.per_minute, self.level + amount)
+
+class ProviderLimiter:
+    """Paces the calls of one provider model.
+
+    Calls wait for a request and their estimated tokens from the
+    requests- and tokens-per-minute buckets, for the window the provider
+    reported in its `x-ratelimit-remaining-*` headers, and for a slot in
+    the concurrency window. The window grows by one slot per window's
+    worth of successful calls and halves on a rate limit error (AIMD), so
+    it settles just under what the provider accepts. Token estimates are
+    settled against the usage each response reports. Waiting calls sleep
+    until their budget refills or a finished call or response wakes them.
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None,
+                 max_concurrency: int = 16, initial_concurrency: int = 4):
+        self.lock = threading.Lock()
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.configured_tpm = tpm
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(min(initial_concurrency, max_concurrency))
+        self.in_flight = 0
+        # "requests"/"tokens" -> (remaining, monotonic time the provider resets them)
+        self.windows: Dict[str, Tuple[float, float]] = {}
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.output_tokens = 512.0  # Running mean of completion tokens, for the estimate of the next call
+        self.rate_limited = 0
+        self.waiting = 0
+        # (loop, event) of each call waiting in `acquire`; callers may run on different loops
+        self.waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    def _delay(self, cost: int) -> float:
+        now = time.monotonic()
+        delays = [self.blocked_until - now]
+        if self.in_flight >= max(1, int(self.concurrency)):
+            # Only a finished call frees a slot
+            delays.append(math.inf)
+        if self.requests:
+            delays.append(self.requests.delay(1))
+        if self.tokens:
+            delays.append(self.tokens.delay(cost))
+        for unit, amount in (("requests", 1), ("tokens", cost)):
+            if unit in self.windows:
+                remaining, resets_at = self.windows[unit]
+                if remaining < amount and now < resets_at:
+                    delays.append(resets_at - now)
+        return max(delays)
+
+    async def acquire(self, prompt_tokens: int) -> int:
+        """Wait until the call may be sent; returns the tokens it was charged."""
+        cost = prompt_tokens + int(self.output_tokens)
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self.lock:
+            self.waiting += 1
+        try:
+            while True:
+                with self.lock:
+                    delay = self._delay(cost)
+                    if delay <= 0:
+                        self._charge(cost)
+                        return cost
+                    waiter[1].clear()
+                    self.waiters.add(waiter)
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), None if delay == math.inf else delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self.lock:
+                self.waiting -= 1
+                self.waiters.discard(waiter)
+
+    def _wake(self):
+        # Called with the lock held whenever a wait may have got shorter; each waiter rechecks its own delay
+        for loop, event in self.waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(event.set)
+        self.waiters.clear()
+
+    def _charge(self, cost: int):
+        self.in_flight += 1
+        if self.requests:
+            self.requests.take(1)
+        if self.tokens:
+            self.tokens.take(cost)
+        for unit, amount in (("requests", 1), ("tokens", cost)):
+            if unit in self.windows:
+                remaining, resets_at = self.windows[unit]
+                self.windows[unit] = (remaining - amount, resets_at)
+
+    def _refund(self, requests: int, tokens: float):
+        if self.requests and requests:
+            self.requests.give_back(requests)
+        if self.tokens and tokens:
+            self.tokens.give_back(tokens)
+        for unit, amount in (("requests", requests), ("tokens", tokens)):
+            if unit in self.windows and amount:
+                remaining, resets_at = self.windows[unit]
+                self.windows[unit] = (remaining + amount, resets_at)
+
+    def release(self, cost: int, ok: bool, input_tokens: Optional[int] = None,
+                output_tokens: Optional[int] = None, cached: bool = False):
+        """Settle a finished call: refund what it did not use and adjust the concurrency window."""
+        with self.lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            self._wake()
+            if cached:
+                # Answered from the response cache without reaching the provider
+                self._refund(1, cost)
+                return
+            if input_tokens is not None and output_tokens is not None:
+                self._refund(0, cost - input_tokens - output_tokens)
+                self.output_tokens += (output_tokens - self.output_tokens) * 0.2
+            if ok:
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+
+    def rate_limited_for(self, retry_after: Optional[float]):
+        """A 429 response: halve the concurrency window and hold every call until `retry_after`."""
+        with self.lock:
+            now = time.monotonic()
+            self.rate_limited += 1
+            self.blocked_until = max(self.blocked_until, now + (retry_after or 1.0))
+            # Retries of one overload report it again; decrease once per episode
+            if now - self.last_decrease >= 1.0:
+                self.concurrency = max(1.0, self.concurrency / 2)
+                self.last_decrease = now
+
+    def observe(self, status_code: int, headers: Mapping[str, str]):
+        """Take the provider's view of the remaining budget from a response's rate limit headers."""
+        if status_code == 429:
+            self.rate_limited_for(parse_duration(headers.get("retry-after")))
+        with self.lock:
+            self._wake()
+            now = time.monotonic()
+            for unit in ("requests", "tokens"):
+                remaining = headers.get(f"x-ratelimit-remaining-{unit}")
+                reset = parse_duration(headers.get(f"x-ratelimit-reset-{unit}"))
+                if remaining is not None and reset is not None:
+                    try:
+                        self.windows[unit] = (float(remaining), now + reset)
+                    except ValueError:
+                        pass
+            limit = headers.get("x-ratelimit-limit-tokens")
+            if limit and not self.configured_tpm:
+                # The token limit is per minute; pace against it instead of bursting into the window
+                try:
+                    per_minute = float(limit)
+                except ValueError:
+                    return
+                if self.tokens is None:
+                    self.tokens = TokenBucket(per_minute)
+                else:
+                    self.tokens.per_minute = per_minute
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            now = time.monotonic()
+            return {
+                "concurrency": round(self.concurrency, 2),
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "rate_limited": self.rate_limited,
+                "blocked_for_seconds": round(max(0.0, self.blocked_until - now), 1),
+                "tokens_per_minute": self.tokens.per_minute if self.tokens else None,
+                "requests_per_minute": self.requests.per_minute if self.requests else None,
+                "remaining": {unit: remaining for unit, (remaining, resets_at) in self.windows.items()
+                              if resets_at > now},
+            }
+
+def parse_limits(spec: str) -> Dict[str, Tuple[Optional[float], Optional[float]]]:
+    """LLM_RATE_LIMITS entries, "<provider>[:<model>]=<rpm>/<tpm>" separated by commas; either side may be empty."""
+    limits = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, values = entry.partition("=")
+        rpm, _, tpm = values.partition("/")
+        limits[name.strip()] = (float(rpm) if rpm.strip() else None, float(tpm) if tpm.strip() else None)
+    return limits
+
+class RateLimits:
+    """One `ProviderLimiter` per provider model, shared by every job in the process.
+
+    Configured limits are per process. Processes do coordinate through the
+    provider's headers, though: the remaining requests and tokens they
+    report already include what every other process has used.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+                 max_concurrency: int = 16, initial_concurrency: int = 4):
+        self.limits = limits or {}
+        self.max_concurrency = max_concurrency
+        self.initial_concurrency = initial_concurrency
+        self.lock = threading.Lock()
+        self.limiters: Dict[str, ProviderLimiter] = {}
+
+    def get(self, provider: str, model: str) -> ProviderLimiter:
+        name = f"{provider}:{model}"
+        with self.lock:
+            if name not in self.limiters:
+                rpm, tpm = self.limits.get(name) or self.limits.get(provider) or (None, None)
+                self.limiters[name] = ProviderLimiter(rpm, tpm, self.max_concurrency, self.initial_concurrency)
+            return self.limiters[name]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            limiters = sorted(self.limiters.items())
+        return {name: limiter.snapshot() for name, limiter in limiters}
+
+RATE_LIMITS = RateLimits(
+    parse_limits(os.getenv("LLM_RATE_LIMITS", "")),
+    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "16")),
+    initial_concurrency=int(os.getenv("LLM_INITIAL_CONCURRENCY", "4")),
+)
+
+def rate_limit_hooks(provider: str, model: str) -> Dict[str, Any]:
+    """httpx event hooks that feed a model client's responses, retries included, into its limiter."""
+    limiter = RATE_LIMITS.get(provider, model)
+
+    async def on_response(response):
+        limiter.observe(response.status_code, response.headers)
+
+    return {"response": [on_response]}
+
+class RateLimitCallback(AsyncCallbackHandler):
+    """Holds each model call of a graph run until its provider's limiter lets it through.
+
+    Model calls made without this callback in their config are not limited.
+    """
+
+    def __init__(self):
+        self.held: Dict[UUID, Tuple[ProviderLimiter, int]] = {}
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        metadata = metadata or {}
+        provider = metadata.get("ls_provider") or (serialized or {}).get("id", ["unknown"])[-1]
+        model = metadata.get("ls_model_name") or "unknown"
+        limiter = RATE_LIMITS.get(provider, model)
+        prompt = "\n".join(str(message.content) for batch in messages for message in batch)
+        self.held[run_id] = (limiter, await limiter.acquire(count_tokens(prompt, model)))
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        held = self.held.pop(run_id, None)
+        if held is None:
+            return
+        limiter, cost = held
+        generations = [generation for batch in response.generations for generation in batch]
+        if generations and all((generation.generation_info or {}).get("cached") for generation in generations):
+            limiter.release(cost, True, cached=True)
+            return
+        usage = [getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                 for generation in generations]
+        if any(usage):
+            limiter.release(cost, True, sum(u.get("input_tokens", 0) for u in usage),
+                            sum(u.get("output_tokens", 0) for u in usage))
+        else:
+            limiter.release(cost, True)
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        held = self.held.pop(run_id, None)
+        if held is None:
+            return
+        limiter, cost = held
+        response = getattr(error, "response", None)
+        if getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError":
+            headers = getattr(response, "headers", None) or {}
+            limiter.rate_limited_for(parse_duration(headers.get("retry-after")))
+        limiter.release(cost, False)
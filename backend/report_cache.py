@@ -0,0 +1,167 @@
+import os
+import json
+import zlib
+import time
+import hashlib
+import threading
+from enum import Enum
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from configuration import Configuration
+from job_store import connect_sqlite
+
+def normalize_topic(topic: str) -> str:
+    """Case- and whitespace-insensitive form of a topic."""
+    return " ".join(topic.split()).casefold()
+
+def report_cache_key(topic: str, configuration: Configuration) -> str:
+    """Hash of the normalized topic and every field of the effective configuration."""
+    def encode(value: Any) -> Any:
+        return value.value if isinstance(value, Enum) else str(value)
+
+    payload = json.dumps({"topic": normalize_topic(topic), "configuration": asdict(configuration)},
+                         sort_keys=True, default=encode)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ReportCache:
+    """Finished reports by cache key, plus the job currently producing each key.
+
+    Entries expire `ttl_seconds` after they were stored and the least
+    recently used entries are evicted beyond `max_entries`. `claim` gives
+    single-flight semantics: the first job to claim a key owns it until it
+    releases it, and identical requests in the meantime attach to that job.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 86400.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.inflight: Dict[str, str] = {}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The cached report for `key`, or None if missing or expired."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            stored_at, report = entry
+            if time.time() - stored_at > self.ttl_seconds:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return dict(report)
+
+    def put(self, key: str, report: Dict[str, Any]):
+        with self.lock:
+            self.entries[key] = (time.time(), dict(report))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def claim(self, key: str, job_id: str, is_active: Callable[[str], bool]) -> str:
+        """Make `job_id` the producer of `key` unless an active job already is.
+
+        Returns the id of the job that owns the key afterwards. An owner for
+        which `is_active` is False (failed, evicted) is replaced.
+        """
+        with self.lock:
+            owner = self.inflight.get(key)
+            if owner is None or owner == job_id or not is_active(owner):
+                self.inflight[key] = owner = job_id
+            return owner
+
+    def release(self, key: str, job_id: str):
+        """Stop attaching new requests to `job_id` once it has finished."""
+        with self.lock:
+            if self.inflight.get(key) == job_id:
+                del self.inflight[key]
+
+    def close(self):
+        pass
+
+class SQLiteReportCache(ReportCache):
+    """Report cache shared through SQLite by the API and research worker processes."""
+
+    def __init__(self, path: str = "jobs.db", max_entries: int = 256, ttl_seconds: float = 86400.0):
+        super().__init__(max_entries, ttl_seconds)
+        self.conn = connect_sqlite(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS report_cache (
+                cache_key TEXT PRIMARY KEY,
+                report BLOB NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_report_cache_accessed_at ON report_cache(accessed_at);
+            CREATE TABLE IF NOT EXISTS report_inflight (
+                cache_key TEXT PRIMARY KEY,
+                job_id TEXT NOT NULL
+            );
+        """)
+
+    def _transaction(self, statements):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self.conn)
+                self.conn.execute("COMMIT")
+                return result
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        def statements(conn):
+            now = time.time()
+            row = conn.execute(
+                "SELECT report FROM report_cache WHERE cache_key = ? AND stored_at >= ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE report_cache SET accessed_at = ? WHERE cache_key = ?", (now, key))
+            return json.loads(zlib.decompress(row[0]))
+        return self._transaction(statements)
+
+    def put(self, key: str, report: Dict[str, Any]):
+        def statements(conn):
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO report_cache (cache_key, report, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, zlib.compress(json.dumps(report).encode("utf-8")), now, now),
+            )
+            conn.execute("DELETE FROM report_cache WHERE stored_at < ?", (now - self.ttl_seconds,))
+            conn.execute(
+                "DELETE FROM report_cache WHERE cache_key IN ("
+                "SELECT cache_key FROM report_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+        self._transaction(statements)
+
+    def claim(self, key: str, job_id: str, is_active: Callable[[str], bool]) -> str:
+        def statements(conn):
+            row = conn.execute("SELECT job_id FROM report_inflight WHERE cache_key = ?", (key,)).fetchone()
+            if row is not None and (row[0] == job_id or is_active(row[0])):
+                return row[0]
+            conn.execute("INSERT OR REPLACE INTO report_inflight (cache_key, job_id) VALUES (?, ?)", (key, job_id))
+            return job_id
+        return self._transaction(statements)
+
+    def release(self, key: str, job_id: str):
+        with self.lock:
+            self.conn.execute("DELETE FROM report_inflight WHERE cache_key = ? AND job_id = ?", (key, job_id))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def create_report_cache() -> ReportCache:
+    """Share the report cache through SQLite whenever job records are."""
+    max_entries = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "256"))
+    ttl_seconds = float(os.getenv("REPORT_CACHE_TTL_SECONDS", "86400"))
+    if os.getenv("JOB_STORE", "memory") == "sqlite":
+        return SQLiteReportCache(os.getenv("JOB_STORE_PATH", "jobs.db"), max_entries, ttl_seconds)
+    return ReportCache(max_entries, ttl_seconds)
@@ -0,0 +1,165 @@
+import time
+import heapq
+import asyncio
+import itertools
+import statistics
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+class DurationHistogram:
+    """Rolling window of measured job durations keyed by (section count, search depth).
+
+    Estimates fall back from the exact key, to every sample with the same
+    search depth, to every sample, and finally to a fixed default while the
+    server has not finished any job yet.
+    """
+
+    def __init__(self, window: int = 50, default_seconds: float = 60.0):
+        self.window = window
+        self.default_seconds = default_seconds
+        self.samples: Dict[Tuple[int, int], deque] = {}
+
+    def record(self, num_sections: int, search_depth: int, seconds: float):
+        """Record the duration of a finished job."""
+        key = (num_sections, search_depth)
+        if key not in self.samples:
+            self.samples[key] = deque(maxlen=self.window)
+        self.samples[key].append(seconds)
+
+    def estimate(self, search_depth: int, num_sections: Optional[int] = None) -> float:
+        """Estimate the duration of a job from the median of similar jobs."""
+        if num_sections is not None and self.samples.get((num_sections, search_depth)):
+            return statistics.median(self.samples[(num_sections, search_depth)])
+
+        same_depth = [s for (_, depth), values in self.samples.items() if depth == search_depth for s in values]
+        if same_depth:
+            return statistics.median(same_depth)
+
+        all_samples = self.all_samples()
+        if all_samples:
+            return statistics.median(all_samples)
+        return self.default_seconds
+
+    def all_samples(self) -> List[float]:
+        return [s for values in self.samples.values() for s in values]
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Return the p-th percentile (0-100) over every recorded duration."""
+        samples = sorted(self.all_samples())
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, int(round(p / 100 * (len(samples) - 1)))))
+        return samples[index]
+
+class ScheduledJob:
+    """A job waiting in, or dispatched from, the scheduler."""
+
+    def __init__(self, job_id: str, request: Any, priority: int, search_depth: int, seq: int):
+        self.job_id = job_id
+        self.request = request
+        self.priority = priority
+        self.search_depth = search_depth
+        self.seq = seq  # Tie-breaker of the job's heap entry, telling it from entries of removed jobs
+        self.num_sections: Optional[int] = None  # Known once the job's plan is written
+        self.enqueued_at = time.time()
+        self.started_at: Optional[float] = None
+
+class JobScheduler:
+    """Priority queue of report jobs with queue positions and measured ETAs.
+
+    Higher priority jobs are dispatched first; jobs with equal priority are
+    dispatched in submission order. Workers block on `get` and are woken as
+    soon as a job is queued. Removed jobs leave their heap entries behind;
+    they are skipped when popped, and the heap is compacted once they
+    outnumber the waiting jobs.
+    """
+
+    def __init__(self, num_workers: int, histogram: Optional[DurationHistogram] = None):
+        self.num_workers = num_workers
+        self.histogram = histogram or DurationHistogram()
+        self.heap: List[Tuple[int, int, str]] = []
+        self.waiting: Dict[str, ScheduledJob] = {}
+        self.running: Dict[str, ScheduledJob] = {}
+        self.counter = itertools.count()
+        self.available = asyncio.Condition()
+
+    def __len__(self) -> int:
+        return len(self.waiting)
+
+    async def put(self, job_id: str, request: Any, priority: int = 0, search_depth: int = 2):
+        """Add a job to the queue."""
+        job = ScheduledJob(job_id, request, priority, search_depth, next(self.counter))
+        self.waiting[job_id] = job
+        heapq.heappush(self.heap, (-priority, job.seq, job_id))
+        async with self.available:
+            self.available.notify()
+
+    async def get(self) -> ScheduledJob:
+        """Wait for the highest-priority job and mark it as running."""
+        async with self.available:
+            while True:
+                while self.heap:
+                    entry = heapq.heappop(self.heap)
+                    if not self._is_waiting(entry):
+                        # Removed while it was waiting
+                        continue
+                    job = self.waiting.pop(entry[2])
+                    job.started_at = time.time()
+                    self.running[job.job_id] = job
+                    return job
+                await self.available.wait()
+
+    def _is_waiting(self, entry: Tuple[int, int, str]) -> bool:
+        job = self.waiting.get(entry[2])
+        return job is not None and job.seq == entry[1]
+
+    def remove(self, job_id: str) -> bool:
+        """Drop a job that has not started yet."""
+        if self.waiting.pop(job_id, None) is None:
+            return False
+        if len(self.heap) > 2 * len(self.waiting) + 16:
+            self.heap = [entry for entry in self.heap if self._is_waiting(entry)]
+            heapq.heapify(self.heap)
+        return True
+
+    def planned(self, job_id: str, num_sections: int):
+        """Note the section count of a running job, so its ETA uses jobs of the same size."""
+        job = self.running.get(job_id)
+        if job is not None:
+            job.num_sections = num_sections
+
+    def finished(self, job_id: str):
+        """Forget a job once its worker is done with it."""
+        self.running.pop(job_id, None)
+
+    def record_duration(self, num_sections: int, search_depth: int, seconds: float):
+        self.histogram.record(num_sections, search_depth, seconds)
+
+    def ordered_waiting(self) -> List[ScheduledJob]:
+        """Waiting jobs in dispatch order."""
+        return [self.waiting[entry[2]] for entry in sorted(self.heap) if self._is_waiting(entry)]
+
+    def queue_snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """Map every waiting job to its (position, estimated seconds until done).
+
+        Workers are simulated as a list of times at which they become free:
+        running jobs free their worker after their estimated remaining time,
+        and each waiting job takes the earliest free worker in dispatch order.
+        Running jobs whose plan is written are estimated from jobs with the
+        same number of sections; waiting jobs only from their search depth.
+        """
+        now = time.time()
+        free_at = [
+            max(0.0, self.histogram.estimate(job.search_depth, job.num_sections) - (now - job.started_at))
+            for job in self.running.values()
+        ]
+        free_at += [0.0] * max(0, self.num_workers - len(free_at))
+        heapq.heapify(free_at)
+
+        snapshot = {}
+        for position, job in enumerate(self.ordered_waiting(), 1):
+            start = heapq.heappop(free_at)
+            done = start + self.histogram.estimate(job.search_depth)
+            heapq.heappush(free_at, done)
+            snapshot[job.job_id] = (position, int(round(done)))
+        return snapshot
@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+class SearchResultCache:
+    """Per-query search responses shared by every report running in the process.
+
+    Reports on related topics, and batches of them in particular, issue
+    many identical queries. Responses are cached per (search API, params,
+    query) for `ttl_seconds`, queries already being fetched by another
+    report are awaited instead of sent again, and at most `max_concurrency`
+    provider calls per search API are in flight at once so all reports
+    draw on one rate-limit budget.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 3600.0, max_concurrency: int = 4):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_concurrency = max_concurrency
+        self.entries: "OrderedDict[Tuple[str, str, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.inflight: Dict[Tuple[str, str, str], asyncio.Future] = {}
+        self.limits: Dict[str, asyncio.Semaphore] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @staticmethod
+    def key(search_api: str, params: Dict[str, Any], query: str) -> Tuple[str, str, str]:
+        return search_api, json.dumps(params, sort_keys=True, default=str), " ".join(query.split()).casefold()
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        stored_at, response = entry
+        if time.time() - stored_at > self.ttl_seconds:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return response
+
+    def put(self, key: Tuple[str, str, str], response: Dict[str, Any]):
+        self.entries[key] = (time.time(), response)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def limit(self, search_api: str) -> asyncio.Semaphore:
+        if search_api not in self.limits:
+            self.limits[search_api] = asyncio.Semaphore(self.max_concurrency)
+        return self.limits[search_api]
+
+    async def search(self, search_api: str, query_list: List[str], params: Dict[str, Any],
+                     fetch: Callable[[List[str]], Awaitable[List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        """Responses for `query_list` in order, calling `fetch` only for queries nobody has answered."""
+        if self.loop is not asyncio.get_running_loop():
+            # Process-pool workers run every report on a fresh loop; futures and semaphores are loop-bound
+            self.loop = asyncio.get_running_loop()
+            self.inflight, self.limits = {}, {}
+
+        keys = [self.key(search_api, params, query) for query in query_list]
+        responses: Dict[Tuple[str, str, str], Any] = {}
+        missing: List[str] = []
+        owned: Dict[Tuple[str, str, str], asyncio.Future] = {}
+        for query, key in zip(query_list, keys):
+            if key in responses or key in owned:
+                continue
+            cached = self.get(key)
+            if cached is not None:
+                responses[key] = cached
+            elif key in self.inflight:
+                responses[key] = self.inflight[key]
+            else:
+                owned[key] = self.inflight[key] = self.loop.create_future()
+                missing.append(query)
+
+        if missing:
+            try:
+                async with self.limit(search_api):
+                    fetched = await fetch(missing)
+                by_query = {self.key(search_api, params, response.get("query", query)): response
+                            for query, response in zip(missing, fetched)}
+                for key, future in owned.items():
+                    response = by_query.get(key) or {"query": key[2], "results": []}
+                    if not response.get("error"):
+                        # Failed queries are retried by the next report that asks
+                        self.put(key, response)
+                    future.set_result(response)
+                    responses[key] = response
+            except BaseException as e:
+                for future in owned.values():
+                    if future.done():
+                        continue
+                    if isinstance(e, asyncio.CancelledError):
+                        # Waiters fetch the query themselves when the report that owned it is cancelled
+                        future.cancel()
+                    else:
+                        future.set_exception(e)
+                        # Nobody else may be waiting; keep the loop from logging it
+                        future.exception()
+                raise
+            finally:
+                for key in owned:
+                    self.inflight.pop(key, None)
+
+        results = []
+        for query, key in zip(query_list, keys):
+            response = responses[key]
+            if isinstance(response, asyncio.Future):
+                try:
+                    response = await asyncio.shield(response)
+                except asyncio.CancelledError:
+                    if not response.cancelled():
+                        raise
+                    response = (await self.search(search_api, [query], params, fetch))[0]
+            results.append(response)
+        return results
+
+def create_search_cache() -> SearchResultCache:
+    return SearchResultCache(
+        max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "2048")),
+        ttl_seconds=float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "3600")),
+        max_concurrency=int(os.getenv("SEARCH_CONCURRENCY", "4")),
+    )
@@ -0,0 +1,141 @@
+import os
+import asyncio
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import aiohttp
+
+class HTTPPool:
+    """Connection pools for search requests, shared by every job in the process.
+
+    Each event loop gets one aiohttp session, whose connector keeps
+    connections alive between requests, caches DNS lookups and caps
+    connections overall and per host, and one instance of each SDK client
+    (Tavily, Exa) that holds its own pool. `request_limit` gives APIs a cap on
+    requests in flight across all jobs. Sessions, clients and limits are
+    bound to the loop that created them. The server's loop runs every job in
+    "async" mode; a process-pool job runs on a loop of its own and closes
+    its pools when it finishes.
+    """
+
+    def __init__(self, max_connections: int = 100, max_connections_per_host: int = 10, dns_ttl_seconds: int = 300,
+                 keepalive_seconds: float = 30.0):
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.dns_ttl_seconds = dns_ttl_seconds
+        self.keepalive_seconds = keepalive_seconds
+        self.pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+    def _pool(self) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        if loop not in self.pools:
+            self.pools[loop] = {"session": None, "clients": {}, "limits": {}}
+        return self.pools[loop]
+
+    def session(self) -> aiohttp.ClientSession:
+        """The running loop's shared session."""
+        pool = self._pool()
+        if pool["session"] is None or pool["session"].closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections,
+                                             limit_per_host=self.max_connections_per_host,
+                                             ttl_dns_cache=self.dns_ttl_seconds,
+                                             keepalive_timeout=self.keepalive_seconds)
+            pool["session"] = aiohttp.ClientSession(connector=connector)
+        return pool["session"]
+
+    def client(self, name: str, factory: Callable[[], Any],
+               close: Optional[Callable[[Any], Awaitable[None]]] = None) -> Any:
+        """The running loop's instance of an SDK client, built by `factory` on first use.
+
+        `close` releases the client's connections when the pool is closed;
+        by default its own `close()` coroutine is awaited.
+        """
+        clients = self._pool()["clients"]
+        if name not in clients:
+            clients[name] = (factory(), close)
+        return clients[name][0]
+
+    def request_limit(self, name: str, max_concurrency: int) -> asyncio.Semaphore:
+        """The running loop's cap on concurrent requests to API `name`, created with `max_concurrency` slots."""
+        limits = self._pool()["limits"]
+        if name not in limits:
+            limits[name] = asyncio.Semaphore(max(1, max_concurrency))
+        return limits[name]
+
+    async def close(self):
+        """Close the running loop's session and clients."""
+        pool = self.pools.pop(asyncio.get_running_loop(), None)
+        if pool is None:
+            return
+        for name, (client, close) in pool["clients"].items():
+            try:
+                if close is not None:
+                    await close(client)
+                elif hasattr(client, "close"):
+                    await client.close()
+            except Exception as e:
+                print(f"Error closing {name} search client: {e}")
+        if pool["session"] is not None:
+            await pool["session"].close()
+
+    def snapshot(self) -> Dict[str, Any]:
+        pools = list(self.pools.values())
+        sessions = [pool["session"] for pool in pools if pool["session"] is not None and not pool["session"].closed]
+        return {
+            "loops": len(pools),
+            "sessions": len(sessions),
+            "clients": sorted({name for pool in pools for name in pool["clients"]}),
+        }
+
+def create_http_pool() -> HTTPPool:
+    return HTTPPool(
+        max_connections=int(os.getenv("SEARCH_HTTP_MAX_CONNECTIONS", "100")),
+        max_connections_per_host=int(os.getenv("SEARCH_HTTP_MAX_CONNECTIONS_PER_HOST", "10")),
+        dns_ttl_seconds=int(os.getenv("SEARCH_HTTP_DNS_TTL_SECONDS", "300")),
+        keepalive_seconds=float(os.getenv("SEARCH_HTTP_KEEPALIVE_SECONDS", "30")),
+    )
+
+SEARCH_HTTP = create_http_pool()
+
+class SearchProvider:
+    """A search API: a name, the search_api_config keys it accepts, and how to run queries.
+
+    `search` takes the query strings and returns one Tavily-shaped response
+    dict per query. The default implementation calls the async function
+    the provider was registered with; subclasses may override it instead.
+    """
+
+    def __init__(self, name: str, search: Optional[Callable[..., Awaitable[List[dict]]]] = None,
+                 params: Sequence[str] = ()):
+        self.name = name
+        self.params = tuple(params)
+        self._search = search
+
+    def filter_params(self, search_api_config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """The entries of `search_api_config` this provider accepts."""
+        return {k: v for k, v in (search_api_config or {}).items() if k in self.params}
+
+    async def search(self, queries: List[str], **params: Any) -> List[dict]:
+        if self._search is None:
+            raise NotImplementedError(f"Search provider {self.name} has no search function")
+        return await self._search(queries, **params)
+
+class SearchProviderRegistry:
+    """Search providers by the `search_api` name they are configured with."""
+
+    def __init__(self):
+        self.providers: Dict[str, SearchProvider] = {}
+
+    def register(self, provider: SearchProvider) -> SearchProvider:
+        self.providers[provider.name] = provider
+        return provider
+
+    def get(self, name: str) -> SearchProvider:
+        if name not in self.providers:
+            raise ValueError(f"Unsupported search API: {name}")
+        return self.providers[name]
+
+    def names(self) -> List[str]:
+        return sorted(self.providers)
+
+SEARCH_PROVIDERS = SearchProviderRegistry()
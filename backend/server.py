@@ -1,24 +1,52 @@
 import os
+import math
 import uuid
 import time
 import asyncio
-import json
-from typing import Dict, Optional, Any
-from collections import deque
-import threading
+import socket
+from typing import Dict, List, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException, Depends, Security, status
+from fastapi import FastAPI, HTTPException, Depends, Security, Header, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import APIKeyHeader
-from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
+from configuration import Configuration
+from executor import JobExecutor
 from graph import graph
-from state import ReportStateInput
+from models import MODELS
+from search_providers import SEARCH_HTTP
+from rate_limits import RATE_LIMITS
+from events import format_sse
+from broker import create_broker
+from metrics import METRICS, ACTIVE_JOBS, QUEUE_DEPTH, WORKER_CAPACITY
+from health import PROVIDER_CIRCUITS, EventLoopMonitor, InstrumentedThreadPoolExecutor, Readiness
+from report_cache import report_cache_key
+from job_store import defer_to_store_thread, drain_store_thread, in_store_thread
+from jobs import (JOBS, JOB_EVENTS, BATCHES, REPORT_CACHE, MAX_JOB_AGE_SECONDS, JobStatus, JobResult, ReportRequest,
+                  BatchReportRequest, BatchResult, batch_result, build_report_config, cancel_job, job_is_active,
+                  job_result, process_report_job, publish_status)
 
 # Load environment variables
 load_dotenv()
 
+class ServerMode:
+    ALL = "all"  # API and report workers in one process
+    API = "api"  # API only; research workers (worker.py) lease jobs from the broker
+
+SERVER_MODE = os.getenv("SERVER_MODE", ServerMode.ALL)
+if SERVER_MODE not in (ServerMode.ALL, ServerMode.API):
+    raise ValueError(f"Unsupported server mode: {SERVER_MODE}")
+if SERVER_MODE == ServerMode.API and os.getenv("JOB_STORE", "memory") != "sqlite":
+    raise RuntimeError("SERVER_MODE=api needs JOB_STORE=sqlite so workers can share job records")
+
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "500"))
+# Recorded on jobs this process runs, so a restarted server only resumes jobs whose process is gone
+PROCESS_ID = f"{socket.gethostname()}:{os.getpid()}"
+# Event loop lag beyond which the server reports itself busy even with free workers
+MAX_LOOP_LAG_MS = float(os.getenv("MAX_LOOP_LAG_MS", "1000"))
+
 # Create FastAPI app
 app = FastAPI(
     title="DeeRes API",
@@ -47,208 +75,344 @@ async def get_api_key(api_key_header: str = Security(api_key_header)):
         detail="Invalid or missing API Key",
     )
 
-# Models for API requests and responses
-class ReportRequest(BaseModel):
-    topic: str = Field(..., description="The topic for the report")
-    config_overrides: Optional[Dict[str, Any]] = Field(None, description="Optional configuration overrides")
-
-class ReportResponse(BaseModel):
-    topic: str = Field(..., description="The topic of the report")
-    content: str = Field(..., description="The generated report content")
-
-# In-memory job store (replace with Redis or database in production)
-JOBS = {}
-ACTIVE_JOBS_QUEUE = deque(maxlen=10)  # Limit concurrent jobs
-MAX_JOB_AGE_SECONDS = 3600  # 1 hour
-
-class JobStatus:
-    QUEUED = "queued"
-    PROCESSING = "processing"
-    COMPLETED = "completed"
-    FAILED = "failed"
-
-class JobResult(BaseModel):
-    job_id: str
-    status: str
-    progress: float = 0.0
-    message: str = ""
-    report: Optional[ReportResponse] = None
-    position_in_queue: Optional[int] = None
-    estimated_time: Optional[int] = None
-    error: Optional[str] = None
-
 # Check server readiness
 @app.get("/health")
 async def health_check():
-    """Health check endpoint with server load information."""
-    current_load = len(ACTIVE_JOBS_QUEUE)
-    server_status = "busy" if current_load >= ACTIVE_JOBS_QUEUE.maxlen else "ready"
-    
-    # Check for cold start
-    is_cold_start = time.time() - app.state.startup_time < 30 if hasattr(app.state, "startup_time") else True
-    
+    """Health check endpoint with measured load, saturation and provider state.
+
+    `server_status` is "busy" when every worker is running a job or the
+    event loop is lagging, and `is_warming_up` stays true until the model
+    clients (or, with SERVER_MODE=api, at least one research worker) are ready.
+    """
+    readiness = app.state.readiness
+    if SERVER_MODE == ServerMode.API:
+        # Load is whatever the research workers report through the broker
+        broker = app.state.broker
+        stats, p95_duration = await in_store_thread(lambda: (broker.stats(), broker.duration_percentile(95)))
+        current_load, max_capacity, queued_jobs = stats["leased"], stats["capacity"], stats["queued"]
+        if stats["capacity"]:
+            readiness.ready("research_workers")
+        else:
+            readiness.pending("research_workers")
+    else:
+        executor = app.state.executor
+        current_load, max_capacity, queued_jobs = len(executor.active_jobs), executor.capacity, executor.pending
+        p95_duration = executor.scheduler.histogram.percentile(95)
+
+    event_loop = app.state.loop_monitor.snapshot()
+    workers_full = current_load >= max_capacity
+    server_status = "busy" if workers_full or event_loop["lag_ms"] > MAX_LOOP_LAG_MS else "ready"
+
     return {
         "status": "ok",
         "server_status": server_status,
         "current_load": current_load,
-        "max_capacity": ACTIVE_JOBS_QUEUE.maxlen,
-        "is_warming_up": is_cold_start
+        "max_capacity": max_capacity,
+        "queued_jobs": queued_jobs,
+        "is_warming_up": not readiness.is_ready,
+        "warmup": readiness.components,
+        "worker_utilization": round(current_load / max_capacity, 3) if max_capacity else 1.0,
+        "saturation": round((current_load + queued_jobs) / max_capacity, 3) if max_capacity else None,
+        "event_loop": event_loop,
+        "thread_pool": app.state.thread_pool.snapshot(),
+        "p95_job_duration_seconds": round(p95_duration, 1) if p95_duration is not None else None,
+        "providers": PROVIDER_CIRCUITS.snapshot(),
+        "rate_limits": RATE_LIMITS.snapshot(),
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics for graph nodes, search providers, models and the job queue."""
+    if SERVER_MODE == ServerMode.API:
+        stats = await in_store_thread(app.state.broker.stats)
+        QUEUE_DEPTH.set(stats["queued"])
+        ACTIVE_JOBS.set(stats["leased"])
+        WORKER_CAPACITY.set(stats["capacity"])
+    else:
+        executor = app.state.executor
+        QUEUE_DEPTH.set(executor.pending)
+        ACTIVE_JOBS.set(len(executor.active_jobs))
+        WORKER_CAPACITY.set(executor.capacity)
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
 @app.on_event("startup")
 async def startup_event():
-    app.state.startup_time = time.time()
+    app.state.readiness = Readiness()
+    app.state.loop_monitor = EventLoopMonitor()
+    app.state.loop_monitor.start()
+    # Blocking search clients and sync model calls run here; /health reports how busy it is
+    app.state.thread_pool = InstrumentedThreadPoolExecutor(thread_name_prefix="blocking")
+    asyncio.get_running_loop().set_default_executor(app.state.thread_pool)
+    if SERVER_MODE == ServerMode.API:
+        # Jobs are handed to research workers through the broker
+        app.state.broker = create_broker()
+        app.state.readiness.pending("research_workers")
+    else:
+        # Start the fixed pool of report workers on this event loop
+        app.state.executor = JobExecutor.from_env(process_report_job, on_queue_change=refresh_queue_positions)
+        await app.state.executor.start()
+        asyncio.create_task(app.state.readiness.track("model_clients", app.state.executor.warm_up()))
+        await resume_interrupted_jobs()
     # Start background task to clean up old jobs
     asyncio.create_task(cleanup_old_jobs())
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.loop_monitor.stop()
+    if SERVER_MODE == ServerMode.API:
+        app.state.broker.close()
+    else:
+        await app.state.executor.shutdown()
+        MODELS.close()
+        await SEARCH_HTTP.close()
+    await drain_store_thread()
+    JOBS.close()
+    BATCHES.close()
+    JOB_EVENTS.close()
+    REPORT_CACHE.close()
+
+def owner_is_gone(owner: Optional[str]) -> bool:
+    """Whether the server process that ran a job has exited."""
+    if not owner:
+        return True
+    host, pid = owner.rsplit(":", 1)
+    if host != socket.gethostname():
+        # Another host's processes cannot be checked from here
+        return False
+    if int(pid) == os.getpid():
+        # A previous process with our pid, as after a container restart
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+async def resume_interrupted_jobs():
+    """Requeue jobs a previous server process left queued or running.
+
+    Their graph threads continue from the last checkpoint, so completed
+    planning, searches and sections are not redone. Only the SQLite job
+    store outlives a restart.
+    """
+    interrupted = await in_store_thread(claim_interrupted_jobs)
+    for job_id, request, search_depth in interrupted:
+        await app.state.executor.submit(job_id, request, priority=request.priority, search_depth=search_depth)
+    if interrupted:
+        print(f"Resuming {len(interrupted)} interrupted jobs")
+
+def claim_interrupted_jobs() -> List[Tuple[str, ReportRequest, int]]:
+    """Take over the queued and running jobs of server processes that are gone."""
+    claimed = []
+    for job_id in JOBS.ids_with_status(JobStatus.QUEUED, JobStatus.PROCESSING):
+        job_data = JOBS.get(job_id)
+        if job_data is None or "request" not in job_data or not owner_is_gone(job_data.get("owner")):
+            continue
+        JOBS.update(job_id, status=JobStatus.QUEUED, message="Resuming after restart", owner=PROCESS_ID)
+        publish_status(job_id)
+        claimed.append((job_id, ReportRequest(**job_data["request"]), job_data.get("search_depth", 2)))
+    return claimed
+
+def evict_expired_jobs() -> List[str]:
+    """Delete expired job and batch records with their events; returns the evicted job ids."""
+    cutoff = time.time() - MAX_JOB_AGE_SECONDS
+    # Expired jobs are removed with one range delete on created_at
+    expired = JOBS.evict_older_than(cutoff)
+    for job_id in expired:
+        if SERVER_MODE == ServerMode.API:
+            app.state.broker.forget(job_id)
+        JOB_EVENTS.drop(job_id)
+    BATCHES.evict_older_than(cutoff)
+    return expired
+
 async def cleanup_old_jobs():
     while True:
         try:
-            current_time = time.time()
-            job_ids_to_remove = []
-            
-            for job_id, job_data in JOBS.items():
-                if current_time - job_data["created_at"] > MAX_JOB_AGE_SECONDS:
-                    job_ids_to_remove.append(job_id)
-            
-            for job_id in job_ids_to_remove:
-                del JOBS[job_id]
+            for job_id in await in_store_thread(evict_expired_jobs):
+                if SERVER_MODE != ServerMode.API:
+                    app.state.executor.scheduler.remove(job_id)
+                await graph.checkpointer.adelete_thread(job_id)
+            # Also catches threads of jobs whose record is already gone
+            await graph.checkpointer.aevict()
                 
             await asyncio.sleep(300)  # Check every 5 minutes
         except Exception as e:
             print(f"Error cleaning up jobs: {str(e)}")
             await asyncio.sleep(300)
 
+def broker_eta(position: int, capacity: int, duration: float) -> int:
+    """Seconds until the job at `position` in the broker queue is done."""
+    # Jobs ahead drain in rounds of `capacity`, after the running round finishes
+    return int((math.ceil(position / max(1, capacity)) + 1) * duration)
+
+def broker_queue_snapshot() -> Dict[str, tuple]:
+    """Queue position and ETA of every job still waiting in the broker."""
+    broker = app.state.broker
+    capacity = broker.stats()["capacity"]
+    duration = broker.median_duration() or 60
+    snapshot = {}
+    for job_id in JOBS.ids_with_status(JobStatus.QUEUED):
+        position = broker.position(job_id)
+        if position is not None:
+            snapshot[job_id] = (position, broker_eta(position, capacity, duration))
+    return snapshot
+
+def broker_queue_estimate(job_id: str) -> Optional[tuple]:
+    broker = app.state.broker
+    position = broker.position(job_id)
+    if position is None:
+        return None
+    return position, broker_eta(position, broker.stats()["capacity"], broker.median_duration() or 60)
+
+async def queue_estimate(job_id: str) -> Optional[tuple]:
+    """Queue position and ETA of one waiting job, or None once it has left the queue."""
+    if SERVER_MODE == ServerMode.API:
+        return await in_store_thread(broker_queue_estimate, job_id)
+    return app.state.executor.scheduler.queue_snapshot().get(job_id)
+
+def refresh_queue_positions():
+    """Store the queue position and ETA of every waiting job whose position has moved.
+
+    Called whenever the queue changes; the store work is handed to the
+    store thread, while the scheduler's snapshot is taken right away.
+    """
+    if SERVER_MODE == ServerMode.API:
+        defer_to_store_thread(lambda: store_queue_positions(broker_queue_snapshot()))
+    else:
+        defer_to_store_thread(store_queue_positions, app.state.executor.scheduler.queue_snapshot())
+
+def store_queue_positions(snapshot: Dict[str, tuple]):
+    for job_id, (position, estimated_time) in snapshot.items():
+        job_data = JOBS.get(job_id)
+        if job_data and job_data["status"] == JobStatus.QUEUED and job_data.get("position_in_queue") != position:
+            JOBS.update(job_id,
+                        position_in_queue=position,
+                        estimated_time=estimated_time,
+                        message=f"Queued (position {position})")
+            publish_status(job_id)
+
 # Modified endpoint to start report generation
 @app.post("/generate-report", response_model=JobResult)
 async def start_report_generation(request: ReportRequest, api_key: str = Depends(get_api_key)):
     """
     Start generating a report asynchronously and return a job ID immediately.
     """
-    job_id = str(uuid.uuid4())
+    return await submit_report(request)
+
+@app.post("/generate-reports", response_model=BatchResult)
+async def start_batch_generation(request: BatchReportRequest, api_key: str = Depends(get_api_key)):
+    """
+    Start a group of reports, for several topics or for several report
+    structures of one topic, and return a batch ID to follow them with.
     
-    # Check server load
-    if len(ACTIVE_JOBS_QUEUE) >= ACTIVE_JOBS_QUEUE.maxlen:
-        position = len(ACTIVE_JOBS_QUEUE) + 1
-        JOBS[job_id] = {
-            "status": JobStatus.QUEUED,
-            "progress": 0.0,
-            "message": f"Queued (position {position})",
-            "created_at": time.time(),
-            "request": request.dict(),
-            "position_in_queue": position,
-            "estimated_time": position * 60  # Rough estimate: 1 minute per job
-        }
-        return JobResult(
-            job_id=job_id,
-            status=JobStatus.QUEUED,
-            message=f"Your request is queued (position {position})",
-            position_in_queue=position,
-            estimated_time=position * 60
-        )
+    Reports in a batch share work: identical requests run once, and every
+    report draws on the same per-query search cache and search rate limits.
+    """
+    try:
+        reports = request.expand()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(reports) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"A batch can hold at most {MAX_BATCH_SIZE} reports")
     
-    # Create job record
-    JOBS[job_id] = {
+    job_ids = [(await submit_report(report)).job_id for report in reports]
+    batch_id = str(uuid.uuid4())
+    return await in_store_thread(create_batch, batch_id, job_ids)
+
+def create_batch(batch_id: str, job_ids: List[str]) -> BatchResult:
+    BATCHES.create(batch_id, {
         "status": JobStatus.PROCESSING,
-        "progress": 0.0,
-        "message": "Starting research...",
         "created_at": time.time(),
-        "request": request.dict()
-    }
-    
-    # Start processing in background thread
-    threading.Thread(
-        target=process_report_job,
-        args=(job_id, request)
-    ).start()
+        "job_ids": job_ids
+    })
+    return batch_result(batch_id, BATCHES.get(batch_id))
+
+@app.get("/batches/{batch_id}", response_model=BatchResult)
+async def get_batch_status(batch_id: str, api_key: str = Depends(get_api_key)):
+    """
+    Check the combined progress of a batch and the status of each of its reports.
+    """
+    result = await in_store_thread(find_batch, batch_id)
+    if result is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Batch with ID {batch_id} not found"
+        )
+    return result
+
+def find_batch(batch_id: str) -> Optional[BatchResult]:
+    batch_data = BATCHES.get(batch_id)
+    return batch_result(batch_id, batch_data) if batch_data is not None else None
+
+async def submit_report(request: ReportRequest) -> JobResult:
+    """Create a job for a report request, unless it is cached or already running."""
+    job_id = str(uuid.uuid4())
+    configuration = Configuration.from_runnable_config(build_report_config(request, job_id))
+    cache_key = report_cache_key(request.topic, configuration)
+    # Jobs submitted earlier may not have reached a worker yet; they count against the free workers too
+    queued = SERVER_MODE == ServerMode.API or app.state.executor.free_slots == 0
+    job_id, start = await in_store_thread(create_report_job, job_id, request, configuration, cache_key, queued)
+    if start:
+        # Jobs wait in the scheduler when every worker is busy; queue positions are refreshed on submit
+        await app.state.executor.submit(job_id, request, priority=request.priority,
+                                        search_depth=configuration.max_search_depth)
     
     # Return immediately with job ID
-    return JobResult(
-        job_id=job_id,
-        status=JobStatus.PROCESSING,
-        message="Research started. Please check job status to monitor progress."
-    )
+    return await in_store_thread(job_result, job_id)
 
-def process_report_job(job_id: str, request: ReportRequest):
-    """Process report generation in background thread"""
-    try:
-        ACTIVE_JOBS_QUEUE.append(job_id)
-        
-        # Update job status
-        JOBS[job_id]["status"] = JobStatus.PROCESSING
-        JOBS[job_id]["progress"] = 0.1
-        JOBS[job_id]["message"] = "Planning report structure..."
-        
-        # Set up config like in the original function
-        thread_id = str(uuid.uuid4())
-        config_base = {
-            "configurable": {
-                "search_api": os.getenv("SEARCH_API"),
-                "planner_provider": os.getenv("PLANNER_PROVIDER"),
-                "planner_model": os.getenv("PLANNER_MODEL"),
-                "writer_provider": os.getenv("WRITER_PROVIDER"),
-                "writer_model": os.getenv("WRITER_MODEL"),
-                "thread_id": thread_id,
-            }
-        }
-        
-        # Apply overrides
-        if request.config_overrides:
-            for key, value in request.config_overrides.items():
-                config_base["configurable"][key] = value
-        
-        # For each major step, update progress
-        topic_input = ReportStateInput(topic=request.topic)
-        
-        # Run the graph synchronously in this thread
-        # Mock progress updates (in production, these would come from actual graph progress)
-        progress_steps = [
-            (0.2, "Generating search queries..."),
-            (0.3, "Searching for relevant information..."),
-            (0.5, "Analyzing search results..."),
-            (0.7, "Writing report sections..."),
-            (0.9, "Reviewing and refining content...")
-        ]
-        
-        for progress, message in progress_steps:
-            # In a real implementation, these updates would be interspersed with actual processing
-            JOBS[job_id]["progress"] = progress
-            JOBS[job_id]["message"] = message
-            time.sleep(2)  # Simulate work happening
-        
-        # Run the actual graph
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(graph.ainvoke(topic_input, config=config_base))
-        loop.close()
-        
-        # Check for the final report in the result
-        if isinstance(result, dict) and "final_report" in result:
-            # Store the completed report
-            JOBS[job_id]["status"] = JobStatus.COMPLETED
-            JOBS[job_id]["progress"] = 1.0
-            JOBS[job_id]["message"] = "Report completed"
-            JOBS[job_id]["report"] = {
-                "topic": request.topic,
-                "content": result["final_report"]
-            }
-        else:
-            # If no final report was returned
-            JOBS[job_id]["status"] = JobStatus.FAILED
-            JOBS[job_id]["message"] = "Failed to generate report"
-            JOBS[job_id]["error"] = "Graph finished but did not return a final report"
+def create_report_job(job_id: str, request: ReportRequest, configuration: Configuration, cache_key: str,
+                      queued: bool) -> Tuple[str, bool]:
+    """Store the job for a report request.
+
+    Returns the id of the job that answers the request, and whether this
+    process's executor still has to run it.
+    """
+    # Identical requests are answered from the report cache...
+    cached_report = REPORT_CACHE.get(cache_key) if request.use_cache else None
+    if cached_report:
+        JOBS.create(job_id, {
+            "status": JobStatus.COMPLETED,
+            "progress": 1.0,
+            "message": "Report completed (cached)",
+            "created_at": time.time(),
+            "request": request.dict(),
+            "report": cached_report
+        })
+        publish_status(job_id)
+        JOB_EVENTS.publish(job_id, "completed", {"report": cached_report})
+        return job_id, False
+    
+    JOBS.create(job_id, {
+        "status": JobStatus.QUEUED if queued else JobStatus.PROCESSING,
+        "progress": 0.0,
+        "message": "Queued" if queued else "Starting research...",
+        "created_at": time.time(),
+        "request": request.dict(),
+        "search_depth": configuration.max_search_depth,
+        "cache_key": cache_key,
+        "owner": PROCESS_ID
+    })
     
-    except Exception as e:
-        # Handle exceptions
-        print(f"Error generating report: {str(e)}")
-        JOBS[job_id]["status"] = JobStatus.FAILED
-        JOBS[job_id]["message"] = "Error occurred during report generation"
-        JOBS[job_id]["error"] = str(e)
+    # ...or attach to the job already producing the same report
+    if request.use_cache:
+        owner = REPORT_CACHE.claim(cache_key, job_id, job_is_active)
+        # Count who is waiting on the shared job so one of them cannot cancel it for the rest
+        while owner != job_id and JOBS.increment(owner, "requesters", default=1) is None:
+            # The owner was evicted after claiming the key; it is no longer active, so this job takes over
+            owner = REPORT_CACHE.claim(cache_key, job_id, job_is_active)
+        if owner != job_id:
+            JOBS.delete(job_id)
+            return owner, False
+    publish_status(job_id)
     
-    finally:
-        # Remove from active jobs queue
-        if job_id in ACTIVE_JOBS_QUEUE:
-            ACTIVE_JOBS_QUEUE.remove(job_id)
+    if SERVER_MODE == ServerMode.API:
+        # Research workers pick the job up from the broker
+        app.state.broker.enqueue(job_id, request.dict(), priority=request.priority)
+        store_queue_positions(broker_queue_snapshot())
+        return job_id, False
+    return job_id, True
 
 # Add endpoint to check job status
 @app.get("/job-status/{job_id}", response_model=JobResult)
@@ -256,34 +420,107 @@ async def get_job_status(job_id: str, api_key: str = Depends(get_api_key)):
     """
     Check the status of a report generation job.
     """
-    if job_id not in JOBS:
+    job_data = await in_store_thread(JOBS.get, job_id)
+    if job_data is None:
         raise HTTPException(
             status_code=404,
             detail=f"Job with ID {job_id} not found"
         )
     
-    job_data = JOBS[job_id]
-    result = JobResult(
-        job_id=job_id,
-        status=job_data["status"],
-        progress=job_data["progress"],
-        message=job_data["message"]
-    )
+    # Recompute the ETA so queued jobs see time counting down between queue changes; the record is not rewritten
+    if job_data["status"] == JobStatus.QUEUED:
+        estimate = await queue_estimate(job_id)
+        if estimate is not None:
+            job_data["position_in_queue"], job_data["estimated_time"] = estimate
     
-    # Add optional fields if they exist
-    if "position_in_queue" in job_data:
-        result.position_in_queue = job_data["position_in_queue"]
+    return job_result(job_id, job_data)
+
+@app.delete("/jobs/{job_id}", response_model=JobResult)
+async def cancel_report_job(job_id: str, api_key: str = Depends(get_api_key)):
+    """
+    Cancel a queued or running job. Its graph run, including in-flight model
+    and search calls, is cancelled and its worker slot is freed right away.
+    A job shared by identical requests is only cancelled by the last of them.
+    """
+    job_data = await in_store_thread(JOBS.get, job_id)
+    if job_data is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Job with ID {job_id} not found"
+        )
+    if job_data["status"] == JobStatus.CANCELLED:
+        return job_result(job_id, job_data)
+    if job_data["status"] not in (JobStatus.QUEUED, JobStatus.PROCESSING):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job with ID {job_id} has already {job_data['status']}"
+        )
     
-    if "estimated_time" in job_data:
-        result.estimated_time = job_data["estimated_time"]
+    if await in_store_thread(JOBS.increment, job_id, "requesters", -1, default=1):
+        # Identical requests attached to this job still want the report
+        return await in_store_thread(job_result, job_id)
     
-    if "error" in job_data:
-        result.error = job_data["error"]
+    if SERVER_MODE == ServerMode.API:
+        # The worker holding the job stops it when it next checks the broker
+        await in_store_thread(app.state.broker.cancel, job_id)
+    else:
+        app.state.executor.cancel(job_id)
+    await in_store_thread(cancel_job, job_id)
+    refresh_queue_positions()
+    return await in_store_thread(job_result, job_id)
+
+def resume_position(last_event_id: Optional[str]) -> int:
+    """Parse a Last-Event-ID value; anything invalid replays from the start."""
+    try:
+        return max(0, int(last_event_id)) if last_event_id else 0
+    except ValueError:
+        return 0
+
+# Push job events instead of polling /job-status
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str,
+                            last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+                            api_key: str = Depends(get_api_key)):
+    """
+    Stream a job's status, progress, completed sections and final report as
+    Server-Sent Events. Reconnecting clients resume after `Last-Event-ID`.
+    """
+    if not await in_store_thread(JOBS.__contains__, job_id):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Job with ID {job_id} not found"
+        )
     
-    if "report" in job_data and job_data["report"]:
-        result.report = ReportResponse(**job_data["report"])
+    async def event_stream():
+        async for event in JOB_EVENTS.subscribe(job_id, resume_position(last_event_id)):
+            yield format_sse(event)
     
-    return result
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/jobs/{job_id}/events")
+async def job_events_socket(websocket: WebSocket, job_id: str):
+    """
+    Same event stream as the SSE endpoint over a WebSocket. The API key is
+    read from the X-API-Key header or the `api_key` query parameter, and
+    `last_event_id` resumes an interrupted stream.
+    """
+    api_key = websocket.headers.get(API_KEY_NAME) or websocket.query_params.get("api_key")
+    if api_key != os.getenv("API_KEY") or not await in_store_thread(JOBS.__contains__, job_id):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    try:
+        start = resume_position(websocket.query_params.get("last_event_id"))
+        async for event in JOB_EVENTS.subscribe(job_id, start, heartbeat=None):
+            await websocket.send_json(event)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
 
 if __name__ == "__main__":
     import uvicorn
@@ -29,6 +29,19 @@ class Queries(BaseModel):
         description="List of search queries.",
     )
 
+class SectionQueries(BaseModel):
+    section_name: str = Field(
+        description="Name of the report section, exactly as given.",
+    )
+    queries: List[SearchQuery] = Field(
+        description="List of search queries for this section.",
+    )
+
+class BatchQueries(BaseModel):
+    sections: List[SectionQueries] = Field(
+        description="Search queries for each report section.",
+    )
+
 class Feedback(BaseModel):
     grade: Literal["pass","fail"] = Field(
         description="Evaluation result indicating whether the response meets requirements ('pass') or needs revision ('fail')."
@@ -47,6 +60,7 @@ class ReportState(TypedDict):
     topic: str # Report topic    
     feedback_on_report_plan: str # Feedback on the report plan
     sections: list[Section] # List of report sections 
+    section_research: dict[str, dict] # Queries and search results of sections researched while planning, by name
     completed_sections: Annotated[list[Section], operator.add] # Use Annotated type with add reducer
     report_sections_from_research: str # String of any completed sections from research to write final sections
     final_report: str # Final report
@@ -0,0 +1,42 @@
+import logging
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+from pydantic import BaseModel
+
+from checkpoints import SQLiteCheckpointSaver, create_serializer
+from state import SearchQuery, Section
+
+class Unlisted(BaseModel):
+    value: str
+
+@pytest.fixture
+def saver(tmp_path):
+    saver = SQLiteCheckpointSaver(str(tmp_path / "checkpoints.db"), serde=create_serializer())
+    yield saver
+    saver.close()
+
+def put_values(saver, values):
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = values
+    checkpoint["channel_versions"] = {channel: 1 for channel in values}
+    config = {"configurable": {"thread_id": "t", "checkpoint_ns": ""}}
+    return saver.put(config, checkpoint, {}, checkpoint["channel_versions"])
+
+def test_compressed_state_round_trips_without_warnings(saver, caplog):
+    section = Section(name="Intro", description="What it is", research=True, content="text " * 2000)
+    queries = [SearchQuery(search_query="what it is")]
+    stored = create_serializer().dumps_typed([section])
+    assert stored[0].endswith("+zlib")
+
+    with caplog.at_level(logging.WARNING):
+        config = put_values(saver, {"sections": [section], "search_queries": queries})
+        loaded = saver.get_tuple(config).checkpoint["channel_values"]
+    assert loaded["sections"] == [section]
+    assert loaded["search_queries"] == queries
+    assert not [record for record in caplog.records if "msgpack" in record.getMessage()]
+
+def test_types_outside_the_allowlist_are_not_rebuilt(saver):
+    config = put_values(saver, {"other": Unlisted(value="x")})
+    loaded = saver.get_tuple(config).checkpoint["channel_values"]["other"]
+    assert not isinstance(loaded, Unlisted)
@@ -0,0 +1,55 @@
+import pytest
+
+import context_budget
+from context_budget import allocate, context_window, source_budget
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    # Count tokens from length, whether or not tiktoken can load an encoding here
+    monkeypatch.setattr(context_budget, "tokenizer", lambda model: None)
+
+def test_context_window_from_table_suffix_and_default():
+    assert context_window("llama-3.3-70b-versatile") == 131072
+    assert context_window("mixtral-8x7b-32768") == 32768
+    assert context_window("some-new-model") == context_budget.DEFAULT_CONTEXT_WINDOW
+
+def test_source_budget_keeps_output_reserve_and_margin(monkeypatch):
+    monkeypatch.setattr(context_budget, "OUTPUT_TOKENS", 2048)
+    monkeypatch.setattr(context_budget, "MAX_SOURCE_TOKENS", 100000)
+    prompt = "x" * 4000  # 1000 tokens
+    assert source_budget("llama3-8b-8192", prompt) == int(8192 * 0.95) - 1000 - 2048
+
+def test_source_budget_is_capped_for_large_windows(monkeypatch):
+    monkeypatch.setattr(context_budget, "MAX_SOURCE_TOKENS", 12000)
+    assert source_budget("gpt-4o", "short prompt") == 12000
+
+def test_source_budget_never_negative(monkeypatch):
+    monkeypatch.setattr(context_budget, "OUTPUT_TOKENS", 2048)
+    assert source_budget("llama3-8b-8192", "x" * 4 * 8192) == 0
+
+def test_source_budget_reserve_exactly_fills_window(monkeypatch):
+    monkeypatch.setattr(context_budget, "OUTPUT_TOKENS", int(8192 * 0.95) - 10)
+    assert source_budget("llama3-8b-8192", "x" * 40) == 0
+    assert source_budget("llama3-8b-8192", "x" * 36) == 1
+
+def test_allocate_gives_short_sources_all_they_need():
+    # The short source's unused share goes to the long ones
+    assert allocate([100, 5000, 5000], [1, 1, 1], 3000) == [100, 1450, 1450]
+
+def test_allocate_splits_by_weight_when_all_are_cut():
+    assert allocate([5000, 5000], [3, 1], 4000) == [3000, 1000]
+
+def test_allocate_never_exceeds_demand_or_budget():
+    demands, budget = [10, 700, 30, 2000], 1000
+    allocation = allocate(demands, [0.9, 0.2, 0.5, 0.7], budget)
+    assert all(0 <= a <= d for a, d in zip(allocation, demands))
+    assert budget - len(demands) <= sum(allocation) <= budget
+
+def test_allocate_when_everything_fits():
+    assert allocate([10, 20], [1, 1], 30) == [10, 20]
+    assert allocate([10, 20], [1, 1], 1000) == [10, 20]
+
+def test_allocate_skips_empty_sources_and_empty_budget():
+    assert allocate([0, 100], [1, 1], 50) == [0, 50]
+    assert allocate([100, 100], [1, 1], 0) == [0, 0]
+    assert allocate([], [], 100) == []
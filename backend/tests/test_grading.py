@@ -0,0 +1,51 @@
+from grading import GradingPolicy, SectionChecks, check_section, grade_locally, keywords
+
+POLICY = GradingPolicy()
+
+def checks(words=POLICY.pass_min_words, sources=POLICY.pass_min_sources, coverage=POLICY.pass_min_coverage):
+    return SectionChecks(words=words, sources=sources, coverage=coverage, missing_keywords=[])
+
+def test_keywords_drop_stopwords_short_words_and_repeats():
+    assert keywords("Explain the pricing models and the pricing of GPUs, e.g. H100") == \
+        ["pricing", "models", "gpus", "h100"]
+
+def test_check_section_counts_words_without_urls_and_distinct_sources():
+    content = ("Pricing varies [a](https://a.com/x). See https://b.com/y, "
+               "and again https://A.com/x. for models.")
+    result = check_section(content, "Pricing of hosted models")
+    assert result.sources == 2
+    assert result.words == len("Pricing varies [a]( See , and again for models.".split())
+
+def test_check_section_coverage_matches_word_stems():
+    result = check_section("The price of each model is listed.", "Pricing models for inference")
+    assert result.missing_keywords == ["inference"]
+    assert result.coverage == 0.667
+
+def test_check_section_without_description_keywords_is_fully_covered():
+    assert check_section("Anything at all.", "An overview of the topic").coverage == 1.0
+
+def test_pass_exactly_at_thresholds():
+    assert grade_locally(POLICY, checks()) == "pass"
+
+def test_just_below_any_pass_threshold_goes_to_the_grader():
+    assert grade_locally(POLICY, checks(words=POLICY.pass_min_words - 1)) is None
+    assert grade_locally(POLICY, checks(sources=POLICY.pass_min_sources - 1)) is None
+    assert grade_locally(POLICY, checks(coverage=POLICY.pass_min_coverage - 0.001)) is None
+
+def test_only_too_short_drafts_fail_locally():
+    assert grade_locally(POLICY, checks(words=POLICY.fail_below_words - 1)) == "fail"
+    assert grade_locally(POLICY, checks(words=POLICY.fail_below_words)) is None
+
+def test_uncited_or_off_topic_drafts_go_to_the_grader():
+    assert grade_locally(POLICY, checks(sources=0)) is None
+    assert grade_locally(POLICY, checks(coverage=0.0)) is None
+    assert grade_locally(POLICY, checks(sources=0, coverage=0.0)) is None
+
+def test_local_checks_off_always_defers():
+    policy = GradingPolicy.from_config({"local_checks": "false"})
+    assert grade_locally(policy, checks(words=0)) is None
+    assert grade_locally(policy, checks()) is None
+
+def test_from_config_ignores_unknown_keys():
+    policy = GradingPolicy.from_config({"pass_min_words": 200, "other": 1})
+    assert policy.pass_min_words == 200 and policy.local_checks
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+import models
+from models import ModelRegistry
+
+class FakeClient:
+    def __init__(self, provider, model):
+        self.provider = provider
+        self.model = model
+
+    def with_structured_output(self, schema):
+        return (self, schema)
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(models, "_build_model", lambda provider, model, **kwargs: FakeClient(provider, model))
+    return ModelRegistry()
+
+def test_clients_are_shared_within_a_loop(registry):
+    async def run():
+        return registry.get("m", "p"), registry.get("m", "p"), registry.get_structured("m", "p", dict)
+
+    first, second, structured = asyncio.run(run())
+    assert first is second
+    assert structured == (first, dict)
+
+def test_each_loop_gets_its_own_clients(registry):
+    async def run():
+        return registry.get("m", "p")
+
+    # Back to back asyncio.run calls, as process-pool jobs make
+    assert asyncio.run(run()) is not asyncio.run(run())
+
+def test_warmed_clients_go_to_the_first_loop(registry):
+    registry.warm([("m", "p")])
+    warmed = registry.get("m", "p")
+
+    async def run():
+        return registry.get("m", "p")
+
+    assert asyncio.run(run()) is warmed
+    assert asyncio.run(run()) is not warmed
+
+def test_release_loop_drops_the_loops_clients(registry):
+    async def run():
+        client = registry.get("m", "p")
+        registry.release_loop()
+        return client is registry.get("m", "p")
+
+    assert asyncio.run(run()) is False
+
+def test_reload_drops_one_providers_clients(registry):
+    registry.get("m", "p")
+    registry.get("m", "q")
+    assert registry.reload("p") == 1
+    assert registry.snapshot()["clients"] == 1
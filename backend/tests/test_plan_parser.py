@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from plan_parser import SectionStreamParser
+
+SECTIONS = [
+    {"name": "Intro", "description": "What \"it\" is {briefly}", "research": False, "content": ""},
+    {"name": "Path\\Escapes", "description": "Braces ] and [ in text, a \\\" quote", "research": True, "content": ""},
+    {"name": "Nested", "description": "Has a list", "research": True, "content": "", "tags": [{"a": [1, 2]}]},
+]
+PLAN = "Here is the plan:\n```json\n" + json.dumps({"sections": SECTIONS}, indent=2) + "\n```\nDone."
+
+def feed_in_chunks(text, size):
+    parser = SectionStreamParser()
+    found = []
+    for start in range(0, len(text), size):
+        found.extend(parser.feed(text[start:start + size]))
+    return parser, found
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, len(PLAN)])
+def test_sections_survive_any_chunk_size(size):
+    parser, found = feed_in_chunks(PLAN, size)
+    assert found == SECTIONS
+    assert parser.done
+
+def test_every_split_point_inside_strings_and_escapes():
+    for split in range(1, len(PLAN)):
+        parser = SectionStreamParser()
+        found = parser.feed(PLAN[:split]) + parser.feed(PLAN[split:])
+        assert found == SECTIONS, f"split at {split}: {PLAN[split - 5:split]!r}|{PLAN[split:split + 5]!r}"
+
+def test_chunk_ending_on_backslash_keeps_escape_state():
+    parser = SectionStreamParser()
+    assert parser.feed('{"sections": [{"name": "a\\') == []
+    assert parser.escaped
+    assert parser.feed('"b", "x": "}"}') == [{"name": 'a"b', "x": "}"}]
+
+def test_sections_are_returned_as_soon_as_they_close():
+    parser = SectionStreamParser()
+    assert parser.feed('{"sections": [{"name": "One"}, {"name": "Tw') == [{"name": "One"}]
+    assert parser.feed('o"}') == [{"name": "Two"}]
+    assert parser.feed("]}") == []
+    assert parser.done
+
+def test_key_split_across_chunks():
+    parser = SectionStreamParser()
+    assert parser.feed('{"sect') == []
+    assert parser.feed('ions" :\n [ {"name": "A"} ]') == [{"name": "A"}]
+
+def test_invalid_objects_are_skipped():
+    parser = SectionStreamParser()
+    assert parser.feed('{"sections": [{"name": A}, ["list"], {"name": "B"}]}') == [{"name": "B"}]
+
+def test_text_after_the_array_is_ignored():
+    parser = SectionStreamParser()
+    parser.feed('{"sections": [{"name": "A"}]}')
+    assert parser.feed('{"sections": [{"name": "B"}]}') == []
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+import rate_limits
+from rate_limits import ProviderLimiter, parse_duration
+
+def test_parse_duration_formats():
+    assert parse_duration("7.66s") == 7.66
+    assert parse_duration("2m59.5s") == 179.5
+    assert parse_duration("300ms") == 0.3
+    assert parse_duration("12") == 12.0
+    assert parse_duration("soon") is None
+    assert parse_duration(None) is None
+
+class FakeClock:
+    """Stands in for the limiter's clock and its timed waits, which move the clock on instead of sleeping.
+
+    A frozen clock never lets a timed wait run out, so only a wakeup ends it.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.frozen = False
+        self.waits = []
+
+    def monotonic(self):
+        return self.now
+
+    async def wait_for(self, awaitable, timeout):
+        self.waits.append(timeout)
+        if timeout is None or self.frozen:
+            return await awaitable
+        awaitable.close()
+        self.now += timeout
+        raise asyncio.TimeoutError
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limits.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_limits.asyncio, "wait_for", clock.wait_for)
+    return clock
+
+async def settle():
+    # Let woken tasks run; a polling waiter would still be asleep afterwards
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+def test_waiting_call_starts_as_soon_as_a_slot_is_released(clock):
+    async def run():
+        limiter = ProviderLimiter(max_concurrency=1, initial_concurrency=1)
+        cost = await limiter.acquire(10)
+        waiter = asyncio.create_task(limiter.acquire(10))
+        await settle()
+        assert not waiter.done() and limiter.waiting == 1
+        limiter.release(cost, True)
+        await settle()
+        assert waiter.done()
+        return limiter
+
+    limiter = asyncio.run(run())
+    # It waited for the release alone, never on a timer
+    assert clock.waits == [None]
+    assert limiter.in_flight == 1 and limiter.waiting == 0 and not limiter.waiters
+
+def test_release_from_another_thread_wakes_waiter(clock):
+    async def run():
+        limiter = ProviderLimiter(max_concurrency=1, initial_concurrency=1)
+        cost = await limiter.acquire(10)
+        waiter = asyncio.create_task(limiter.acquire(10))
+        await settle()
+        await asyncio.to_thread(limiter.release, cost, True)
+        await settle()
+        assert waiter.done()
+
+    asyncio.run(run())
+
+def test_waiting_for_tokens_sleeps_until_the_bucket_refills(clock):
+    async def run():
+        # 6000 tokens per minute refill 100 per second
+        limiter = ProviderLimiter(tpm=6000, max_concurrency=16)
+        limiter.output_tokens = 0
+        await limiter.acquire(6000)
+        await limiter.acquire(20)
+
+    asyncio.run(run())
+    assert clock.waits == [pytest.approx(0.2)]
+
+def test_headers_with_budget_left_wake_waiters(clock):
+    clock.frozen = True
+
+    async def run():
+        limiter = ProviderLimiter(max_concurrency=16)
+        limiter.output_tokens = 0
+        limiter.observe(200, {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "30s"})
+        waiter = asyncio.create_task(limiter.acquire(10))
+        await settle()
+        assert not waiter.done()
+        limiter.observe(200, {"x-ratelimit-remaining-requests": "5", "x-ratelimit-reset-requests": "30s"})
+        await settle()
+        assert waiter.done()
+
+    asyncio.run(run())
+    assert clock.waits == [30.0]
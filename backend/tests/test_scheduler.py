@@ -0,0 +1,66 @@
+import asyncio
+
+from scheduler import DurationHistogram, JobScheduler
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_histogram_prefers_jobs_with_the_same_section_count():
+    histogram = DurationHistogram()
+    histogram.record(3, 2, 30)
+    histogram.record(8, 2, 80)
+    assert histogram.estimate(2, 8) == 80
+    assert histogram.estimate(2) == 55
+    assert histogram.estimate(2, 5) == 55
+    assert histogram.estimate(1) == 55
+    assert DurationHistogram(default_seconds=60).estimate(2) == 60
+
+def test_running_job_eta_uses_its_section_count_once_planned():
+    async def scenario():
+        histogram = DurationHistogram()
+        histogram.record(3, 2, 30)
+        histogram.record(8, 2, 90)
+        scheduler = JobScheduler(1, histogram)
+        await scheduler.put("running", None)
+        await scheduler.put("waiting", None)
+        job = await scheduler.get()
+        job.started_at -= 10
+        before = scheduler.queue_snapshot()["waiting"]
+        scheduler.planned("running", 8)
+        after = scheduler.queue_snapshot()["waiting"]
+        return before, after
+
+    before, after = run(scenario())
+    # Depth-only median is 60: 50s left on the running job, then 60 for the waiting one
+    assert before == (1, 110)
+    # Eight sections take 90: 80s left, then 60 for the waiting job, whose plan is unknown
+    assert after == (1, 140)
+
+def test_removed_jobs_are_skipped_and_the_heap_stays_bounded():
+    async def scenario():
+        scheduler = JobScheduler(1)
+        for i in range(200):
+            await scheduler.put(f"job{i}", None)
+        for i in range(199):
+            assert scheduler.remove(f"job{i}")
+        assert not scheduler.remove("job0")
+        assert len(scheduler.heap) <= 2 * len(scheduler) + 16
+        return (await scheduler.get()).job_id, len(scheduler)
+
+    assert run(scenario()) == ("job199", 0)
+
+def test_job_queued_again_after_removal_keeps_only_its_new_place():
+    async def scenario():
+        scheduler = JobScheduler(1)
+        await scheduler.put("a", None, priority=5)
+        await scheduler.put("b", None, priority=1)
+        scheduler.remove("a")
+        await scheduler.put("a", None, priority=0)
+        order = [job.job_id for job in scheduler.ordered_waiting()]
+        dispatched = [(await scheduler.get()).job_id, (await scheduler.get()).job_id]
+        return order, dispatched, scheduler.heap
+
+    order, dispatched, heap = run(scenario())
+    assert order == ["b", "a"]
+    assert dispatched == ["b", "a"]
+    assert heap == []
@@ -0,0 +1,91 @@
+import os
+import json
+import argparse
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def load_trace(path: str, trace_id: str) -> List[Dict[str, Any]]:
+    """Finished spans of one trace from a JSONL trace file."""
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            span = json.loads(line)
+            if span["traceId"] == trace_id:
+                spans.append(span)
+    return spans
+
+def critical_path(span: Dict[str, Any], children: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Children of `span` that its end time waited on, earliest first.
+
+    Walks back from the span's end: the child that finished last before
+    that point is on the critical path, then the search continues from
+    where that child started. Time not covered by a chosen child is the
+    span's own work.
+    """
+    path = []
+    cursor = span["endTimeUnixNano"]
+    candidates = sorted(children.get(span["spanId"], []), key=lambda s: s["endTimeUnixNano"], reverse=True)
+    for child in candidates:
+        if child["endTimeUnixNano"] <= cursor:
+            path.append(child)
+            cursor = child["startTimeUnixNano"]
+    return path[::-1]
+
+def print_critical_path(span: Dict[str, Any], children: Dict[str, List[Dict[str, Any]]],
+                        origin: int, depth: int = 0):
+    duration = (span["endTimeUnixNano"] - span["startTimeUnixNano"]) / 1e9
+    offset = (span["startTimeUnixNano"] - origin) / 1e9
+    status = span.get("status", {})
+    error = f"  ERROR {status.get('message')}" if status.get("code") == "ERROR" else ""
+    detail = span.get("attributes", {}).get("url") or ""
+    print(f"{offset:9.3f}s {duration:9.3f}s  {'  ' * depth}{span['name']} [{span['kind']}] {detail}{error}".rstrip())
+    for child in critical_path(span, children):
+        print_critical_path(child, children, origin, depth + 1)
+
+def summarize(spans: List[Dict[str, Any]]):
+    """Total time and count per span kind and name, to see where a job's time went overall."""
+    totals: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0])
+    for span in spans:
+        key = f"{span['kind']} {span['name']}"
+        totals[key][0] += (span["endTimeUnixNano"] - span["startTimeUnixNano"]) / 1e9
+        totals[key][1] += 1
+    print("\nTotal time by span:")
+    for key, (seconds, count) in sorted(totals.items(), key=lambda item: -item[1][0]):
+        print(f"  {seconds:9.3f}s  {count:4d}x  {key}")
+
+def main(trace_id: str, path: str, summary: bool = False) -> Optional[int]:
+    spans = load_trace(path, trace_id)
+    if not spans:
+        print(f"No spans for job {trace_id} in {path}")
+        return 1
+    children: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    span_ids = {span["spanId"] for span in spans}
+    roots = []
+    for span in spans:
+        if span.get("parentSpanId") in span_ids:
+            children[span["parentSpanId"]].append(span)
+        else:
+            roots.append(span)
+    origin = min(span["startTimeUnixNano"] for span in spans)
+    print(f"Critical path of job {trace_id} ({len(spans)} spans)")
+    print(f"{'start':>10} {'duration':>10}  span")
+    for root in sorted(roots, key=lambda s: s["startTimeUnixNano"]):
+        print_critical_path(root, children, origin)
+    if summary:
+        summarize(spans)
+    return None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the critical path of a report job from its trace")
+    parser.add_argument("job_id", help="Job id, which is also the trace id")
+    parser.add_argument("--file", default=os.getenv("TRACE_FILE", "traces.jsonl"), help="JSONL trace file")
+    parser.add_argument("--summary", action="store_true", help="Also print total time per span name")
+    args = parser.parse_args()
+    raise SystemExit(main(args.job_id, args.file, args.summary))
@@ -0,0 +1,277 @@
+import os
+import json
+import time
+import uuid
+import queue
+import atexit
+import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Dict, Iterator, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables.config import var_child_runnable_config
+
+class Span:
+    """One timed operation of a job, exported as an OTLP-style JSON object."""
+
+    def __init__(self, tracer: "Tracer", trace_id: str, name: str, kind: str,
+                 parent_id: Optional[str] = None, attributes: Optional[Dict[str, Any]] = None,
+                 run_id: Optional[UUID] = None):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        # LangChain run the span was opened in, to tell nested spans from new runs
+        self.run_id = run_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def end(self, error: Optional[BaseException] = None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.tracer.export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+            "status": {"code": "ERROR", "message": self.error} if self.error else {"code": "OK"},
+        }
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+class Tracer:
+    """Writes finished spans to a local JSONL file, one span per line.
+
+    Tracing is off unless a file is given (TRACE_FILE). Each job is one
+    trace: `stream_report_graph` opens its root span and attaches a
+    `TracingCallback`, which opens spans for graph nodes and model calls.
+    Code running inside a node opens child spans with `span` or `traced`.
+    Every process appends to the same file, so process-pool and research
+    worker runs end up next to each other. Finished spans are queued and
+    appended by a writer thread, so the event loop never waits on the file.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.pending: "queue.SimpleQueue[Optional[str]]" = queue.SimpleQueue()
+        self.writer: Optional[threading.Thread] = None
+
+    def _after_fork(self):
+        # Threads do not survive a fork, so a forked process starts its own writer
+        self.lock = threading.Lock()
+        self.pending = queue.SimpleQueue()
+        self.writer = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def start_span(self, name: str, kind: str = "internal", trace_id: Optional[str] = None,
+                   parent: Optional[Span] = None, run_id: Optional[UUID] = None, **attributes: Any) -> Span:
+        return Span(self, trace_id or (parent.trace_id if parent else uuid.uuid4().hex), name, kind,
+                    parent.span_id if parent else None, attributes, run_id)
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", **attributes: Any) -> Iterator[Optional[Span]]:
+        """Time the enclosed block as a child of the current span or graph node."""
+        if not self.enabled:
+            yield None
+            return
+        parent, run_id = self._parent()
+        if parent is None:
+            # Outside of any job there is nothing to attach the span to
+            yield None
+            return
+        span = self.start_span(name, kind, parent=parent, run_id=run_id, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(error=e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    @staticmethod
+    def _parent():
+        current = _current_span.get()
+        config = var_child_runnable_config.get()
+        manager = config.get("callbacks") if config else None
+        run_id = getattr(manager, "parent_run_id", None)
+        if current is not None and current.run_id == run_id:
+            # Nested inside a span opened in the same graph node or model call
+            return current, run_id
+        for handler in getattr(manager, "handlers", []):
+            if isinstance(handler, TracingCallback):
+                return handler.span_for(run_id), run_id
+        return current, run_id
+
+    def export(self, span: Span):
+        if not self.enabled:
+            return
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self.lock:
+            if self.writer is None:
+                self.writer = threading.Thread(target=self._write_spans, args=(self.pending,),
+                                               name="trace-writer", daemon=True)
+                self.writer.start()
+            self.pending.put(line)
+
+    def _write_spans(self, pending: "queue.SimpleQueue[Optional[str]]"):
+        stop = False
+        while not stop:
+            # Block for the first span, then take whatever else finished meanwhile
+            lines = [pending.get()]
+            while True:
+                try:
+                    lines.append(pending.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in lines
+            lines = [line for line in lines if line is not None]
+            if lines:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write("".join(lines))
+                except OSError as e:
+                    print(f"Could not write {len(lines)} spans to {self.path}: {e}")
+
+    def flush(self):
+        """Write out every queued span and stop the writer; the next span starts a new one."""
+        with self.lock:
+            writer, self.writer = self.writer, None
+            pending, self.pending = self.pending, queue.SimpleQueue()
+            pending.put(None)
+        if writer is not None:
+            writer.join()
+
+TRACER = Tracer(os.getenv("TRACE_FILE"))
+atexit.register(TRACER.flush)
+os.register_at_fork(after_in_child=TRACER._after_fork)
+
+def traced(kind: str = "internal", name: Optional[str] = None):
+    """Decorator that records each call of a sync or async function as a span."""
+    def decorator(fn):
+        span_name = name or fn.__name__
+        if asyncio.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with TRACER.span(span_name, kind):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with TRACER.span(span_name, kind):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class TracingCallback(BaseCallbackHandler):
+    """Opens spans for the graph nodes and model calls of one job's graph run."""
+
+    def __init__(self, root: Span):
+        self.root = root
+        self.lock = threading.Lock()
+        self.parents: Dict[UUID, Optional[UUID]] = {}
+        self.spans: Dict[UUID, Span] = {}
+
+    def span_for(self, run_id: Optional[UUID]) -> Span:
+        """Span of the closest enclosing node or model call of a LangChain run."""
+        with self.lock:
+            while run_id is not None:
+                if run_id in self.spans:
+                    return self.spans[run_id]
+                run_id = self.parents.get(run_id)
+        return self.root
+
+    def _open(self, run_id: UUID, parent_run_id: Optional[UUID], name: str, kind: str, **attributes: Any):
+        parent = self.span_for(parent_run_id)
+        span = TRACER.start_span(name, kind, parent=parent, run_id=run_id, **attributes)
+        with self.lock:
+            self.parents[run_id] = parent_run_id
+            self.spans[run_id] = span
+
+    def _close(self, run_id: UUID, error: Optional[BaseException] = None, **attributes: Any):
+        with self.lock:
+            span = self.spans.pop(run_id, None)
+            self.parents.pop(run_id, None)
+        if span is not None:
+            span.attributes.update(attributes)
+            span.end(error=error)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        if node and kwargs.get("name") == node:
+            self._open(run_id, parent_run_id, node, "node")
+        else:
+            with self.lock:
+                self.parents[run_id] = parent_run_id
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._close(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        # Nodes that route with Command or interrupt raise control-flow exceptions
+        self._close(run_id, error=None if type(error).__name__.startswith("Graph") else error)
+
+    def _open_model(self, serialized, run_id, parent_run_id, metadata):
+        metadata = metadata or {}
+        provider = metadata.get("ls_provider") or (serialized or {}).get("id", ["unknown"])[-1]
+        model = metadata.get("ls_model_name") or "unknown"
+        self._open(run_id, parent_run_id, f"{provider}/{model}", "llm", provider=provider, model=model)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._open_model(serialized, run_id, parent_run_id, metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._open_model(serialized, run_id, parent_run_id, metadata)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = {}
+        for generations in response.generations:
+            for generation in generations:
+                message_usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                for key in ("input_tokens", "output_tokens"):
+                    usage[key] = usage.get(key, 0) + message_usage.get(key, 0)
+        self._close(run_id, **usage)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._close(run_id, error=error)
+
+@contextmanager
+def trace_job(trace_id: str, name: str = "report", **attributes: Any) -> Iterator[Optional[TracingCallback]]:
+    """Open the root span of a job; yields the callback to attach to its graph run."""
+    if not TRACER.enabled:
+        yield None
+        return
+    root = TRACER.start_span(name, "job", trace_id=trace_id, **attributes)
+    token = _current_span.set(root)
+    try:
+        yield TracingCallback(root)
+    except BaseException as e:
+        root.end(error=e)
+        raise
+    finally:
+        _current_span.reset(token)
+        root.end()
@@ -1,16 +1,18 @@
 import os
 import asyncio
 import requests
+import aiohttp
 import random 
 import concurrent
-import aiohttp
 import time
 import logging
 from typing import List, Optional, Dict, Any, Union, Callable, TypeVar
 from urllib.parse import unquote
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
 from functools import wraps
 
-from exa_py import Exa
+from exa_py import AsyncExa
 # from linkup import LinkupClient  # Commented out
 from tavily import AsyncTavilyClient
 from duckduckgo_search import DDGS 
@@ -18,14 +20,23 @@ from bs4 import BeautifulSoup
 
 from langchain_community.retrievers import ArxivRetriever
 from langchain_community.utilities.pubmed import PubMedAPIWrapper
-from langsmith import traceable
 
 from state import Section
+from search_cache import create_search_cache
+from metrics import SEARCH_DURATION, SEARCH_ERRORS, SEARCH_QUERIES
+from tracing import TRACER, traced
+from health import PROVIDER_CIRCUITS
+from context_budget import allocate, count_tokens, relevance, truncate_tokens
+from rate_limits import parse_duration, rate_limit_hooks
+from search_providers import SEARCH_HTTP, SEARCH_PROVIDERS, SearchProvider
 from langchain.chat_models import init_chat_model
 from langchain_core.language_models import BaseChatModel
 
 T = TypeVar('T')
 
+# Search responses shared by every report in this process
+SEARCH_CACHE = create_search_cache()
+
 def retry_with_exponential_backoff(
     max_retries: int = 5,
     base_delay: float = 1.0,
@@ -59,6 +70,12 @@ def get_config_value(value):
     """
     return value if isinstance(value, str) else value.value
 
+def config_flag(value) -> bool:
+    """
+    Helper function to read a boolean configuration value that may come from an environment variable
+    """
+    return str(value).strip().lower() in ("true", "1", "yes", "on")
+
 def get_search_params(search_api: str, search_api_config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
     """
     Filters the search_api_config dictionary to include only parameters accepted by the specified search API.
@@ -70,30 +87,23 @@ def get_search_params(search_api: str, search_api_config: Optional[Dict[str, Any
     Returns:
         Dict[str, Any]: A dictionary of parameters to pass to the search function.
     """
-    # Define accepted parameters for each search API
-    SEARCH_API_PARAMS = {
-        "exa": ["max_characters", "num_results", "include_domains", "exclude_domains", "subpages"],
-        "tavily": [],  # Tavily currently accepts no additional parameters
-        "perplexity": [],  # Perplexity accepts no additional parameters
-        "arxiv": ["load_max_docs", "get_full_documents", "load_all_available_meta"],
-        "pubmed": ["top_k_results", "email", "api_key", "doc_content_chars_max"],
-        "linkup": ["depth"],
-    }
-
-    # Get the list of accepted parameters for the given search API
-    accepted_params = SEARCH_API_PARAMS.get(search_api, [])
-
     # If no config provided, return an empty dict
-    if not search_api_config:
+    if not search_api_config or search_api not in SEARCH_PROVIDERS.providers:
         return {}
 
-    # Filter the config to only include accepted parameters
-    return {k: v for k, v in search_api_config.items() if k in accepted_params}
+    # Filter the config to only include the parameters the provider accepts
+    return SEARCH_PROVIDERS.get(search_api).filter_params(search_api_config)
 
-def deduplicate_and_format_sources(search_response, max_tokens_per_source, include_raw_content=True):
+def deduplicate_and_format_sources(search_response, max_tokens_per_source, include_raw_content=True,
+                                   max_tokens=None, model=None):
     """
     Takes a list of search responses and formats them into a readable string.
     Limits the raw_content to approximately max_tokens_per_source tokens.
+
+    With `max_tokens`, the whole context is kept within that many tokens of
+    `model`: sources are ranked by score, the lowest ranked are dropped if
+    even their snippets do not fit, and the rest of the budget is divided
+    over their raw content in proportion to score.
  
     Args:
         search_responses: List of search response dicts, each containing:
@@ -106,6 +116,8 @@ def deduplicate_and_format_sources(search_response, max_tokens_per_source, inclu
                 - raw_content: str|None
         max_tokens_per_source: int
         include_raw_content: bool
+        max_tokens: int|None, token budget of the formatted context
+        model: str|None, model whose tokenizer counts the budget
             
     Returns:
         str: Formatted string with deduplicated sources
@@ -118,27 +130,66 @@ def deduplicate_and_format_sources(search_response, max_tokens_per_source, inclu
     # Deduplicate by URL
     unique_sources = {source['url']: source for source in sources_list}
 
+    def format_source(source, raw_content=None, limit=None):
+        text = f"{'='*80}\n"  # Clear section separator
+        text += f"Source: {source['title']}\n"
+        text += f"{'-'*80}\n"  # Subsection separator
+        text += f"URL: {source['url']}\n===\n"
+        text += f"Most relevant content from source: {source['content']}\n===\n"
+        if raw_content is not None:
+            text += f"Full source content limited to {limit} tokens: {raw_content}\n\n"
+        text += f"{'='*80}\n\n" # End section separator
+        return text
+
+    def raw_content_of(source):
+        # Handle None raw_content
+        raw_content = source.get('raw_content', '')
+        if raw_content is None:
+            raw_content = ''
+            print(f"Warning: No raw_content found for source {source['url']}")
+        return raw_content
+
     # Format output
     formatted_text = "Content from sources:\n"
-    for i, source in enumerate(unique_sources.values(), 1):
-        formatted_text += f"{'='*80}\n"  # Clear section separator
-        formatted_text += f"Source: {source['title']}\n"
-        formatted_text += f"{'-'*80}\n"  # Subsection separator
-        formatted_text += f"URL: {source['url']}\n===\n"
-        formatted_text += f"Most relevant content from source: {source['content']}\n===\n"
+    if max_tokens is None:
+        for source in unique_sources.values():
+            raw_content = None
+            if include_raw_content:
+                # Using rough estimate of 4 characters per token
+                char_limit = max_tokens_per_source * 4
+                raw_content = raw_content_of(source)
+                if len(raw_content) > char_limit:
+                    raw_content = raw_content[:char_limit] + "... [truncated]"
+            formatted_text += format_source(source, raw_content, max_tokens_per_source)
+        return formatted_text.strip()
+
+    # Keep the best sources whose snippets fit, then share what is left over their full content
+    ranked = sorted(unique_sources.values(), key=relevance, reverse=True)
+    budget = max_tokens - count_tokens(formatted_text, model)
+    kept = []
+    for source in ranked:
+        # Snippet plus the label in front of the raw content
+        cost = count_tokens(format_source(source, "" if include_raw_content else None, max_tokens_per_source), model)
+        if cost > budget:
+            break
+        kept.append(source)
+        budget -= cost
+    if len(kept) < len(ranked):
+        print(f"Context budget of {max_tokens} tokens fits {len(kept)} of {len(ranked)} sources")
+
+    if include_raw_content:
+        raw_contents = [raw_content_of(source) for source in kept]
+        demands = [min(count_tokens(raw_content, model), max_tokens_per_source) for raw_content in raw_contents]
+        # Keep room for the marker of every source that may be cut
+        budget -= count_tokens("... [truncated]", model) * len(kept)
+        limits = allocate(demands, [relevance(source) for source in kept], max(0, budget))
+    for i, source in enumerate(kept):
+        raw_content = None
         if include_raw_content:
-            # Using rough estimate of 4 characters per token
-            char_limit = max_tokens_per_source * 4
-            # Handle None raw_content
-            raw_content = source.get('raw_content', '')
-            if raw_content is None:
-                raw_content = ''
-                print(f"Warning: No raw_content found for source {source['url']}")
-            if len(raw_content) > char_limit:
-                raw_content = raw_content[:char_limit] + "... [truncated]"
-            formatted_text += f"Full source content limited to {max_tokens_per_source} tokens: {raw_content}\n\n"
-        formatted_text += f"{'='*80}\n\n" # End section separator
-                
+            raw_content = truncate_tokens(raw_contents[i], limits[i], model)
+            if len(raw_content) < len(raw_contents[i]):
+                raw_content += "... [truncated]"
+        formatted_text += format_source(source, raw_content, limits[i] if include_raw_content else None)
     return formatted_text.strip()
 
 def format_sections(sections: list[Section]) -> str:
@@ -160,7 +211,7 @@ Content:
 """
     return formatted_str
 
-@traceable
+@traced(kind="search")
 async def tavily_search_async(search_queries):
     """
     Performs concurrent web searches using the Tavily API.
@@ -187,7 +238,8 @@ async def tavily_search_async(search_queries):
                     ]
                 }
     """
-    tavily_async_client = AsyncTavilyClient()
+    # One client per event loop, so searches reuse its connections
+    tavily_async_client = SEARCH_HTTP.client("tavily", AsyncTavilyClient)
     search_tasks = []
     for query in search_queries:
             search_tasks.append(
@@ -204,12 +256,37 @@ async def tavily_search_async(search_queries):
 
     return search_docs
 
-@traceable
-def perplexity_search(search_queries):
+PERPLEXITY_URL = "https://api.perplexity.ai/chat/completions"
+# Responses worth another attempt; other errors fail the query straight away
+PERPLEXITY_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    seconds = parse_duration(value)
+    if seconds is None:
+        try:
+            seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return max(0.0, seconds)
+
+@traced(kind="search")
+async def perplexity_search(search_queries, timeout: Optional[float] = None, max_retries: Optional[int] = None):
     """Search the web using the Perplexity API.
     
+    Queries are sent concurrently over the shared HTTP session, with at
+    most PERPLEXITY_MAX_CONCURRENCY requests in flight across all reports.
+    Rate limit and server errors are retried up to `max_retries` times,
+    waiting as long as the Retry-After header asks or backing off
+    exponentially without one. A query that still fails gets an empty
+    response with an `error` instead of failing the others.
+    
     Args:
         search_queries (List[SearchQuery]): List of search queries to process
+        timeout (float, optional): Seconds allowed for each request. Defaults to PERPLEXITY_TIMEOUT_SECONDS.
+        max_retries (int, optional): Retries per query. Defaults to PERPLEXITY_MAX_RETRIES.
   
     Returns:
         List[dict]: List of search responses from Perplexity API, one per query. Each response has format:
@@ -236,10 +313,35 @@ def perplexity_search(search_queries):
         "content-type": "application/json",
         "Authorization": f"Bearer {os.getenv('PERPLEXITY_API_KEY')}"
     }
-    
-    search_docs = []
-    for query in search_queries:
+    if timeout is None:
+        timeout = float(os.getenv("PERPLEXITY_TIMEOUT_SECONDS", "60"))
+    if max_retries is None:
+        max_retries = int(os.getenv("PERPLEXITY_MAX_RETRIES", "3"))
+    session = SEARCH_HTTP.session()
+    limit = SEARCH_HTTP.request_limit("perplexity", int(os.getenv("PERPLEXITY_MAX_CONCURRENCY", "4")))
 
+    async def post(payload):
+        for attempt in range(max_retries + 1):
+            delay = None
+            async with limit:
+                try:
+                    async with session.post(PERPLEXITY_URL, headers=headers, json=payload,
+                                            timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                        if response.status not in PERPLEXITY_RETRY_STATUSES:
+                            response.raise_for_status()  # Raise exception for bad status codes
+                            return await response.json()
+                        delay = retry_after_seconds(response.headers.get("Retry-After"))
+                        error = f"HTTP {response.status}"
+                except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as e:
+                    error = f"{type(e).__name__}: {e}"
+            if attempt == max_retries:
+                raise RuntimeError(f"Perplexity request failed after {attempt + 1} attempts: {error}")
+            if delay is None:
+                delay = min(30.0, 2 ** attempt) + random.uniform(0, 0.5)
+            print(f"Perplexity request failed ({error}). Retrying in {delay:.2f} seconds (attempt {attempt + 1}/{max_retries})...")
+            await asyncio.sleep(delay)
+
+    async def search_single_query(query):
         payload = {
             "model": "sonar-pro",
             "messages": [
@@ -254,17 +356,22 @@ def perplexity_search(search_queries):
             ]
         }
         
-        response = requests.post(
-            "https://api.perplexity.ai/chat/completions",
-            headers=headers,
-            json=payload
-        )
-        response.raise_for_status()  # Raise exception for bad status codes
+        try:
+            data = await post(payload)
+        except Exception as e:
+            print(f"Error processing Perplexity query '{query}': {str(e)}")
+            return {
+                "query": query,
+                "follow_up_questions": None,
+                "answer": None,
+                "images": [],
+                "results": [],
+                "error": str(e)
+            }
         
         # Parse the response
-        data = response.json()
         content = data["choices"][0]["message"]["content"]
-        citations = data.get("citations", ["https://perplexity.ai"])
+        citations = data.get("citations") or ["https://perplexity.ai"]
         
         # Create results list for this query
         results = []
@@ -289,17 +396,18 @@ def perplexity_search(search_queries):
             })
         
         # Format response to match Tavily structure
-        search_docs.append({
+        return {
             "query": query,
             "follow_up_questions": None,
             "answer": None,
             "images": [],
             "results": results
-        })
+        }
     
-    return search_docs
+    # Execute all searches concurrently
+    return await asyncio.gather(*[search_single_query(query) for query in search_queries])
 
-@traceable
+@traced(kind="search")
 async def exa_search(search_queries, max_characters: Optional[int] = None, num_results=5, 
                      include_domains: Optional[List[str]] = None, 
                      exclude_domains: Optional[List[str]] = None,
@@ -340,36 +448,31 @@ async def exa_search(search_queries, max_characters: Optional[int] = None, num_r
     if include_domains and exclude_domains:
         raise ValueError("Cannot specify both include_domains and exclude_domains")
     
-    # Initialize Exa client (API key should be configured in your .env file)
-    exa = Exa(api_key = f"{os.getenv('EXA_API_KEY')}")
+    # Shared async Exa client (API key should be configured in your .env file); its
+    # connections stay open between searches instead of a new one per request
+    exa = SEARCH_HTTP.client("exa", lambda: AsyncExa(api_key=f"{os.getenv('EXA_API_KEY')}"),
+                             close=lambda client: client.client.aclose())
     
     # Define the function to process a single query
     async def process_query(query):
-        # Use run_in_executor to make the synchronous exa call in a non-blocking way
-        loop = asyncio.get_event_loop()
+        # Build parameters dictionary
+        kwargs = {
+            # Set text to True if max_characters is None, otherwise use an object with max_characters
+            "text": True if max_characters is None else {"max_characters": max_characters},
+            "summary": True,  # This is an amazing feature by EXA. It provides an AI generated summary of the content based on the query
+            "num_results": num_results
+        }
         
-        # Define the function for the executor with all parameters
-        def exa_search_fn():
-            # Build parameters dictionary
-            kwargs = {
-                # Set text to True if max_characters is None, otherwise use an object with max_characters
-                "text": True if max_characters is None else {"max_characters": max_characters},
-                "summary": True,  # This is an amazing feature by EXA. It provides an AI generated summary of the content based on the query
-                "num_results": num_results
-            }
+        # Add optional parameters only if they are provided
+        if subpages is not None:
+            kwargs["subpages"] = subpages
             
-            # Add optional parameters only if they are provided
-            if subpages is not None:
-                kwargs["subpages"] = subpages
-                
-            if include_domains:
-                kwargs["include_domains"] = include_domains
-            elif exclude_domains:
-                kwargs["exclude_domains"] = exclude_domains
-                
-            return exa.search_and_contents(query, **kwargs)
-        
-        response = await loop.run_in_executor(None, exa_search_fn)
+        if include_domains:
+            kwargs["include_domains"] = include_domains
+        elif exclude_domains:
+            kwargs["exclude_domains"] = exclude_domains
+            
+        response = await exa.search_and_contents(query, **kwargs)
         
         # Format the response to match the expected output structure
         formatted_results = []
@@ -502,7 +605,7 @@ async def exa_search(search_queries, max_characters: Optional[int] = None, num_r
     
     return search_docs
 
-@traceable
+@traced(kind="search")
 async def arxiv_search_async(search_queries, load_max_docs=5, get_full_documents=True, load_all_available_meta=True):
     """
     Performs concurrent searches on arXiv using the ArxivRetriever.
@@ -659,7 +762,7 @@ async def arxiv_search_async(search_queries, load_max_docs=5, get_full_documents
     
     return search_docs
 
-@traceable
+@traced(kind="search")
 async def pubmed_search_async(search_queries, top_k_results=5, email=None, api_key=None, doc_content_chars_max=4000):
     """
     Performs concurrent searches on PubMed using the PubMedAPIWrapper.
@@ -807,7 +910,7 @@ async def pubmed_search_async(search_queries, top_k_results=5, email=None, api_k
     
     return search_docs
 
-@traceable
+@traced(kind="search")
 async def linkup_search(search_queries, depth: Optional[str] = "standard"):
     """Placeholder for linkup search."""
     print("Using dummy linkup_search implementation")
@@ -822,7 +925,7 @@ async def linkup_search(search_queries, depth: Optional[str] = "standard"):
         })
     return search_results
 
-@traceable
+@traced(kind="search")
 async def duckduckgo_search(search_queries):
     """Perform searches using DuckDuckGo with improved rate limit handling
     
@@ -872,76 +975,6 @@ async def execute_search(search_api: str, query: str, params: dict) -> list:
     """Execute a search with the given API and parameters."""
     # Your existing search code...
 
-# First, enhance the select_and_execute_search function to include fallback logic
-async def select_and_execute_search(search_api: str, query_list: list[str], params_to_pass: dict) -> str:
-    """Select and execute the appropriate search API with fallback support for rate limiting."""
-    try:
-        # First, try with the requested search API
-        if search_api == "duckduckgo":
-            try:
-                # Process only first 2-3 queries to reduce chance of rate limiting
-                limited_queries = query_list[:min(3, len(query_list))]
-                
-                # Add longer delays between searches
-                search_results = []
-                for i, query in enumerate(limited_queries):
-                    # Add delay between requests to avoid rate limiting
-                    if i > 0:
-                        print(f"Adding delay between DuckDuckGo searches ({i}/{len(limited_queries)})...")
-                        await asyncio.sleep(2 + random.random() * 2)  # 2-4 second random delay
-                    
-                    # Execute single query with retries
-                    result = await execute_duckduckgo_search_with_retry(query)
-                    search_results.append(result)
-                
-                return deduplicate_and_format_sources(search_results, max_tokens_per_source=4000)
-            except Exception as e:
-                if "Ratelimit" in str(e):
-                    print(f"DuckDuckGo rate limited. Falling back to Exa API: {e}")
-                    # Fall back to Exa API
-                    search_api = "exa"
-                    exa_params = get_search_params("exa", {})
-                    exa_params.update(params_to_pass)  # Merge any passed params
-                    search_results = await exa_search(query_list, **exa_params)
-                    return deduplicate_and_format_sources(search_results, max_tokens_per_source=4000)
-                else:
-                    # Re-raise if it's not a rate limit error
-                    raise
-        
-        # Regular processing for other APIs
-        if search_api == "tavily":
-            search_results = await tavily_search_async(query_list, **params_to_pass)
-        elif search_api == "perplexity":
-            search_results = perplexity_search(query_list, **params_to_pass)
-        elif search_api == "exa":
-            search_results = await exa_search(query_list, **params_to_pass)
-        elif search_api == "arxiv":
-            search_results = await arxiv_search_async(query_list, **params_to_pass)
-        elif search_api == "pubmed":
-            search_results = await pubmed_search_async(query_list, **params_to_pass)
-        elif search_api == "linkup":
-            search_results = await linkup_search(query_list, **params_to_pass)
-        elif search_api == "googlesearch":
-            search_results = await google_search_async(query_list, **params_to_pass)
-        else:
-            raise ValueError(f"Unsupported search API: {search_api}")
-            
-        return deduplicate_and_format_sources(search_results, max_tokens_per_source=4000)
-    except Exception as e:
-        print(f"Error in search (API: {search_api}): {str(e)}")
-        # If all else fails, return an error message that can be used in the report
-        return f"""
-        [Search Error: Unable to retrieve information]
-        
-        The search system encountered an error while trying to find information.
-        Error details: {str(e)}
-        
-        The following queries were attempted:
-        {chr(10).join('- ' + q for q in query_list)}
-        
-        Please proceed with general knowledge about the topic.
-        """
-
 # Add a new helper function specifically for DuckDuckGo with retry logic
 async def execute_duckduckgo_search_with_retry(query, max_retries=5):
     """Execute a single DuckDuckGo search with retries and exponential backoff."""
@@ -991,7 +1024,7 @@ async def execute_duckduckgo_search_with_retry(query, max_retries=5):
                 # If max retries exceeded or different error, re-raise
                 raise
 
-@traceable
+@traced(kind="search")
 async def google_search_async(search_queries: Union[str, List[str]], max_results: int = 5, include_raw_content: bool = True):
     """
     Performs concurrent web searches using Google.
@@ -1053,26 +1086,26 @@ async def google_search_async(search_queries: Union[str, List[str]], max_results
                         }
                         print(f"Requesting {num} results for '{query}' from Google API...")
 
-                        async with aiohttp.ClientSession() as session:
-                            async with session.get('https://www.googleapis.com/customsearch/v1', params=params) as response:
-                                if response.status != 200:
-                                    error_text = await response.text()
-                                    print(f"API error: {response.status}, {error_text}")
-                                    break
-                                    
-                                data = await response.json()
+                        session = SEARCH_HTTP.session()
+                        async with session.get('https://www.googleapis.com/customsearch/v1', params=params) as response:
+                            if response.status != 200:
+                                error_text = await response.text()
+                                print(f"API error: {response.status}, {error_text}")
+                                break
                                 
-                                # Process search results
-                                for item in data.get('items', []):
-                                    result = {
-                                        "title": item.get('title', ''),
-                                        "url": item.get('link', ''),
-                                        "content": item.get('snippet', ''),
-                                        "score": None,
-                                        "raw_content": item.get('snippet', '')
-                                    }
-                                    results.append(result)
-                        
+                            data = await response.json()
+                            
+                            # Process search results
+                            for item in data.get('items', []):
+                                result = {
+                                    "title": item.get('title', ''),
+                                    "url": item.get('link', ''),
+                                    "content": item.get('snippet', ''),
+                                    "score": None,
+                                    "raw_content": item.get('snippet', '')
+                                }
+                                results.append(result)
+                    
                         # Respect API quota with a small delay
                         await asyncio.sleep(0.2)
                         
@@ -1179,24 +1212,25 @@ async def google_search_async(search_queries: Union[str, List[str]], max_results
                 if include_raw_content and results:
                     content_semaphore = asyncio.Semaphore(3)
                     
-                    async with aiohttp.ClientSession() as session:
-                        fetch_tasks = []
-                        
-                        async def fetch_full_content(result):
-                            async with content_semaphore:
-                                url = result['url']
-                                headers = {
-                                    'User-Agent': get_useragent(),
-                                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
-                                }
-                                
-                                try:
-                                    await asyncio.sleep(0.2 + random.random() * 0.6)
+                    session = SEARCH_HTTP.session()
+                    fetch_tasks = []
+                    
+                    async def fetch_full_content(result):
+                        async with content_semaphore:
+                            url = result['url']
+                            headers = {
+                                'User-Agent': get_useragent(),
+                                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
+                            }
+                            
+                            try:
+                                await asyncio.sleep(0.2 + random.random() * 0.6)
+                                with TRACER.span("fetch_page", "fetch", url=url):
                                     async with session.get(url, headers=headers, timeout=10) as response:
                                         if response.status == 200:
                                             # Check content type to handle binary files
                                             content_type = response.headers.get('Content-Type', '').lower()
-                                            
+                                        
                                             # Handle PDFs and other binary files
                                             if 'application/pdf' in content_type or 'application/octet-stream' in content_type:
                                                 # For PDFs, indicate that content is binary and not parsed
@@ -1210,18 +1244,18 @@ async def google_search_async(search_queries: Union[str, List[str]], max_results
                                                 except UnicodeDecodeError as ude:
                                                     # Fallback if we still have decoding issues
                                                     result['raw_content'] = f"[Could not decode content: {str(ude)}]"
-                                except Exception as e:
-                                    print(f"Warning: Failed to fetch content for {url}: {str(e)}")
-                                    result['raw_content'] = f"[Error fetching content: {str(e)}]"
-                                return result
-                        
-                        for result in results:
-                            fetch_tasks.append(fetch_full_content(result))
-                        
-                        updated_results = await asyncio.gather(*fetch_tasks)
-                        results = updated_results
-                        print(f"Fetched full content for {len(results)} results")
-                
+                            except Exception as e:
+                                print(f"Warning: Failed to fetch content for {url}: {str(e)}")
+                                result['raw_content'] = f"[Error fetching content: {str(e)}]"
+                            return result
+                    
+                    for result in results:
+                        fetch_tasks.append(fetch_full_content(result))
+                    
+                    updated_results = await asyncio.gather(*fetch_tasks)
+                    results = updated_results
+                    print(f"Fetched full content for {len(results)} results")
+            
                 return {
                     "query": query,
                     "follow_up_questions": None,
@@ -1248,19 +1282,55 @@ async def google_search_async(search_queries: Union[str, List[str]], max_results
         
         return search_results
     finally:
-        # Only shut down executor if it was created
+        # Only shut down executor if it was created; drop scrapes that have not
+        # started so a cancelled job stops issuing requests
         if executor:
-            executor.shutdown(wait=False)
+            executor.shutdown(wait=False, cancel_futures=True)
 
 
 
-async def select_and_execute_search(search_api: str, query_list: list[str], params_to_pass: dict) -> str:
+# Search APIs selectable with `search_api`, and the search_api_config keys each accepts
+SEARCH_PROVIDERS.register(SearchProvider("tavily", tavily_search_async))
+SEARCH_PROVIDERS.register(SearchProvider("perplexity", perplexity_search, params=["timeout", "max_retries"]))
+SEARCH_PROVIDERS.register(SearchProvider("exa", exa_search, params=["max_characters", "num_results", "include_domains",
+                                                                     "exclude_domains", "subpages"]))
+SEARCH_PROVIDERS.register(SearchProvider("arxiv", arxiv_search_async, params=["load_max_docs", "get_full_documents",
+                                                                              "load_all_available_meta"]))
+SEARCH_PROVIDERS.register(SearchProvider("pubmed", pubmed_search_async, params=["top_k_results", "email", "api_key",
+                                                                                "doc_content_chars_max"]))
+SEARCH_PROVIDERS.register(SearchProvider("linkup", linkup_search, params=["depth"]))
+SEARCH_PROVIDERS.register(SearchProvider("duckduckgo", duckduckgo_search))
+SEARCH_PROVIDERS.register(SearchProvider("googlesearch", google_search_async))
+
+async def fetch_search_results(search_api: str, query_list: list[str], params_to_pass: dict) -> list[dict]:
+    """Run the queries against the selected search API.
+    
+    Args:
+        search_api: Name of the search API to use
+        query_list: List of search queries to execute
+        params_to_pass: Parameters to pass to the search API
+        
+    Returns:
+        One search response dict per query
+        
+    Raises:
+        ValueError: If an unsupported search API is specified
+    """
+    return await SEARCH_PROVIDERS.get(search_api).search(query_list, **params_to_pass)
+
+async def select_and_execute_search(search_api: str, query_list: list[str], params_to_pass: dict,
+                                    max_tokens: Optional[int] = None, model: Optional[str] = None) -> str:
     """Select and execute the appropriate search API.
     
+    Queries answered recently, or being answered right now for another
+    report, are served from the shared search cache instead of the API.
+    
     Args:
         search_api: Name of the search API to use
         query_list: List of search queries to execute
         params_to_pass: Parameters to pass to the search API
+        max_tokens: Token budget of the formatted results, counted for `model`
+        model: Model the results will be sent to
         
     Returns:
         Formatted string containing search results
@@ -1268,32 +1338,38 @@ async def select_and_execute_search(search_api: str, query_list: list[str], para
     Raises:
         ValueError: If an unsupported search API is specified
     """
-    if search_api == "tavily":
-        search_results = await tavily_search_async(query_list, **params_to_pass)
-        return deduplicate_and_format_sources(search_results, max_tokens_per_source=4000, include_raw_content=False)
-    elif search_api == "perplexity":
-        search_results = perplexity_search(query_list, **params_to_pass)
-        return deduplicate_and_format_sources(search_results, max_tokens_per_source=4000)
-    elif search_api == "exa":
-        search_results = await exa_search(query_list, **params_to_pass)
-        return deduplicate_and_format_sources(search_results, max_tokens_per_source=4000)
-    elif search_api == "arxiv":
-        search_results = await arxiv_search_async(query_list, **params_to_pass)
-        return deduplicate_and_format_sources(search_results, max_tokens_per_source=4000)
-    elif search_api == "pubmed":
-        search_results = await pubmed_search_async(query_list, **params_to_pass)
-        return deduplicate_and_format_sources(search_results, max_tokens_per_source=4000)
-    elif search_api == "linkup":
-        search_results = await linkup_search(query_list, **params_to_pass)
-        return deduplicate_and_format_sources(search_results, max_tokens_per_source=4000)
-    elif search_api == "duckduckgo":
-        search_results = await duckduckgo_search(query_list)
-        return deduplicate_and_format_sources(search_results, max_tokens_per_source=4000)
-    elif search_api == "googlesearch":
-        search_results = await google_search_async(query_list, **params_to_pass)
-        return deduplicate_and_format_sources(search_results, max_tokens_per_source=4000)
-    else:
-        raise ValueError(f"Unsupported search API: {search_api}")
+    fetched = []
+
+    async def timed_fetch(queries: list[str]) -> list[dict]:
+        if not PROVIDER_CIRCUITS.allow("search", search_api):
+            # Fail fast instead of waiting on a provider that keeps failing
+            SEARCH_ERRORS.inc(provider=search_api)
+            raise RuntimeError(f"Search API {search_api} is unavailable after repeated failures")
+        fetched.extend(queries)
+        started_at = time.monotonic()
+        try:
+            results = await fetch_search_results(search_api, queries, params_to_pass)
+        except Exception as e:
+            SEARCH_ERRORS.inc(provider=search_api)
+            PROVIDER_CIRCUITS.record("search", search_api, False, f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            SEARCH_DURATION.observe(time.monotonic() - started_at, provider=search_api)
+        errors = [result["error"] for result in results if isinstance(result, dict) and result.get("error")]
+        if errors:
+            SEARCH_ERRORS.inc(len(errors), provider=search_api)
+        # A call counts as failed only when none of its queries got an answer
+        PROVIDER_CIRCUITS.record("search", search_api, len(errors) < len(results) or not results,
+                                 str(errors[-1]) if errors else None)
+        return results
+
+    search_results = await SEARCH_CACHE.search(search_api, query_list, params_to_pass, timed_fetch)
+    SEARCH_QUERIES.inc(len(fetched), provider=search_api, source="api")
+    SEARCH_QUERIES.inc(max(0, len(query_list) - len(fetched)), provider=search_api, source="cache")
+    # Tavily's raw content is not requested, so only its snippets are formatted
+    return deduplicate_and_format_sources(search_results, max_tokens_per_source=4000,
+                                          include_raw_content=search_api != "tavily",
+                                          max_tokens=max_tokens, model=model)
 
 def init_model_with_provider(model_name: str, provider: str, **kwargs) -> BaseChatModel:
     """Initialize a chat model with proper provider-specific settings."""
@@ -1308,11 +1384,13 @@ def init_model_with_provider(model_name: str, provider: str, **kwargs) -> BaseCh
             if not api_key:
                 raise ValueError("GROQ_API_KEY environment variable not set")
                 
-            # Initialize Groq model directly
+            # Initialize Groq model directly; its responses' rate limit headers pace later calls
+            from groq import DefaultAsyncHttpxClient
             return ChatGroq(
                 model_name=model_name,
                 groq_api_key=api_key,
-                temperature=0.1
+                temperature=0.1,
+                http_async_client=DefaultAsyncHttpxClient(event_hooks=rate_limit_hooks("groq", model_name))
             )
         else:
             # Use standard init_chat_model for other providers
@@ -0,0 +1,211 @@
+import os
+import uuid
+import signal
+import socket
+import asyncio
+import argparse
+import json
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from broker import SQLiteBroker, create_broker
+from job_store import in_store_thread
+from executor import JobExecutor, ExecutorMode
+from models import MODELS
+from search_providers import SEARCH_HTTP
+from rate_limits import RATE_LIMITS
+from metrics import METRICS, ACTIVE_JOBS, QUEUE_DEPTH, WORKER_CAPACITY
+from health import PROVIDER_CIRCUITS, EventLoopMonitor, InstrumentedThreadPoolExecutor, Readiness
+from jobs import (JOBS, JOB_EVENTS, REPORT_CACHE, JobStatus, ReportRequest, fail_job, job_is_active,
+                  process_report_job, publish_status)
+
+# Load environment variables
+load_dotenv()
+
+class ResearchWorker:
+    """Leases report jobs from the broker and runs them on a local `JobExecutor`.
+
+    A worker only leases as many jobs as it has free slots, so jobs it cannot
+    start right away stay in the shared queue for other workers. Leases are
+    kept alive by a heartbeat; any worker also reaps expired leases, so jobs
+    of a worker that died are retried elsewhere.
+    """
+
+    def __init__(self, broker: SQLiteBroker, concurrency: int = 10, mode: str = ExecutorMode.ASYNC,
+                 lease_seconds: float = 60.0, heartbeat_interval: float = 15.0, poll_interval: float = 1.0):
+        self.broker = broker
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.executor = JobExecutor(self.run_job, num_workers=concurrency, mode=mode)
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        self.stopping = asyncio.Event()
+        self.readiness = Readiness()
+        self.loop_monitor = EventLoopMonitor()
+        self.thread_pool = InstrumentedThreadPoolExecutor(thread_name_prefix="blocking")
+
+    async def run_job(self, job_id: str, request: ReportRequest, executor: JobExecutor):
+        await process_report_job(job_id, request, executor)
+        await in_store_thread(self.broker.complete, job_id)
+
+    def held_jobs(self) -> list[str]:
+        """Jobs leased by this worker, running or about to start."""
+        return list(self.executor.active_jobs) + list(self.executor.scheduler.waiting)
+
+    async def run(self):
+        print(f"Research worker {self.worker_id} starting with {self.executor.capacity} slots")
+        asyncio.get_running_loop().set_default_executor(self.thread_pool)
+        self.loop_monitor.start()
+        await self.executor.start()
+        # Only advertise capacity to the broker once model clients are built
+        await self.readiness.track("model_clients", self.executor.warm_up())
+        heartbeat = asyncio.create_task(self._heartbeat())
+        try:
+            while not self.stopping.is_set():
+                # Broker and job store calls run on the store thread, off this loop
+                await in_store_thread(self.reap_expired)
+                for job_id in await in_store_thread(self.broker.cancelled, self.held_jobs()):
+                    print(f"Cancelling job {job_id}")
+                    self.executor.cancel(job_id)
+                while self.executor.free_slots > 0 and await self.lease_one():
+                    pass
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            heartbeat.cancel()
+            self.loop_monitor.stop()
+            await self.shutdown()
+
+    async def lease_one(self) -> bool:
+        """Lease one job and hand it to the executor; False when the queue is empty."""
+        leased = await in_store_thread(self.broker.lease, self.worker_id, self.lease_seconds)
+        if leased is None:
+            return False
+        job_id, payload, attempt = leased
+        job_data = await in_store_thread(JOBS.get, job_id)
+        if job_data is None:
+            # Evicted while it was waiting in the queue
+            await in_store_thread(self.broker.forget, job_id)
+            return True
+        print(f"Leased job {job_id} (attempt {attempt})")
+        request = ReportRequest(**payload)
+        await self.executor.submit(job_id, request, priority=request.priority,
+                                   search_depth=job_data.get("search_depth", 2))
+        return True
+
+    def reap_expired(self):
+        """Requeue jobs whose worker stopped heartbeating, or fail them when out of attempts."""
+        requeued, failed = self.broker.reap_expired()
+        for job_id, attempts in requeued:
+            print(f"Requeued job {job_id} after an expired lease (attempt {attempts})")
+            JOBS.update(job_id,
+                        status=JobStatus.QUEUED,
+                        message="Resuming after worker failure")
+            publish_status(job_id)
+        for job_id in failed:
+            print(f"Job {job_id} failed after {self.broker.max_attempts} attempts")
+            fail_job(job_id, "Error occurred during report generation",
+                     f"Worker stopped responding {self.broker.max_attempts} times")
+
+    async def _heartbeat(self):
+        while True:
+            try:
+                await in_store_thread(self.broker.heartbeat, self.worker_id, self.held_jobs(), self.executor.capacity,
+                                      self.lease_seconds)
+            except Exception as e:
+                print(f"Error sending worker heartbeat: {str(e)}")
+            await asyncio.sleep(self.heartbeat_interval)
+
+    async def shutdown(self):
+        """Give unfinished jobs back to the queue so another worker resumes them."""
+        held = self.held_jobs()
+        await self.executor.shutdown()
+        MODELS.close()
+        await SEARCH_HTTP.close()
+        await in_store_thread(self.release_jobs, held)
+        print(f"Research worker {self.worker_id} stopped, released {len(held)} jobs")
+
+    def release_jobs(self, job_ids: list[str]):
+        for job_id in job_ids:
+            if not job_is_active(job_id):
+                continue
+            self.broker.release(job_id)
+            # The next worker resumes the job from its checkpoints, so finished sections are kept
+            JOBS.update(job_id, status=JobStatus.QUEUED, message="Queued to resume")
+            publish_status(job_id)
+        self.broker.unregister(self.worker_id)
+
+    def health(self) -> dict:
+        """Load, warm-up and provider state of this worker, like the API's /health."""
+        p95_duration = self.executor.scheduler.histogram.percentile(95)
+        return {
+            "worker_id": self.worker_id,
+            "current_load": len(self.executor.active_jobs),
+            "max_capacity": self.executor.capacity,
+            "queued_jobs": self.executor.pending,
+            "is_warming_up": not self.readiness.is_ready,
+            "warmup": self.readiness.components,
+            "worker_utilization": self.executor.utilization,
+            "event_loop": self.loop_monitor.snapshot(),
+            "thread_pool": self.thread_pool.snapshot(),
+            "p95_job_duration_seconds": round(p95_duration, 1) if p95_duration is not None else None,
+            "providers": PROVIDER_CIRCUITS.snapshot(),
+            "rate_limits": RATE_LIMITS.snapshot(),
+        }
+
+    async def serve_metrics(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Answer GET /health with this worker's health and any other request with its Prometheus metrics."""
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+            path = request.split(b" ", 2)[1] if request.count(b" ") >= 2 else b"/"
+            if path.startswith(b"/health"):
+                body = json.dumps(self.health()).encode("utf-8")
+                content_type = b"application/json"
+            else:
+                QUEUE_DEPTH.set(self.executor.pending)
+                ACTIVE_JOBS.set(len(self.executor.active_jobs))
+                WORKER_CAPACITY.set(self.executor.capacity)
+                body = METRICS.render().encode("utf-8")
+                content_type = b"text/plain; version=0.0.4"
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: %s\r\n" % content_type +
+                         b"Content-Length: %d\r\nConnection: close\r\n\r\n" % len(body) + body)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+async def main(concurrency: int, mode: str, metrics_port: Optional[int] = None):
+    broker = create_broker()
+    worker = ResearchWorker(broker, concurrency=concurrency, mode=mode)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stopping.set)
+    if metrics_port:
+        # The API only sees the broker; node, search and model metrics are collected here
+        await asyncio.start_server(worker.serve_metrics, "0.0.0.0", metrics_port)
+    try:
+        await worker.run()
+    finally:
+        broker.close()
+        JOBS.close()
+        JOB_EVENTS.close()
+        REPORT_CACHE.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="research-worker",
+                                     description="Run report jobs queued by a server started with SERVER_MODE=api")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("JOB_WORKERS", "10")),
+                        help="Number of reports to research at the same time")
+    parser.add_argument("--executor", default=os.getenv("JOB_EXECUTOR", ExecutorMode.ASYNC),
+                        choices=[ExecutorMode.ASYNC, ExecutorMode.PROCESS],
+                        help="Run graphs on the worker's event loop or in a process pool")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve Prometheus metrics and /health for this worker on the given port")
+    args = parser.parse_args()
+    if os.getenv("JOB_STORE", "memory") != "sqlite":
+        parser.error("research workers need JOB_STORE=sqlite to share job records with the API")
+    asyncio.run(main(args.concurrency, args.executor, args.metrics_port))
@@ -0,0 +1,59 @@
+import { NextRequest, NextResponse } from 'next/server';
+
+// Proxy the backend's Server-Sent Events stream for a job so the browser
+// never sees the API key. EventSource resends Last-Event-ID on reconnect,
+// which is forwarded so the stream resumes where it left off.
+export async function GET(req: NextRequest) {
+  try {
+    const url = new URL(req.url);
+    const jobId = url.searchParams.get('jobId');
+    
+    if (!jobId) {
+      return NextResponse.json(
+        { detail: 'Job ID is required' }, 
+        { status: 400 }
+      );
+    }
+    
+    const headers: Record<string, string> = {
+      Accept: 'text/event-stream',
+    };
+    
+    if (process.env.API_KEY) {
+      headers['X-API-Key'] = process.env.API_KEY;
+    }
+    
+    const lastEventId = req.headers.get('last-event-id');
+    if (lastEventId) {
+      headers['Last-Event-ID'] = lastEventId;
+    }
+    
+    const response = await fetch(`${process.env.NEXT_PUBLIC_BACKEND_URL}/jobs/${jobId}/events`, {
+      headers,
+      signal: req.signal,
+    });
+    
+    if (!response.ok || !response.body) {
+      const errorData = await response.json().catch(() => ({}));
+      return NextResponse.json(
+        { detail: errorData.detail || 'Failed to subscribe to job events' }, 
+        { status: response.status }
+      );
+    }
+    
+    return new Response(response.body, {
+      headers: {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        Connection: 'keep-alive',
+      },
+    });
+    
+  } catch (error) {
+    console.error('Error in job events API route:', error);
+    return NextResponse.json(
+      { detail: error instanceof Error ? error.message : 'An unknown error occurred' }, 
+      { status: 500 }
+    );
+  }
+}
@@ -55,7 +55,7 @@ export async function POST(req: NextRequest) {
     if (healthData.is_warming_up) {
       return NextResponse.json(
         { 
-          detail: 'Server is currently warming up. Please try again in 30 seconds.',
+          detail: 'Server is currently warming up. Please try again shortly.',
           serverStatus: 'warming' 
         }, 
         { status: 503 }
@@ -133,4 +133,40 @@ export async function GET(req: NextRequest) {
       { status: 500 }
     );
   }
-}
\ No newline at end of file
+}
+
+// Cancel a job, e.g. when the user leaves the page before it finishes
+export async function DELETE(req: NextRequest) {
+  try {
+    const url = new URL(req.url);
+    const jobId = url.searchParams.get('jobId');
+    
+    if (!jobId) {
+      return NextResponse.json(
+        { detail: 'Job ID is required' }, 
+        { status: 400 }
+      );
+    }
+    
+    const headers: Record<string, string> = {};
+    
+    if (process.env.API_KEY) {
+      headers['X-API-Key'] = process.env.API_KEY;
+    }
+    
+    const response = await fetch(`${process.env.NEXT_PUBLIC_BACKEND_URL}/jobs/${jobId}`, {
+      method: 'DELETE',
+      headers
+    });
+    
+    const data = await response.json();
+    return NextResponse.json(data, { status: response.status });
+    
+  } catch (error) {
+    console.error('Error in cancel job API route:', error);
+    return NextResponse.json(
+      { detail: error instanceof Error ? error.message : 'An unknown error occurred' }, 
+      { status: 500 }
+    );
+  }
+}
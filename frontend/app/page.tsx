@@ -162,8 +162,8 @@ export default function Home() {
         return;
       }
 
-      // Start polling for job status
-      startPollingJobStatus(jobData.job_id);
+      // Start following job events
+      followJobEvents(jobData.job_id);
     } catch (err) {
       setError(
         err instanceof Error ? err.message : "An unknown error occurred"
@@ -172,62 +172,71 @@ export default function Home() {
     }
   };
 
-  // Add a new function to poll for job status
-  const startPollingJobStatus = (jobId: string) => {
-    const pollInterval = setInterval(async () => {
-      try {
-        const response = await fetch(`/api/generate-report?jobId=${jobId}`, {
-          method: "GET",
-        });
-
-        if (!response.ok) {
-          clearInterval(pollInterval);
-          const errorData = await response.json();
-          setError(errorData.detail || "Failed to check job status");
-          setIsLoading(false);
-          return;
-        }
-
-        const statusData = await response.json();
+  // Follow the job's pushed events instead of polling for its status
+  const followJobEvents = (jobId: string) => {
+    const events = new EventSource(`/api/generate-report/events?jobId=${jobId}`);
+
+    const updateStage = (progress: number) => {
+      // Map job progress to thought stages
+      if (progress <= 0.2) setCurrentStage(0);
+      else if (progress <= 0.3) setCurrentStage(1);
+      else if (progress <= 0.5) setCurrentStage(2);
+      else if (progress <= 0.7) setCurrentStage(3);
+      else if (progress <= 0.9) setCurrentStage(4);
+      else if (progress < 1.0) setCurrentStage(5);
+      else setCurrentStage(6);
+    };
+
+    events.addEventListener("status", (event) => {
+      updateStage(JSON.parse((event as MessageEvent).data).progress);
+    });
+
+    events.addEventListener("progress", (event) => {
+      updateStage(JSON.parse((event as MessageEvent).data).progress);
+    });
+
+    // The final report is sent exactly once, as the last event
+    events.addEventListener("completed", (event) => {
+      events.close();
+      setReport(JSON.parse((event as MessageEvent).data).report);
+      setIsLoading(false);
+    });
 
-        // Update progress display based on job progress
-        setProcessingTime((prev) => prev + 1);
+    events.addEventListener("failed", (event) => {
+      events.close();
+      setError(JSON.parse((event as MessageEvent).data).error || "Failed to generate report");
+      setIsLoading(false);
+    });
 
-        // Map job progress to thought stages
-        if (statusData.progress <= 0.2) setCurrentStage(0);
-        else if (statusData.progress <= 0.3) setCurrentStage(1);
-        else if (statusData.progress <= 0.5) setCurrentStage(2);
-        else if (statusData.progress <= 0.7) setCurrentStage(3);
-        else if (statusData.progress <= 0.9) setCurrentStage(4);
-        else if (statusData.progress < 1.0) setCurrentStage(5);
-        else setCurrentStage(6);
-
-        // Check if job is completed
-        if (statusData.status === "completed" && statusData.report) {
-          clearInterval(pollInterval);
-          setReport(statusData.report);
-          setIsLoading(false);
-          return;
-        }
+    events.addEventListener("cancelled", () => {
+      events.close();
+      setError("Report generation was cancelled");
+      setIsLoading(false);
+    });
 
-        // Check if job failed
-        if (statusData.status === "failed") {
-          clearInterval(pollInterval);
-          setError(statusData.error || "Failed to generate report");
-          setIsLoading(false);
-          return;
-        }
-      } catch (err) {
-        console.error("Error polling job status:", err);
-        // Don't clear the interval or stop loading on transient errors
+    // EventSource reconnects on transient errors and resumes via Last-Event-ID
+    events.onerror = () => {
+      if (events.readyState === EventSource.CLOSED) {
+        setError("Lost connection to the report stream");
+        setIsLoading(false);
       }
-    }, 3000); // Poll every 3 seconds
+    };
 
-    // Store the interval ID to clear it when unmounting
-    return () => clearInterval(pollInterval);
+    return () => events.close();
   };
 
-  // Make sure to clean up the polling interval when component unmounts or when report is complete
+  // Cancel the running job when the user leaves the page so it stops spending tokens
+  useEffect(() => {
+    if (!isLoading || !jobId) return;
+
+    const cancelJob = () => {
+      fetch(`/api/generate-report?jobId=${jobId}`, { method: "DELETE", keepalive: true });
+    };
+    window.addEventListener("pagehide", cancelJob);
+    return () => window.removeEventListener("pagehide", cancelJob);
+  }, [isLoading, jobId]);
+
+  // Make sure to clean up the job state when component unmounts or when report is complete
   useEffect(() => {
     if (!isLoading && jobId) {
       setJobId(null);